@@ -1,5 +1,6 @@
 from flask import Flask
 from .config import Config
+from .utils import init_response_layer
 from flask_cors import CORS
 
 def create_app():
@@ -11,8 +12,15 @@ def create_app():
     from .routes.upload_routes import upload_bp
     from .routes.analytics_routes import analytics_bp
     from .routes.auth_routes import auth_bp
+    from .routes.system_routes import system_bp
+    from .routes.metrics_routes import metrics_bp
     app.register_blueprint(upload_bp)
     app.register_blueprint(analytics_bp)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(system_bp)
+    app.register_blueprint(metrics_bp)
+    
+    # After the blueprints, so compression runs before their after_request hooks
+    init_response_layer(app)
 
     return app
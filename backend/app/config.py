@@ -2,8 +2,24 @@ import os
 import socket
 import subprocess
 import platform
+import threading
+import time
+import logging
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+# Process-wide HDFS endpoint discovery cache (shared by every Config instance)
+_discovery_lock = threading.Lock()
+_discovery_state = {
+    'ip': None,
+    'verified': False,
+    'resolved_at': None,
+    'last_duration': None,
+    'refreshing': False,
+    'invalidated': False
+}
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'supersecretkey')
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwtsecret')
@@ -16,9 +32,237 @@ class Config:
     WEBHDFS_PORT = os.environ.get('WEBHDFS_PORT', '50070')  # WebHDFS port for Hadoop 2.x
     HDFS_PORT = os.environ.get('HDFS_PORT', '8020')  # HDFS port
     
+    # Seconds a discovered HDFS IP is reused before it is re-probed in the background
+    HDFS_DISCOVERY_TTL = float(os.environ.get('HDFS_DISCOVERY_TTL', 300))
+    
+    # Network scan fallback of discovery (asyncio connects): 'auto' scans on Windows only, as before
+    HDFS_NETWORK_SCAN = os.environ.get('HDFS_NETWORK_SCAN', 'auto').lower()
+    # Comma-separated CIDR ranges to scan (default: the local /24)
+    HDFS_SCAN_CIDRS = [cidr.strip() for cidr in os.environ.get('HDFS_SCAN_CIDRS', '').split(',') if cidr.strip()]
+    HDFS_SCAN_CONCURRENCY = int(os.environ.get('HDFS_SCAN_CONCURRENCY', 1000))
+    HDFS_SCAN_CONNECT_TIMEOUT = float(os.environ.get('HDFS_SCAN_CONNECT_TIMEOUT', 0.5))
+    HDFS_SCAN_HTTP_TIMEOUT = float(os.environ.get('HDFS_SCAN_HTTP_TIMEOUT', 2))
+    
+    # WebHDFS client: pooled keep-alive connections per host, timeouts (seconds) and retries
+    HDFS_TIMEOUT = float(os.environ.get('HDFS_TIMEOUT', 10))
+    WEBHDFS_POOL_SIZE = int(os.environ.get('WEBHDFS_POOL_SIZE', 10))
+    WEBHDFS_RETRIES = int(os.environ.get('WEBHDFS_RETRIES', 3))
+    WEBHDFS_BACKOFF = float(os.environ.get('WEBHDFS_BACKOFF', 0.3))
+    
+    # Analysis result cache (LRU, bounded by the serialized size of cached results)
+    ANALYSIS_CACHE_MAX_BYTES = int(os.environ.get('ANALYSIS_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    # Separate cache for inferred schemas, Spark column kinds and /series and /aggregate results
+    METADATA_CACHE_MAX_BYTES = int(os.environ.get('METADATA_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    
+    # Streaming profiler (chunked CSV parsing with bounded memory)
+    PROFILER_STREAMING = os.environ.get('PROFILER_STREAMING', 'false').lower() == 'true'
+    PROFILER_CHUNK_ROWS = int(os.environ.get('PROFILER_CHUNK_ROWS', 50000))
+    PROFILER_MAX_TRACKED_VALUES = int(os.environ.get('PROFILER_MAX_TRACKED_VALUES', 100000))
+    PROFILER_BATCH_BYTES = int(os.environ.get('PROFILER_BATCH_BYTES', 8 * 1024 * 1024))
+    # Batched numeric statistics work on groups of columns of at most this many float64 bytes
+    # (peak memory is several times this: sorted, filled and mask copies of the group)
+    NUMERIC_BATCH_BYTES = int(os.environ.get('NUMERIC_BATCH_BYTES', 32 * 1024 * 1024))
+    # Fixed-bin histograms per numeric column, computed while profiling (0 disables them)
+    PROFILER_HISTOGRAM_BINS = int(os.environ.get('PROFILER_HISTOGRAM_BINS', 20))
+    # Pearson correlation/covariance matrix of the numeric columns, accumulated in the same pass (opt-in).
+    # At most CORRELATION_MAX_COLUMNS columns; above CORRELATION_FULL_PASS_COLUMNS it uses a row sample
+    PROFILER_CORRELATION = os.environ.get('PROFILER_CORRELATION', 'false').lower() == 'true'
+    CORRELATION_MAX_COLUMNS = int(os.environ.get('CORRELATION_MAX_COLUMNS', 100))
+    CORRELATION_FULL_PASS_COLUMNS = int(os.environ.get('CORRELATION_FULL_PASS_COLUMNS', 32))
+    
+    # Approximate statistics (HyperLogLog distinct counts, KLL median, Misra-Gries mode)
+    PROFILER_APPROXIMATE = os.environ.get('PROFILER_APPROXIMATE', 'false').lower() == 'true'
+    APPROX_DISTINCT_ERROR = float(os.environ.get('APPROX_DISTINCT_ERROR', 0.01))
+    APPROX_QUANTILE_ERROR = float(os.environ.get('APPROX_QUANTILE_ERROR', 0.01))
+    APPROX_FREQUENT_ITEMS = int(os.environ.get('APPROX_FREQUENT_ITEMS', 1000))
+    
+    # Downloads: stream DataNode responses into the parser, optionally through a spooled temp file
+    DOWNLOAD_SPOOL = os.environ.get('DOWNLOAD_SPOOL', 'false').lower() == 'true'
+    DOWNLOAD_SPOOL_MAX_MEMORY = int(os.environ.get('DOWNLOAD_SPOOL_MAX_MEMORY', 32 * 1024 * 1024))
+    DOWNLOAD_CHUNK_BYTES = int(os.environ.get('DOWNLOAD_CHUNK_BYTES', 1024 * 1024))
+    
+    # Parallel byte-range reads for large files (WebHDFS OPEN with offset/length), opt-in: ranges are
+    # merged by the streaming profiler, so median/mode/unique are no longer exact on high-cardinality columns
+    PARALLEL_READ = os.environ.get('PARALLEL_READ', 'false').lower() == 'true'
+    PARALLEL_READ_MIN_BYTES = int(os.environ.get('PARALLEL_READ_MIN_BYTES', 256 * 1024 * 1024))
+    PARALLEL_READ_RANGE_BYTES = int(os.environ.get('PARALLEL_READ_RANGE_BYTES', 64 * 1024 * 1024))
+    PARALLEL_READ_WORKERS = int(os.environ.get('PARALLEL_READ_WORKERS', 4))
+    PARALLEL_READ_OVERSHOOT_BYTES = int(os.environ.get('PARALLEL_READ_OVERSHOOT_BYTES', 64 * 1024))
+    
+    # Columnar sidecars: Arrow IPC copies of analyzed files (local), optionally Parquet on HDFS for Spark
+    SIDECAR_ENABLED = os.environ.get('SIDECAR_ENABLED', 'true').lower() == 'true'
+    SIDECAR_DIR = os.environ.get('SIDECAR_DIR', str(Path(__file__).parent.parent / 'cache' / 'sidecars'))
+    SIDECAR_HDFS = os.environ.get('SIDECAR_HDFS', 'false').lower() == 'true'
+    SIDECAR_BATCH_ROWS = int(os.environ.get('SIDECAR_BATCH_ROWS', 65536))
+    # CSV is converted block by block; column types are inferred from the first block
+    SIDECAR_BLOCK_BYTES = int(os.environ.get('SIDECAR_BLOCK_BYTES', 4 * 1024 * 1024))
+    
+    # Analysis job queue: 'process' (pool of worker processes) or 'thread' backend
+    JOB_BACKEND = os.environ.get('JOB_BACKEND', 'process')
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_START_METHOD = os.environ.get('JOB_START_METHOD', 'spawn')
+    JOB_RESULT_TTL = float(os.environ.get('JOB_RESULT_TTL', 600))
+    # Seconds /summary and /analyze/preview wait before answering 202 with the job id
+    ANALYSIS_SYNC_TIMEOUT = float(os.environ.get('ANALYSIS_SYNC_TIMEOUT', 120))
+    
+    # Shared Spark runtime: cached DataFrames per file version, evicted LRU under a memory budget
+    SPARK_CACHE_MAX_BYTES = int(os.environ.get('SPARK_CACHE_MAX_BYTES', 4 * 1024 * 1024 * 1024))
+    SPARK_CACHE_SIZE_FACTOR = float(os.environ.get('SPARK_CACHE_SIZE_FACTOR', 2.0))
+    SPARK_CACHE_MIN_FREE_FRACTION = float(os.environ.get('SPARK_CACHE_MIN_FREE_FRACTION', 0.1))
+    # Spark profiling: compute modes with one extra grouped job over all columns
+    SPARK_PROFILE_MODES = os.environ.get('SPARK_PROFILE_MODES', 'true').lower() == 'true'
+    
+    # Group-by aggregation: files of at least AGGREGATE_SPARK_MIN_BYTES go to Spark, output capped at N groups
+    AGGREGATE_SPARK_MIN_BYTES = int(os.environ.get('AGGREGATE_SPARK_MIN_BYTES', 512 * 1024 * 1024))
+    AGGREGATE_MAX_GROUPS = int(os.environ.get('AGGREGATE_MAX_GROUPS', 50))
+    
+    # Downsampled chart series (/series): default and maximum point budget
+    SERIES_DEFAULT_POINTS = int(os.environ.get('SERIES_DEFAULT_POINTS', 1000))
+    SERIES_MAX_POINTS = int(os.environ.get('SERIES_MAX_POINTS', 10000))
+    
+    # Row browsing (/rows): sparse index of every ROW_INDEX_STRIDE-th record offset per file version
+    ROW_INDEX_STRIDE = int(os.environ.get('ROW_INDEX_STRIDE', 1000))
+    ROW_INDEX_DIR = os.environ.get('ROW_INDEX_DIR', str(Path(__file__).parent.parent / 'cache' / 'row_index'))
+    ROWS_DEFAULT_LIMIT = int(os.environ.get('ROWS_DEFAULT_LIMIT', 50))
+    ROWS_MAX_LIMIT = int(os.environ.get('ROWS_MAX_LIMIT', 1000))
+    
+    # Schema inference from the file head plus a few random byte ranges (compact dtypes, explicit Spark schema)
+    SCHEMA_INFERENCE = os.environ.get('SCHEMA_INFERENCE', 'true').lower() == 'true'
+    SCHEMA_SAMPLE_HEAD_BYTES = int(os.environ.get('SCHEMA_SAMPLE_HEAD_BYTES', 1024 * 1024))
+    SCHEMA_SAMPLE_RANGES = int(os.environ.get('SCHEMA_SAMPLE_RANGES', 4))
+    SCHEMA_SAMPLE_RANGE_BYTES = int(os.environ.get('SCHEMA_SAMPLE_RANGE_BYTES', 256 * 1024))
+    # Strings with at most this many distinct values per non-null value are stored as categoricals
+    SCHEMA_CATEGORY_MAX_RATIO = float(os.environ.get('SCHEMA_CATEGORY_MAX_RATIO', 0.5))
+    
+    # Incremental re-analysis: mergeable profiles of files of at least INCREMENTAL_MIN_BYTES are kept
+    # with the length they cover, so a file that only grew is profiled from its appended bytes
+    INCREMENTAL_ANALYSIS = os.environ.get('INCREMENTAL_ANALYSIS', 'true').lower() == 'true'
+    INCREMENTAL_MIN_BYTES = int(os.environ.get('INCREMENTAL_MIN_BYTES', 1024 * 1024))
+    PROFILE_STATE_DIR = os.environ.get('PROFILE_STATE_DIR', str(Path(__file__).parent.parent / 'cache' / 'profile_state'))
+    
+    # Instrumentation: stage spans are always aggregated for /metrics; also send a Server-Timing header
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', 'true').lower() == 'true'
+    
+    # Response compression negotiated via Accept-Encoding (brotli needs the brotli package)
+    COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', 'true').lower() == 'true'
+    COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+    
+    # Batch analysis (/analyze/batch): files analyzed at once and the memory they may need together
+    BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', JOB_WORKERS))
+    BATCH_MEMORY_BUDGET_BYTES = int(os.environ.get('BATCH_MEMORY_BUDGET_BYTES', 1024 * 1024 * 1024))
+    # Expected peak memory of one analysis as a multiple of the file size
+    BATCH_MEMORY_FACTOR = float(os.environ.get('BATCH_MEMORY_FACTOR', 3.0))
+    BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', 1000))
+    
+    # Compressed CSV (gzip, bz2, zstd, lz4): HDFS files are decompressed on the fly while parsing;
+    # uploads are stored compressed with UPLOAD_COMPRESSION ('none' keeps them as sent)
+    UPLOAD_COMPRESSION = os.environ.get('UPLOAD_COMPRESSION', 'none').lower()
+    # Codec level, 0 for the codec's default (gzip 6, bz2 9, zstd 3, lz4 0)
+    UPLOAD_COMPRESSION_LEVEL = int(os.environ.get('UPLOAD_COMPRESSION_LEVEL', 0))
+    
     @classmethod
     def get_hdfs_ip(cls):
-        """Dynamically discover HDFS server IP address"""
+        """Get the HDFS server IP from the discovery cache
+        
+        Only the very first call waits for discovery. Afterwards the cached IP is returned
+        immediately; once it is older than HDFS_DISCOVERY_TTL (or was invalidated) a background
+        refresh re-runs discovery.
+        """
+        with _discovery_lock:
+            ip = _discovery_state['ip']
+            if ip is not None:
+                age = time.monotonic() - _discovery_state['resolved_at']
+                if (age > cls.HDFS_DISCOVERY_TTL or _discovery_state['invalidated']) and not _discovery_state['refreshing']:
+                    cls._start_background_refresh()
+                return ip
+            
+            # Cold start - discover synchronously (other callers wait on the lock)
+            cls._refresh_discovery()
+            return _discovery_state['ip']
+    
+    @classmethod
+    def seed_hdfs_ip(cls, ip, verified):
+        """Adopt an endpoint another process already discovered (e.g. the parent of a worker pool)
+        
+        It is then refreshed after HDFS_DISCOVERY_TTL like one this process discovered itself.
+        """
+        with _discovery_lock:
+            if _discovery_state['ip'] is None:
+                cls._store_discovery(ip, verified, 0.0)
+    
+    @classmethod
+    def invalidate_hdfs_ip(cls):
+        """Mark the cached IP stale (e.g. after a connection error) and refresh it in the background"""
+        with _discovery_lock:
+            if _discovery_state['ip'] is None or _discovery_state['refreshing']:
+                return
+            logger.info(f"HDFS endpoint {_discovery_state['ip']} invalidated, refreshing discovery")
+            _discovery_state['invalidated'] = True
+            cls._start_background_refresh()
+    
+    @classmethod
+    def get_discovery_status(cls):
+        """Resolved endpoint and cache age for monitoring"""
+        with _discovery_lock:
+            resolved_at = _discovery_state['resolved_at']
+            return {
+                'ip': _discovery_state['ip'],
+                'webhdfs_url': f"http://{_discovery_state['ip']}:{cls.WEBHDFS_PORT}" if _discovery_state['ip'] else None,
+                'verified': _discovery_state['verified'],
+                'age_seconds': (time.monotonic() - resolved_at) if resolved_at is not None else None,
+                'ttl_seconds': cls.HDFS_DISCOVERY_TTL,
+                'last_discovery_seconds': _discovery_state['last_duration'],
+                'refreshing': _discovery_state['refreshing'],
+                'invalidated': _discovery_state['invalidated']
+            }
+    
+    @classmethod
+    def _start_background_refresh(cls):
+        # Caller holds _discovery_lock
+        _discovery_state['refreshing'] = True
+        threading.Thread(target=cls._background_refresh, name='hdfs-discovery', daemon=True).start()
+    
+    @classmethod
+    def _background_refresh(cls):
+        try:
+            ip, verified, duration = cls._run_discovery()
+            with _discovery_lock:
+                cls._store_discovery(ip, verified, duration)
+        except Exception as e:
+            logger.warning(f"Background HDFS discovery failed: {e}")
+        finally:
+            with _discovery_lock:
+                _discovery_state['refreshing'] = False
+    
+    @classmethod
+    def _refresh_discovery(cls):
+        # Caller holds _discovery_lock
+        ip, verified, duration = cls._run_discovery()
+        cls._store_discovery(ip, verified, duration)
+    
+    @classmethod
+    def _run_discovery(cls):
+        started = time.monotonic()
+        ip, verified = cls.discover_hdfs_ip()
+        return ip, verified, time.monotonic() - started
+    
+    @classmethod
+    def _store_discovery(cls, ip, verified, duration):
+        if ip != _discovery_state['ip']:
+            logger.info(f"HDFS endpoint resolved to {ip} (verified={verified}) in {duration:.2f}s")
+        _discovery_state.update({
+            'ip': ip,
+            'verified': verified,
+            'resolved_at': time.monotonic(),
+            'last_duration': duration,
+            'invalidated': False
+        })
+    
+    @classmethod
+    def discover_hdfs_ip(cls):
+        """Dynamically discover HDFS server IP address, returns (ip, verified)"""
         # Load .env file if it exists
         cls._load_env_file()
         
@@ -26,7 +270,7 @@ class Config:
         if os.environ.get('FORCE_IP', 'false').lower() == 'true':
             forced_ip = os.environ.get('HDFS_IP')
             if forced_ip and cls._test_hdfs_connection(forced_ip):
-                return forced_ip
+                return forced_ip, True
         
         # Try multiple methods to find the HDFS server IP
         
@@ -34,7 +278,7 @@ class Config:
         try:
             ip = socket.gethostbyname(cls.HDFS_HOSTNAME)
             if cls._test_hdfs_connection(ip):
-                return ip
+                return ip, True
         except socket.gaierror:
             pass
         
@@ -49,22 +293,38 @@ class Config:
             '172.16.0.100'
         ]
         
-        for ip in common_ips:
-            if cls._test_hdfs_connection(ip):
-                return ip
+        from app.services.network_discovery import expand_targets, find_webhdfs
+        
+        # Checked concurrently; the first one that answers in list order wins
+        try:
+            ip = find_webhdfs(common_ips, cls.WEBHDFS_PORT, ordered=True,
+                              connect_timeout=cls.HDFS_SCAN_HTTP_TIMEOUT)
+            if ip:
+                return ip, True
+        except Exception as e:
+            logger.warning(f"Checking common HDFS addresses failed: {e}")
         
-        # Method 3: Scan local network (Windows)
-        if platform.system() == 'Windows':
-            local_ip = cls._get_local_ip()
-            if local_ip:
-                network_prefix = '.'.join(local_ip.split('.')[:-1])
-                for i in range(1, 255):
-                    test_ip = f"{network_prefix}.{i}"
-                    if cls._test_hdfs_connection(test_ip):
-                        return test_ip
+        # Method 3: Scan HDFS_SCAN_CIDRS (default: the local /24), stopping at the first WebHDFS endpoint
+        if cls._network_scan_enabled():
+            cidrs = cls.HDFS_SCAN_CIDRS
+            if not cidrs:
+                local_ip = cls._get_local_ip()
+                cidrs = [f"{local_ip}/24"] if local_ip else []
+            try:
+                ip = find_webhdfs(expand_targets(cidrs), cls.WEBHDFS_PORT) if cidrs else None
+                if ip:
+                    return ip, True
+            except Exception as e:
+                logger.warning(f"Network scan for HDFS failed: {e}")
         
         # Fallback to environment variable or default
-        return os.environ.get('HDFS_IP', '192.168.1.56')
+        return os.environ.get('HDFS_IP', '192.168.1.56'), False
+    
+    @classmethod
+    def _network_scan_enabled(cls):
+        if cls.HDFS_NETWORK_SCAN == 'auto':
+            return platform.system() == 'Windows'
+        return cls.HDFS_NETWORK_SCAN == 'true'
     
     @classmethod
     def _test_hdfs_connection(cls, ip):
@@ -1,5 +1,16 @@
-from flask import Blueprint, request, jsonify
-from app.services.simple_analyzer import analyze_hdfs_file_simple
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from app.config import Config
+from app.services.analysis_cache import analysis_cache, metadata_cache, file_version, cache_variant
+from app.services.hdfs_utils import get_file_status
+from app.services.simple_analyzer import normalize_hdfs_path
+from app.services.job_queue import job_queue
+from app.services.aggregation import aggregate_file
+from app.services.downsampling import downsample_file
+from app.services.row_index import read_rows
+from app.services.batch_analysis import expand_batch, analyze_batch
+from app.services.metrics import span, merge_recorded
+from app.utils import version_etag
 import logging
 
 # Set up logging
@@ -7,6 +18,59 @@ logger = logging.getLogger(__name__)
 
 analytics_bp = Blueprint('analytics', __name__)
 
+def _bool_arg(name):
+    """Read an optional true/false query parameter (None when absent)"""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    return value.lower() == 'true'
+
+def _file_etag(hdfs_path, *query):
+    """ETag for a response computed from the current version of an HDFS file and the query
+
+    Returns (etag, file_status), or (None, None) when the file status is unavailable.
+    """
+    normalized_path = normalize_hdfs_path(hdfs_path)
+    try:
+        file_status = get_file_status(normalized_path)
+    except Exception as e:
+        logger.warning(f"Could not get file status for {normalized_path}, no ETag: {e}")
+        return None, None
+    return version_etag(normalized_path, file_version(file_status), request.endpoint, *query), file_status
+
+def _not_modified(etag):
+    """True when the client's If-None-Match already names this ETag"""
+    return etag is not None and request.if_none_match.contains_weak(etag)
+
+def _with_etag(response, etag):
+    """Tag a 200 response so the client revalidates it with If-None-Match on the next poll"""
+    if etag is not None and response.status_code == 200:
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _not_modified_response(etag):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _query_args():
+    return sorted(request.args.items(multi=True))
+
+def _wait_for_job(job, etag=None):
+    """Wait up to ANALYSIS_SYNC_TIMEOUT for a job; 202 with the job id if it is still running"""
+    try:
+        result = job.result(timeout=Config.ANALYSIS_SYNC_TIMEOUT)
+        if job.recorded is not None:
+            # Stages ran in the job's worker; add them to this request's Server-Timing
+            merge_recorded(job.recorded, into_registry=False)
+        with span('response.serialize'):
+            return _with_etag(jsonify(result), etag)
+    except FutureTimeoutError:
+        logger.info(f"Analysis job {job.id} still running, returning job id")
+        return jsonify(job.to_dict(include_result=False)), 202
+
 @analytics_bp.route('/analyze/preview', methods=['POST'])
 def analyze_preview():
     """Analyze HDFS file and return preview data"""
@@ -21,15 +85,48 @@ def analyze_preview():
             
         logger.info(f"Received analysis request for HDFS path: {hdfs_path}")
         
-        result = analyze_hdfs_file_simple(hdfs_path)
+        streaming = data.get('streaming')
+        approximate = data.get('approximate')
+        
+        job = job_queue.submit(hdfs_path, streaming=streaming, approximate=approximate)
+        response = _wait_for_job(job)
         logger.info("Analysis completed successfully")
         
-        return jsonify(result)
+        return response
         
     except Exception as e:
         logger.error(f"Error in analyze_preview: {str(e)}")
         return jsonify({"error": f"Analysis failed: {str(e)}"}), 500
 
+@analytics_bp.route('/analyze/batch', methods=['POST'])
+def analyze_batch_files():
+    """Analyze a list of HDFS files or a directory, streaming one NDJSON line per file as it finishes"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+        
+        entries = expand_batch(
+            paths=data.get('paths'),
+            directory=data.get('directory'),
+            recursive=bool(data.get('recursive')),
+            suffix=data.get('suffix', '.csv')
+        )
+        logger.info(f"Received batch analysis request for {len(entries)} files")
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in analyze_batch: {str(e)}")
+        return jsonify({"error": f"Batch analysis failed: {str(e)}"}), 500
+    
+    outcomes = analyze_batch(entries, streaming=data.get('streaming'), approximate=data.get('approximate'))
+    lines = (current_app.json.dumps(outcome) + '\n' for outcome in outcomes)
+    response = current_app.response_class(stream_with_context(lines), mimetype='application/x-ndjson')
+    # Ask proxies to pass lines through as they are written
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @analytics_bp.route('/summary', methods=['GET'])
 def summary():
     """Get summary for a specific file"""
@@ -42,11 +139,160 @@ def summary():
         hdfs_path = f'/uploads/{filename}'
         logger.info(f"Received summary request for file: {filename}, HDFS path: {hdfs_path}")
         
-        result = analyze_hdfs_file_simple(hdfs_path)
+        streaming = _bool_arg('streaming')
+        approximate = _bool_arg('approximate')
+        
+        # Repeat polls of an unchanged file are answered from the ETag alone (one per result variant;
+        # parallel reads follow from the file length, which is part of the version)
+        if streaming is None:
+            streaming = Config.PROFILER_STREAMING
+        if approximate is None:
+            approximate = Config.PROFILER_APPROXIMATE
+        etag, file_status = _file_etag(hdfs_path, cache_variant(approximate, streaming))
+        if _not_modified(etag):
+            return _not_modified_response(etag)
+        
+        job = job_queue.submit(hdfs_path, streaming=streaming, approximate=approximate, file_status=file_status)
+        response = _wait_for_job(job, etag)
         logger.info("Summary analysis completed successfully")
         
-        return jsonify(result)
+        return response
         
     except Exception as e:
         logger.error(f"Error in summary: {str(e)}")
         return jsonify({"error": f"Summary failed: {str(e)}"}), 500
+
+@analytics_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Get analysis cache hit/miss counters (and those of the schema/query metadata cache)"""
+    stats = analysis_cache.stats()
+    stats['metadata'] = metadata_cache.stats()
+    return jsonify(stats)
+
+@analytics_bp.route('/jobs', methods=['POST'])
+def submit_job():
+    """Submit an analysis job and return its id without waiting"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+            
+        hdfs_path = data.get('hdfs_path')
+        if not hdfs_path:
+            return jsonify({"error": "Missing hdfs_path"}), 400
+        
+        job = job_queue.submit(hdfs_path, streaming=data.get('streaming'), approximate=data.get('approximate'))
+        return jsonify(job.to_dict(include_result=False)), 202
+        
+    except Exception as e:
+        logger.error(f"Error in submit_job: {str(e)}")
+        return jsonify({"error": f"Job submission failed: {str(e)}"}), 500
+
+@analytics_bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Get the status of an analysis job (and its result once done)"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+@analytics_bp.route('/aggregate', methods=['GET', 'POST'])
+def aggregate():
+    """Group-by aggregation over the whole file (top N groups plus "other")"""
+    try:
+        data = request.get_json(silent=True) if request.method == 'POST' else None
+        if data is None:
+            # Query string form: group_by may be repeated or comma separated
+            data = request.args.to_dict()
+            data['group_by'] = [key for value in request.args.getlist('group_by') for key in value.split(',') if key]
+        
+        hdfs_path = data.get('hdfs_path')
+        if not hdfs_path and data.get('filename'):
+            hdfs_path = f"/uploads/{data['filename']}"
+        if not hdfs_path:
+            return jsonify({"error": "Missing hdfs_path"}), 400
+        
+        etag = None
+        if request.method == 'GET':
+            etag, _ = _file_etag(hdfs_path, _query_args())
+            if _not_modified(etag):
+                return _not_modified_response(etag)
+        
+        group_by = data.get('group_by') or []
+        if isinstance(group_by, str):
+            group_by = [group_by]
+        limit = data.get('limit')
+        
+        result = aggregate_file(
+            hdfs_path,
+            group_by,
+            measure=data.get('measure') or None,
+            agg=data.get('agg', 'sum'),
+            limit=int(limit) if limit else None,
+            engine=data.get('engine')
+        )
+        return _with_etag(jsonify(result), etag)
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in aggregate: {str(e)}")
+        return jsonify({"error": f"Aggregation failed: {str(e)}"}), 500
+
+@analytics_bp.route('/series', methods=['GET'])
+def series():
+    """Downsampled x/y series of a whole file for line and scatter charts"""
+    try:
+        hdfs_path = request.args.get('hdfs_path')
+        if not hdfs_path and request.args.get('filename'):
+            hdfs_path = f"/uploads/{request.args['filename']}"
+        if not hdfs_path:
+            return jsonify({"error": "Missing hdfs_path"}), 400
+        
+        etag, _ = _file_etag(hdfs_path, _query_args())
+        if _not_modified(etag):
+            return _not_modified_response(etag)
+        
+        points = request.args.get('points')
+        result = downsample_file(
+            hdfs_path,
+            request.args.get('y'),
+            x=request.args.get('x') or None,
+            points=int(points) if points else None,
+            method=request.args.get('method', 'lttb')
+        )
+        return _with_etag(jsonify(result), etag)
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in series: {str(e)}")
+        return jsonify({"error": f"Series failed: {str(e)}"}), 500
+
+@analytics_bp.route('/rows', methods=['GET'])
+def rows():
+    """Page of raw records of a file (one ranged read through the file's row index)"""
+    try:
+        hdfs_path = request.args.get('path') or request.args.get('hdfs_path')
+        if not hdfs_path and request.args.get('filename'):
+            hdfs_path = f"/uploads/{request.args['filename']}"
+        if not hdfs_path:
+            return jsonify({"error": "Missing path"}), 400
+        
+        etag, _ = _file_etag(hdfs_path, _query_args())
+        if _not_modified(etag):
+            return _not_modified_response(etag)
+        
+        limit = request.args.get('limit')
+        result = read_rows(
+            hdfs_path,
+            offset=int(request.args.get('offset', 0)),
+            limit=int(limit) if limit else None
+        )
+        return _with_etag(jsonify(result), etag)
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in rows: {str(e)}")
+        return jsonify({"error": f"Reading rows failed: {str(e)}"}), 500
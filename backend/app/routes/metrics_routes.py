@@ -0,0 +1,43 @@
+import time
+from flask import Blueprint, Response, g, request
+from app.config import Config
+from app.services.analysis_cache import analysis_cache, metadata_cache
+from app.services.metrics import metrics, start_collecting, stop_collecting, current_collector
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.before_app_request
+def start_request_timing():
+    g.metrics_started = time.perf_counter()
+    g.metrics_token = start_collecting()
+
+@metrics_bp.after_app_request
+def finish_request_timing(response):
+    """Record the request latency and attach the per-stage Server-Timing breakdown"""
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    metrics.observe('intelliview_http_request_duration_seconds', elapsed,
+                    endpoint=request.endpoint or 'unmatched', method=request.method)
+
+    collector = current_collector()
+    if Config.SERVER_TIMING and collector is not None:
+        breakdown = collector.server_timing()
+        total = f"total;dur={elapsed * 1000:.1f}"
+        response.headers['Server-Timing'] = f"{breakdown}, {total}" if breakdown else total
+    return response
+
+@metrics_bp.teardown_app_request
+def stop_request_timing(exception=None):
+    token = g.pop('metrics_token', None)
+    if token is not None:
+        stop_collecting(token)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage latency histograms, byte counters and cache counters in Prometheus text format"""
+    gauges = [(name, {'stat': stat}, value)
+              for name, cache in (('intelliview_analysis_cache', analysis_cache), ('intelliview_metadata_cache', metadata_cache))
+              for stat, value in cache.stats().items() if value is not None]
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,15 @@
+from flask import Blueprint, jsonify
+from app.config import Config
+from app.services.spark_runtime import spark_runtime
+
+system_bp = Blueprint('system', __name__)
+
+@system_bp.route('/api/system/status', methods=['GET'])
+def system_status():
+    """Report the cached HDFS endpoint and Spark runtime state without probing the network"""
+    discovery = Config.get_discovery_status()
+    return jsonify({
+        'status': 'healthy' if discovery['verified'] else 'error',
+        'hdfs': discovery,
+        'spark': spark_runtime.status()
+    })
@@ -1,13 +1,26 @@
 import os
+import logging
 from flask import Blueprint, request, jsonify
-from app.services.hdfs_utils import upload_to_hdfs
+from app.services.hdfs_utils import upload_to_hdfs, upload_stream_to_hdfs, get_file_status
+from app.services.analysis_cache import analysis_cache, file_version, cache_variant
+from app.services.column_profiler import IncrementalCsvProfiler
+from app.services.compression import (
+    MAGIC_BYTES, StreamDecompressor, compressed_name, detect_codec, local_file_codec, resolve_codec
+)
 from app.config import Config
 
+# Set up logging
+logger = logging.getLogger(__name__)
+
 upload_bp = Blueprint('upload', __name__)
 
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', 'uploads')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+def _upload_codec():
+    """Codec to store an upload with: the 'compress' parameter, else UPLOAD_COMPRESSION"""
+    return resolve_codec(request.values.get('compress') or Config.UPLOAD_COMPRESSION)
+
 @upload_bp.route('/upload', methods=['POST'])
 def upload_file():
     if 'file' not in request.files:
@@ -15,19 +28,104 @@ def upload_file():
     file = request.files['file']
     if file.filename == '':
         return jsonify({'message': 'No selected file'}), 400
+    try:
+        codec = _upload_codec()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     file_path = os.path.join(UPLOAD_FOLDER, file.filename)
     file.save(file_path)
+    # Files that arrive compressed are stored as they are
+    sent_codec = local_file_codec(file_path)
+    if sent_codec:
+        codec = None
+    filename = compressed_name(file.filename, sent_codec or codec) if sent_codec or codec else file.filename
     # Upload to HDFS
-    hdfs_path = f'/uploads/{file.filename}'
+    hdfs_path = f'/uploads/{filename}'
+    config = Config()
+    hdfs_uri = f'{config.HDFS_URI_PREFIX}{hdfs_path}'
+    try:
+        upload_to_hdfs(file_path, hdfs_path, codec=codec)
+    except Exception as e:
+        return jsonify({'message': f'Failed to upload to HDFS: {str(e)}'}), 500
+    return jsonify({
+        'message': 'File uploaded to HDFS successfully',
+        'filename': filename,
+        'hdfs_path': hdfs_path,
+        'hdfs_uri': hdfs_uri,
+        'compression': sent_codec or codec
+    }), 200
+
+@upload_bp.route('/upload/stream', methods=['POST', 'PUT'])
+def upload_file_stream():
+    """Stream the raw request body to the DataNode while profiling it inline"""
+    filename = request.args.get('filename')
+    if not filename:
+        return jsonify({'message': 'Missing filename'}), 400
+    filename = os.path.basename(filename)
+    try:
+        codec = _upload_codec()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    # A body that arrives compressed is stored as sent and decompressed only for the profiler
+    first_chunk = request.stream.read(Config.DOWNLOAD_CHUNK_BYTES)
+    sent_codec = detect_codec(filename, first_chunk[:MAGIC_BYTES])
+    decompressor = StreamDecompressor(sent_codec) if sent_codec else None
+    if sent_codec:
+        codec = None
+    if sent_codec or codec:
+        filename = compressed_name(filename, sent_codec or codec)
+    hdfs_path = f'/uploads/{filename}'
     config = Config()
     hdfs_uri = f'{config.HDFS_URI_PREFIX}{hdfs_path}'
+    
+    approximate = Config.PROFILER_APPROXIMATE
+    profiler = IncrementalCsvProfiler(approximate=approximate)
+    profile_errors = []
+    bytes_sent = 0
+    
+    def tee_request_body():
+        # Every chunk goes to the DataNode PUT and to the profiler; nothing is written locally
+        nonlocal bytes_sent
+        chunk = first_chunk
+        while chunk:
+            bytes_sent += len(chunk)
+            if not profile_errors:
+                try:
+                    profiler.feed(decompressor.decompress(chunk) if decompressor else chunk)
+                except Exception as e:
+                    logger.warning(f"Inline profiling of {hdfs_path} failed, continuing upload: {e}")
+                    profile_errors.append(str(e))
+            yield chunk
+            chunk = request.stream.read(Config.DOWNLOAD_CHUNK_BYTES)
+    
     try:
-        upload_to_hdfs(file_path, hdfs_path)
+        upload_stream_to_hdfs(tee_request_body(), hdfs_path, codec=codec)
     except Exception as e:
         return jsonify({'message': f'Failed to upload to HDFS: {str(e)}'}), 500
+    
+    analysis = None
+    if not profile_errors:
+        try:
+            if decompressor:
+                decompressor.finish()
+            profiler.close()
+            analysis = profiler.result()
+            # Warm the analysis cache so the first /summary is served without a download
+            version = file_version(get_file_status(hdfs_path))
+            # (a mergeable-profiler result, so it only answers streaming/approximate requests)
+            analysis_cache.put(hdfs_path, version, analysis, cache_variant(approximate, streaming=True))
+        except Exception as e:
+            logger.warning(f"Inline profiling of {hdfs_path} failed: {e}")
+            profile_errors.append(str(e))
+    
     return jsonify({
         'message': 'File uploaded to HDFS successfully',
-        'filename': file.filename,
+        'filename': filename,
         'hdfs_path': hdfs_path,
-        'hdfs_uri': hdfs_uri
-    }), 200
\ No newline at end of file
+        'hdfs_uri': hdfs_uri,
+        'bytes': bytes_sent,
+        'compression': sent_codec or codec,
+        'analysis': analysis,
+        'analysis_error': profile_errors[0] if profile_errors else None
+    }), 200
@@ -0,0 +1,54 @@
+import json
+import logging
+from app.config import Config
+from app.services.analysis_cache import metadata_cache, file_version
+from app.services.hdfs_utils import get_file_status
+from app.services.groupby_aggregator import aggregate_pandas, aggregate_spark, validate_query
+from app.services.simple_analyzer import normalize_hdfs_path, load_columns
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+def aggregation_variant(group_by, measure, agg, limit):
+    """Cache variant of an aggregation query (results are cached per path, file version and query)"""
+    return 'aggregate:' + json.dumps([group_by, measure, agg, limit])
+
+def choose_engine(file_length, engine=None):
+    """pandas for small files, the shared Spark session from AGGREGATE_SPARK_MIN_BYTES on"""
+    if engine in ('pandas', 'spark'):
+        return engine
+    return 'spark' if file_length >= Config.AGGREGATE_SPARK_MIN_BYTES else 'pandas'
+
+def aggregate_file(hdfs_path, group_by, measure=None, agg='sum', limit=None, engine=None):
+    """Group-by aggregation over a whole HDFS file, top `limit` groups plus "other\""""
+    limit = limit or Config.AGGREGATE_MAX_GROUPS
+    validate_query(group_by, measure, agg, limit)
+
+    normalized_path = normalize_hdfs_path(hdfs_path)
+    file_status = get_file_status(normalized_path)
+    version = file_version(file_status)
+    variant = aggregation_variant(group_by, measure, agg, limit)
+
+    cached = metadata_cache.get(normalized_path, version, variant)
+    if cached is not None:
+        logger.info(f"Returning cached aggregation for {normalized_path}")
+        return cached
+
+    engine = choose_engine(file_status['length'], engine)
+    logger.info(f"Aggregating {normalized_path} by {group_by} ({agg} of {measure}) with {engine}")
+
+    if engine == 'spark':
+        from app.services.spark_processor import load_dataframe
+        df = load_dataframe(f"{Config().HDFS_URI_PREFIX}{normalized_path}")
+        result = aggregate_spark(df, group_by, measure, agg, limit)
+    else:
+        # Only the needed columns are read (projected from the columnar sidecar when there is one)
+        columns = list(dict.fromkeys(group_by + ([measure] if measure else [])))
+        try:
+            df = load_columns(normalized_path, columns)
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"Unknown column(s) in {columns}: {e}")
+        result = aggregate_pandas(df, group_by, measure, agg, limit)
+
+    metadata_cache.put(normalized_path, version, result, variant)
+    return result
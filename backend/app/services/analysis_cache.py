@@ -0,0 +1,119 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from app.config import Config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+def file_version(file_status):
+    """Build a cache version from a WebHDFS FileStatus (length + modificationTime)"""
+    return (file_status.get('length'), file_status.get('modificationTime'))
+
+def cache_variant(approximate, streaming=False):
+    """Cache variant for results computed in exact, streaming or approximate mode
+
+    Results of the mergeable profiler (streaming, parallel ranges, inline upload profiles) lose the
+    exact median/mode and bound unique past PROFILER_MAX_TRACKED_VALUES, so they are kept apart
+    from whole-DataFrame results instead of answering later exact requests.
+    """
+    if approximate:
+        return 'approximate'
+    return 'streaming' if streaming else 'exact'
+
+def estimate_result_size(result):
+    """Estimate the memory cost of a cached result by its serialized size"""
+    try:
+        return len(json.dumps(result, default=str))
+    except Exception:
+        return 0
+
+class AnalysisCache:
+    """LRU cache of analysis results, validated against the HDFS file version"""
+    
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (path, variant) -> (version, result, size)
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, path, version, variant=None):
+        """Return the cached result for path if it was computed for this version"""
+        key = (path, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            cached_version, result, size = entry
+            if cached_version != version:
+                # File changed on HDFS - drop the stale entry
+                self._remove(key)
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+    
+    def put(self, path, version, result, variant=None):
+        """Store a result, evicting least recently used entries to stay in budget"""
+        key = (path, variant)
+        size = estimate_result_size(result)
+        if size > self.max_bytes:
+            logger.info(f"Result for {path} ({size} bytes) exceeds cache budget, not cached")
+            return
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            
+            while self._entries and self._current_bytes + size > self.max_bytes:
+                evicted_key = next(iter(self._entries))
+                self._remove(evicted_key)
+                self.evictions += 1
+                logger.info(f"Evicted cached analysis for {evicted_key[0]}")
+            
+            self._entries[key] = (version, result, size)
+            self._current_bytes += size
+    
+    def invalidate(self, path):
+        """Drop all cached results for a path"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                self._remove(key)
+    
+    def clear(self):
+        """Drop all cached results"""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+    
+    def stats(self):
+        """Return cache counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits / lookups) if lookups else None
+            }
+    
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._current_bytes -= size
+
+# Process-wide cache shared by all analysis routes
+analysis_cache = AnalysisCache(Config.ANALYSIS_CACHE_MAX_BYTES)
+# Inferred schemas, Spark column kinds and query results (series, aggregations), kept apart so their
+# lookups neither count towards nor evict cached analyses
+metadata_cache = AnalysisCache(Config.METADATA_CACHE_MAX_BYTES)
@@ -0,0 +1,138 @@
+import logging
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from app.config import Config
+from app.services.hdfs_utils import get_file_status, list_hdfs_files
+from app.services.job_queue import job_queue
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+def expand_batch(paths=None, directory=None, recursive=False, suffix='.csv'):
+    """Files of a batch as [path, file_status, error] entries, from explicit paths and/or a directory
+
+    Explicit paths are checked with concurrent GETFILESTATUS calls; one that cannot be read keeps
+    its error so the batch reports it instead of failing as a whole.
+    """
+    from app.services.simple_analyzer import normalize_hdfs_path
+
+    if not paths and not directory:
+        raise ValueError("Provide paths or a directory")
+    if paths is not None and not isinstance(paths, list):
+        raise ValueError("paths must be a list of HDFS paths")
+
+    entries = []
+    if directory:
+        entries.extend([path, status, None] for path, status in
+                       list_hdfs_files(normalize_hdfs_path(directory), recursive=recursive, suffix=suffix))
+
+    explicit = [normalize_hdfs_path(path) for path in paths or []]
+    if explicit:
+        def stat(path):
+            try:
+                return [path, get_file_status(path), None]
+            except Exception as e:
+                return [path, None, str(e)]
+
+        with ThreadPoolExecutor(max_workers=min(Config.WEBHDFS_POOL_SIZE, len(explicit))) as pool:
+            entries.extend(pool.map(stat, explicit))
+
+    # A path listed twice would share one in-flight job
+    seen = set()
+    entries = [entry for entry in entries if not (entry[0] in seen or seen.add(entry[0]))]
+    if len(entries) > Config.BATCH_MAX_FILES:
+        raise ValueError(f"Batch has {len(entries)} files, the limit is {Config.BATCH_MAX_FILES}")
+    return entries
+
+def estimate_memory(file_status):
+    """Peak memory an analysis of the file is expected to need"""
+    return int(file_status['length'] * Config.BATCH_MEMORY_FACTOR)
+
+def _outcome(path, file_status, started, result=None, error=None):
+    outcome = {
+        "type": "file",
+        "path": path,
+        "status": "failed" if error is not None else "done",
+        "size_bytes": file_status['length'] if file_status else None,
+        "elapsed_s": round(time.perf_counter() - started, 4)
+    }
+    if error is not None:
+        outcome["error"] = str(error)
+    else:
+        outcome["result"] = result
+    return outcome
+
+def analyze_batch(entries, streaming=None, approximate=None, concurrency=None, memory_budget=None):
+    """Analyze files on the job queue and yield each file's outcome as soon as it finishes
+
+    At most `concurrency` analyses are in flight, and together their estimated memory stays within
+    `memory_budget` - except that a file larger than the whole budget runs alone. Files are admitted
+    in order, so a large file waits for memory to free up rather than being overtaken indefinitely.
+    Cached results are yielded immediately. A final "summary" line closes the stream.
+    """
+    concurrency = max(1, concurrency or Config.BATCH_CONCURRENCY)
+    budget = memory_budget or Config.BATCH_MEMORY_BUDGET_BYTES
+    pending = deque(entry for entry in entries if entry[2] is None)
+    running = {}  # future -> (path, file_status, job, reserved bytes, started)
+    reserved = 0
+    peak_reserved = 0
+    counts = {"done": 0, "failed": 0}
+    batch_started = time.perf_counter()
+
+    def finished(outcome):
+        counts[outcome["status"]] += 1
+        return outcome
+
+    try:
+        # Files that could not be stat'ed are reported before any analysis starts
+        for path, file_status, error in entries:
+            if error is not None:
+                yield finished(_outcome(path, file_status, batch_started, error=error))
+
+        while pending or running:
+            while pending and len(running) < concurrency:
+                path, file_status, _ = pending[0]
+                cost = estimate_memory(file_status)
+                if running and reserved + cost > budget:
+                    break
+                pending.popleft()
+                started = time.perf_counter()
+                try:
+                    job = job_queue.submit(path, streaming=streaming, approximate=approximate, file_status=file_status)
+                except Exception as e:
+                    yield finished(_outcome(path, file_status, started, error=e))
+                    continue
+                if job.future is None:
+                    yield finished(_outcome(path, file_status, started, result=job.result()))
+                    continue
+                running[job.future] = (path, file_status, job, cost, started)
+                reserved += cost
+                peak_reserved = max(peak_reserved, reserved)
+
+            if not running:
+                continue
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                path, file_status, job, cost, started = running.pop(future)
+                reserved -= cost
+                if future.exception() is not None:
+                    yield finished(_outcome(path, file_status, started, error=future.exception()))
+                else:
+                    yield finished(_outcome(path, file_status, started, result=job.result()))
+    finally:
+        if pending or running:
+            # The client went away; running jobs still finish and land in the analysis cache
+            logger.info(f"Batch closed early: {len(running)} files still running, {len(pending)} not submitted")
+
+    elapsed = time.perf_counter() - batch_started
+    logger.info(f"Batch of {len(entries)} files finished in {elapsed:.2f}s "
+                f"({counts['done']} done, {counts['failed']} failed)")
+    yield {
+        "type": "summary",
+        "files": len(entries),
+        "done": counts["done"],
+        "failed": counts["failed"],
+        "elapsed_s": round(elapsed, 4),
+        "peak_reserved_bytes": peak_reserved
+    }
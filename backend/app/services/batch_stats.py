@@ -0,0 +1,247 @@
+import logging
+import warnings
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from app.config import Config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# name -> func(batch) returning one value per column (NaN where undefined)
+STATISTICS = OrderedDict()
+
+def register_statistic(name):
+    """Register a batched statistic: the decorated function gets a NumericBatch and returns a 1-D array"""
+    def decorator(func):
+        STATISTICS[name] = func
+        return func
+    return decorator
+
+class NumericBatch:
+    """Numeric columns as one contiguous (columns x rows) float64 block with shared, lazily computed intermediates
+
+    Each column is a C-contiguous row of the block, so every reduction runs along axis 1 in a
+    single vectorized pass over memory. Intermediates (NaN mask, counts, sums, the sorted block)
+    are computed once and reused by all statistics that need them.
+    """
+
+    def __init__(self, df, columns=None):
+        self.columns = list(columns if columns is not None else df.columns)
+        self.block = np.ascontiguousarray(
+            df[self.columns].to_numpy(dtype='float64', na_value=np.nan).T
+        ).reshape(len(self.columns), len(df))
+        self.n_rows = len(df)
+        self._cache = {}
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def valid(self):
+        return self._cached('valid', lambda: ~np.isnan(self.block))
+
+    @property
+    def count(self):
+        return self._cached('count', lambda: self.valid.sum(axis=1))
+
+    @property
+    def filled(self):
+        """The block with NaNs replaced by 0"""
+        def compute():
+            filled = self.block.copy()
+            filled[~self.valid] = 0.0
+            return filled
+        return self._cached('filled', compute)
+
+    @property
+    def total(self):
+        return self._cached('total', lambda: self.filled.sum(axis=1))
+
+    @property
+    def mean(self):
+        def compute():
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return self.total / self.count
+        return self._cached('mean', compute)
+
+    @property
+    def sorted(self):
+        """Each column sorted ascending, NaNs last"""
+        return self._cached('sorted', lambda: np.sort(self.block, axis=1))
+
+    @property
+    def valid_sorted(self):
+        """Mask of the non-NaN positions of the sorted block (the first count entries of each column)"""
+        def compute():
+            positions = np.arange(self.n_rows)
+            return positions[None, :] < self.count[:, None]
+        return self._cached('valid_sorted', compute)
+
+    @property
+    def runs(self):
+        """Runs of equal values in the sorted block as (column, length, value) arrays, ordered by column then value"""
+        def compute():
+            data = self.sorted
+            starts = np.ones(data.shape, dtype=bool)
+            np.not_equal(data[:, 1:], data[:, :-1], out=starts[:, 1:])
+            # NaN != NaN would start a run per NaN - drop NaN positions (they sort last)
+            starts &= self.valid_sorted
+            positions = np.flatnonzero(starts)
+            run_columns = positions // self.n_rows if self.n_rows else positions
+
+            # A run ends where the next one starts, or at the end of its column's non-NaN values
+            ends = np.empty_like(positions)
+            ends[:-1] = positions[1:]
+            last = np.ones(len(positions), dtype=bool)
+            last[:-1] = run_columns[1:] != run_columns[:-1]
+            ends[last] = run_columns[last] * self.n_rows + self.count[run_columns[last]]
+            return run_columns, ends - positions, data.ravel()[positions]
+        return self._cached('runs', compute)
+
+    def take_sorted(self, positions):
+        """Value at the given per-column position of the sorted block"""
+        return np.take_along_axis(self.sorted, positions[:, None], axis=1)[:, 0]
+
+    def histograms(self, bins):
+        """Equal-width histogram of every column over its finite [min, max] (last bin includes max)
+
+        Returns one {"edges", "counts"} dict per column (None for columns without finite values),
+        binned for all columns at once with a single bincount. Infinite values are left out, as
+        in the streaming profiler's histograms.
+        """
+        n_columns = len(self.columns)
+        results = [None] * n_columns
+        if not self.n_rows or not bins:
+            return results
+        finite = np.isfinite(self.block)
+        # -inf sorts first and +inf right before the NaNs, so the finite values are a slice of the sorted block
+        below = (self.block == -np.inf).sum(axis=1)
+        finite_count = finite.sum(axis=1)
+        has_values = finite_count > 0
+        lo = np.where(has_values, self.take_sorted(np.minimum(below, self.n_rows - 1)), 0.0)
+        hi = np.where(has_values, self.take_sorted(np.maximum(below + finite_count - 1, 0)), 0.0)
+        width = np.where(hi > lo, (hi - lo) / bins, 1.0)
+
+        with np.errstate(invalid='ignore'):
+            index = np.floor((self.filled - lo[:, None]) / width[:, None])
+        np.clip(index, 0, bins - 1, out=index)
+        index += (np.arange(n_columns) * bins)[:, None]
+        counts = np.bincount(index[finite].astype(np.int64), minlength=n_columns * bins).reshape(n_columns, bins)
+        del index, finite
+
+        for i in np.flatnonzero(has_values):
+            if hi[i] == lo[i]:
+                results[i] = {"edges": [float(lo[i]), float(hi[i])], "counts": [int(finite_count[i])]}
+                continue
+            edges = lo[i] + np.arange(bins + 1) * width[i]
+            edges[-1] = hi[i]
+            results[i] = {"edges": edges.tolist(), "counts": counts[i].tolist()}
+        return results
+
+    def compute(self, statistics=None):
+        """Run the requested (default: all registered) statistics; returns {column: {stat: value or None}}"""
+        names = list(statistics or STATISTICS)
+        results = {}
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            for name in names:
+                results[name] = STATISTICS[name](self)
+
+        return OrderedDict(
+            (column, {name: _optional_float(results[name][i]) for name in names})
+            for i, column in enumerate(self.columns)
+        )
+
+def _optional_float(value):
+    return None if pd.isna(value) else float(value)
+
+@register_statistic('missing')
+def _missing(batch):
+    return batch.block.shape[1] - batch.count
+
+@register_statistic('unique')
+def _unique(batch):
+    run_columns, _, _ = batch.runs
+    return np.bincount(run_columns, minlength=len(batch.columns))
+
+@register_statistic('mean')
+def _mean(batch):
+    return batch.mean
+
+@register_statistic('std')
+def _std(batch):
+    # Two-pass sample standard deviation (ddof=1), like pandas
+    deviations = batch.filled - batch.mean[:, None]
+    deviations[~batch.valid] = 0.0
+    np.multiply(deviations, deviations, out=deviations)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = deviations.sum(axis=1) / (batch.count - 1)
+    return np.where(batch.count > 1, np.sqrt(variance), np.nan)
+
+@register_statistic('min')
+def _min(batch):
+    if not batch.n_rows:
+        return np.full(len(batch.columns), np.nan)
+    return np.where(batch.count > 0, batch.sorted[:, 0], np.nan)
+
+@register_statistic('max')
+def _max(batch):
+    if not batch.n_rows:
+        return np.full(len(batch.columns), np.nan)
+    return np.where(batch.count > 0, batch.take_sorted(np.maximum(batch.count - 1, 0)), np.nan)
+
+@register_statistic('median')
+def _median(batch):
+    if not batch.n_rows:
+        return np.full(len(batch.columns), np.nan)
+    low = batch.take_sorted(np.maximum((batch.count - 1) // 2, 0))
+    high = batch.take_sorted(batch.count // 2)
+    return np.where(batch.count > 0, (low + high) / 2, np.nan)
+
+@register_statistic('mode')
+def _mode(batch):
+    """Most frequent value; ties go to the smallest value (as pandas' mode().iloc[0])"""
+    n_columns = len(batch.columns)
+    run_columns, lengths, values = batch.runs
+    modes = np.full(n_columns, np.nan)
+    if not len(lengths):
+        return modes
+    # Runs are ordered by column, then value: the first longest run of a column is its mode
+    longest = np.zeros(n_columns, dtype=lengths.dtype)
+    np.maximum.at(longest, run_columns, lengths)
+    candidates = np.where(lengths == longest[run_columns], np.arange(len(lengths)), len(lengths))
+    first = np.full(n_columns, len(lengths))
+    np.minimum.at(first, run_columns, candidates)
+    has_runs = first < len(lengths)
+    modes[has_runs] = values[first[has_runs]]
+    return modes
+
+def numeric_columns(df):
+    """Columns analyze_dataframe treats as numeric"""
+    return [column for column, dtype in df.dtypes.items() if pd.api.types.is_numeric_dtype(dtype)]
+
+def compute_numeric_stats(df, columns=None, statistics=None, histogram_bins=0, batch_bytes=None):
+    """Batched statistics for the numeric columns of df: {column: {stat: value or None}}
+
+    With histogram_bins, each column also gets a "histogram" entry. Columns are batched in groups
+    of at most batch_bytes (NUMERIC_BATCH_BYTES) of float64 data, so the block and its
+    intermediates (NaN mask, filled and sorted copies) stay bounded however wide the frame is.
+    """
+    columns = numeric_columns(df) if columns is None else columns
+    stats = OrderedDict()
+    if not columns:
+        return stats
+    batch_bytes = batch_bytes or Config.NUMERIC_BATCH_BYTES
+    group_size = max(1, batch_bytes // max(8 * len(df), 1))
+    for start in range(0, len(columns), group_size):
+        group = columns[start:start + group_size]
+        batch = NumericBatch(df, group)
+        stats.update(batch.compute(statistics))
+        if histogram_bins:
+            for column, histogram in zip(group, batch.histograms(histogram_bins)):
+                stats[column]["histogram"] = histogram
+        del batch
+    return stats
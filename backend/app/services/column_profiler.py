@@ -0,0 +1,464 @@
+import pandas as pd
+import numpy as np
+import logging
+from io import BytesIO
+from app.config import Config
+from app.services.sketches import HyperLogLog, KllSketch, FrequentItems, StreamingHistogram, sketch_from_dict
+from app.services.correlation import CorrelationAccumulator
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Streaming histograms keep this many bins per reported bin, so range doubling does not cost resolution
+HISTOGRAM_RESOLUTION = 8
+
+def resolve_dtype(dtype_counts):
+    """Resolve the column dtype pandas would infer over the whole file from per-chunk dtypes"""
+    dtypes = [np.dtype(d) if d in ('bool', 'int64', 'float64') else d for d in dtype_counts]
+    if not dtypes:
+        return 'float64'
+    if len(dtypes) == 1:
+        return str(dtypes[0])
+
+    # Mixed chunk dtypes: numeric chunks promote, anything else falls back to the text dtype
+    if all(isinstance(d, np.dtype) and d.kind in 'if' for d in dtypes):
+        return str(np.result_type(*dtypes))
+    for d in dtypes:
+        if not isinstance(d, np.dtype):
+            return d
+    return 'object'
+
+def _to_builtin(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+class ColumnAccumulator:
+    """Mergeable per-column statistics (Welford mean/variance, min/max, nulls, type and value counts)"""
+
+    def __init__(self, name, max_tracked_values=None, approximate=False, distinct_error=None, quantile_error=None):
+        self.name = name
+        self.max_tracked_values = max_tracked_values or Config.PROFILER_MAX_TRACKED_VALUES
+        self.approximate = approximate
+        self.missing = 0
+        self.dtype_counts = {}  # chunk dtype -> number of rows read with that dtype
+
+        # Numeric moments (Welford / Chan et al. parallel update)
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.histogram_bins = Config.PROFILER_HISTOGRAM_BINS
+        self.histogram = StreamingHistogram(self.histogram_bins * HISTOGRAM_RESOLUTION) if self.histogram_bins else None
+
+        # Bounded value frequencies for exact unique/mode/median on low-cardinality columns
+        self.value_counts = {}
+        self.values_overflowed = False
+        self.distinct_lower_bound = 0
+
+        # Approximate mode: mergeable sketches instead of the value table
+        self.hll = None
+        self.kll = None
+        self.frequent = None
+        if approximate:
+            self.hll = HyperLogLog.for_error(distinct_error or Config.APPROX_DISTINCT_ERROR)
+            self.kll = KllSketch.for_error(quantile_error or Config.APPROX_QUANTILE_ERROR)
+            self.frequent = FrequentItems(Config.APPROX_FREQUENT_ITEMS)
+
+    def update(self, col_data):
+        """Fold one chunk of the column into the accumulator"""
+        dtype = str(col_data.dtype)
+        self.dtype_counts[dtype] = self.dtype_counts.get(dtype, 0) + len(col_data)
+        self.missing += int(col_data.isnull().sum())
+
+        values = col_data.dropna()
+        if len(values) == 0:
+            return
+
+        if pd.api.types.is_numeric_dtype(values):
+            arr = values.to_numpy(dtype=np.float64)
+            chunk_mean = float(arr.mean())
+            self._merge_moments(len(arr), chunk_mean, float(((arr - chunk_mean) ** 2).sum()),
+                                float(arr.min()), float(arr.max()))
+            if self.histogram is not None:
+                self.histogram.update(arr)
+            if self.approximate:
+                self.kll.update(arr)
+
+        if self.approximate:
+            self.hll.update(values.to_numpy())
+            self.frequent.update(values.value_counts().to_dict())
+        else:
+            self._merge_value_counts(values.value_counts().to_dict())
+
+    def merge(self, other):
+        """Merge another accumulator for the same column (e.g. from another chunk or worker)"""
+        for dtype, count in other.dtype_counts.items():
+            self.dtype_counts[dtype] = self.dtype_counts.get(dtype, 0) + count
+        self.missing += other.missing
+        if other.n:
+            self._merge_moments(other.n, other.mean, other.m2, other.min, other.max)
+        if self.histogram is not None and other.histogram is not None:
+            self.histogram.merge(other.histogram)
+        if self.approximate:
+            self.hll.merge(other.hll)
+            self.kll.merge(other.kll)
+            self.frequent.merge(other.frequent)
+            return self
+        if other.values_overflowed:
+            self._overflow(other.distinct_lower_bound)
+        self._merge_value_counts(other.value_counts)
+        return self
+
+    def _merge_moments(self, n_b, mean_b, m2_b, min_b, max_b):
+        n_a = self.n
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * n_a * n_b / n
+        self.n = n
+        self.min = min_b if self.min is None else min(self.min, min_b)
+        self.max = max_b if self.max is None else max(self.max, max_b)
+
+    def _merge_value_counts(self, counts):
+        if self.values_overflowed:
+            self.distinct_lower_bound = max(self.distinct_lower_bound, len(counts))
+            return
+        for value, count in counts.items():
+            self.value_counts[value] = self.value_counts.get(value, 0) + count
+        if len(self.value_counts) > self.max_tracked_values:
+            self._overflow(len(self.value_counts))
+
+    def _overflow(self, distinct):
+        # Too many distinct values to track exactly - release the table to keep memory bounded
+        if not self.values_overflowed:
+            logger.info(f"Column {self.name} exceeded {self.max_tracked_values} distinct values, "
+                        f"unique/median/mode are no longer exact")
+            distinct = max(distinct, len(self.value_counts))
+        self.values_overflowed = True
+        self.value_counts = {}
+        self.distinct_lower_bound = max(self.distinct_lower_bound, distinct)
+
+    @property
+    def dtype(self):
+        return resolve_dtype(self.dtype_counts)
+
+    @property
+    def is_numeric(self):
+        dtype = self.dtype
+        return dtype in ('bool', 'int64', 'float64') or dtype.startswith(('int', 'float', 'uint'))
+
+    @property
+    def unique(self):
+        if self.approximate:
+            return self.hll.estimate()
+        if self.values_overflowed:
+            return self.distinct_lower_bound
+        return len(self.value_counts)
+
+    def std(self):
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else None
+
+    def median(self):
+        """Exact median from the tracked value counts (None once the table overflowed)"""
+        if self.approximate:
+            return self.kll.quantile(0.5)
+        if self.values_overflowed or not self.value_counts or not self.n:
+            return None
+        items = sorted((float(v), c) for v, c in self.value_counts.items())
+        total = sum(c for _, c in items)
+        lower_rank, upper_rank = (total - 1) // 2, total // 2
+        lower = upper = None
+        seen = 0
+        for value, count in items:
+            if lower is None and seen + count > lower_rank:
+                lower = value
+            if seen + count > upper_rank:
+                upper = value
+                break
+            seen += count
+        return (lower + upper) / 2
+
+    def mode(self):
+        """Most frequent value, smallest value first on ties (as pandas mode() sorts)"""
+        if self.approximate:
+            return self.frequent.most_frequent()
+        if self.values_overflowed or not self.value_counts:
+            return None
+        top = max(self.value_counts.values())
+        candidates = [v for v, c in self.value_counts.items() if c == top]
+        try:
+            return min(candidates)
+        except TypeError:
+            return min(candidates, key=str)
+
+    def to_stat(self):
+        """Build the column stat dict and summary line in the analyze_csv_data format"""
+        column, dtype, missing, unique = self.name, self.dtype, self.missing, self.unique
+        stat = {
+            "name": column,
+            "type": dtype,
+            "missing": int(missing),
+            "unique": int(unique)
+        }
+        if self.approximate or self.values_overflowed:
+            stat["unique_exact"] = False
+
+        if self.is_numeric:
+            try:
+                mode = self.mode()
+                stat.update({
+                    "mean": float(self.mean) if self.n else None,
+                    "std": self.std(),
+                    "min": float(self.min) if self.min is not None else None,
+                    "max": float(self.max) if self.max is not None else None,
+                    "median": self.median(),
+                    "mode": float(mode) if mode is not None else None,
+                })
+                if self.histogram is not None:
+                    stat["histogram"] = self.histogram.result(self.histogram_bins)
+                summary_line = f"Column '{column}' (numeric): min={stat['min']}, max={stat['max']}, mean={stat['mean']:.2f}, median={stat['median']}, missing={missing}, unique={unique}."
+            except Exception as e:
+                logger.warning(f"Could not analyze numeric column {column}: {e}")
+                stat.update({"mean": None, "std": None, "min": None, "max": None, "median": None, "mode": None})
+                summary_line = f"Column '{column}' (numeric): analysis failed, missing={missing}, unique={unique}."
+        else:
+            mode = self.mode()
+            stat["mode"] = str(mode) if mode is not None else None
+            summary_line = f"Column '{column}' (type: {dtype}): missing={missing}, unique={unique}, mode={stat['mode']}."
+
+        return stat, summary_line
+
+    def to_dict(self):
+        """Serialize the accumulator (including sketches) so it can be merged elsewhere"""
+        data = {
+            'name': self.name,
+            'approximate': self.approximate,
+            'max_tracked_values': self.max_tracked_values,
+            'missing': self.missing,
+            'dtype_counts': self.dtype_counts,
+            'n': self.n,
+            'mean': self.mean,
+            'm2': self.m2,
+            'min': self.min,
+            'max': self.max,
+            'value_counts': [[_to_builtin(v), int(c)] for v, c in self.value_counts.items()],
+            'values_overflowed': self.values_overflowed,
+            'distinct_lower_bound': self.distinct_lower_bound,
+            'histogram_bins': self.histogram_bins,
+            'histogram': self.histogram.to_dict() if self.histogram is not None else None
+        }
+        if self.approximate:
+            data['sketches'] = {
+                'hll': self.hll.to_dict(),
+                'kll': self.kll.to_dict(),
+                'frequent': self.frequent.to_dict()
+            }
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        acc = cls(data['name'], data['max_tracked_values'])
+        for key in ('approximate', 'missing', 'dtype_counts', 'n', 'mean', 'm2', 'min', 'max',
+                    'values_overflowed', 'distinct_lower_bound'):
+            setattr(acc, key, data[key])
+        acc.value_counts = {value: count for value, count in data['value_counts']}
+        acc.histogram_bins = data.get('histogram_bins', 0)
+        acc.histogram = sketch_from_dict(data['histogram']) if data.get('histogram') else None
+        if acc.approximate:
+            acc.hll = sketch_from_dict(data['sketches']['hll'])
+            acc.kll = sketch_from_dict(data['sketches']['kll'])
+            acc.frequent = sketch_from_dict(data['sketches']['frequent'])
+        return acc
+
+class CsvProfiler:
+    """Streaming CSV profiler that folds DataFrame chunks into mergeable column accumulators"""
+
+    def __init__(self, max_tracked_values=None, approximate=False, distinct_error=None, quantile_error=None,
+                 correlation=None):
+        self.max_tracked_values = max_tracked_values
+        self.approximate = approximate
+        self.distinct_error = distinct_error or Config.APPROX_DISTINCT_ERROR
+        self.quantile_error = quantile_error or Config.APPROX_QUANTILE_ERROR
+        self.columns = {}  # column name -> ColumnAccumulator (in file order)
+        self.row_count = 0
+        self.sample = []
+        if correlation is None:
+            correlation = Config.PROFILER_CORRELATION
+        self.correlation = CorrelationAccumulator() if correlation else None
+
+    def update(self, df):
+        """Fold one DataFrame chunk into the profile"""
+        if not self.sample:
+            self.sample = df.head(5).to_dict(orient='records')
+        self.row_count += len(df)
+        for column in df.columns:
+            if column not in self.columns:
+                self.columns[column] = ColumnAccumulator(column, self.max_tracked_values, self.approximate,
+                                                         self.distinct_error, self.quantile_error)
+            self.columns[column].update(df[column])
+        if self.correlation is not None:
+            self.correlation.update(df)
+        return self
+
+    def merge(self, other):
+        """Merge a profile of a later part of the same file"""
+        if not self.sample:
+            self.sample = other.sample
+        self.row_count += other.row_count
+        for column, acc in other.columns.items():
+            if column in self.columns:
+                self.columns[column].merge(acc)
+            else:
+                self.columns[column] = acc
+        if self.correlation is not None and other.correlation is not None:
+            self.correlation.merge(other.correlation)
+        else:
+            self.correlation = None
+        return self
+
+    def result(self):
+        """Build the analysis payload (schema, sample, row_count, columns, summary)"""
+        col_stats = []
+        summary_lines = []
+        for acc in self.columns.values():
+            stat, summary_line = acc.to_stat()
+            col_stats.append(stat)
+            summary_lines.append(summary_line)
+
+        schema = [(name, acc.dtype) for name, acc in self.columns.items()]
+        summary_para = f"The dataset contains {self.row_count} rows and {len(self.columns)} columns. " + ' '.join(summary_lines)
+
+        result = {
+            "schema": schema,
+            "sample": self.sample,
+            "row_count": self.row_count,
+            "columns": col_stats,
+            "summary": summary_para
+        }
+        if self.correlation is not None:
+            # Columns that ended up non-numeric (e.g. text in a later chunk) are left out
+            result["correlation"] = self.correlation.result([name for name, acc in self.columns.items() if acc.is_numeric])
+        if self.approximate:
+            result["approximation"] = self.error_bounds()
+        return result
+
+    def error_bounds(self):
+        """Error bounds of the sketches used in approximate mode"""
+        hll = HyperLogLog.for_error(self.distinct_error)
+        kll = KllSketch.for_error(self.quantile_error)
+        return {
+            "distinct": {"method": "hyperloglog", "precision": hll.precision, "relative_error": hll.relative_error},
+            "median": {"method": "kll", "k": kll.k, "rank_error": kll.rank_error},
+            "mode": {"method": "misra-gries", "capacity": Config.APPROX_FREQUENT_ITEMS}
+        }
+
+    def to_dict(self):
+        """Serialize the profile so partial results can be merged across chunks, files and workers"""
+        return {
+            'approximate': self.approximate,
+            'distinct_error': self.distinct_error,
+            'quantile_error': self.quantile_error,
+            'max_tracked_values': self.max_tracked_values,
+            'row_count': self.row_count,
+            'sample': self.sample,
+            'columns': [acc.to_dict() for acc in self.columns.values()],
+            'correlation': self.correlation.to_dict() if self.correlation is not None else None
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        profiler = cls(data['max_tracked_values'], data['approximate'], data['distinct_error'], data['quantile_error'],
+                       correlation=False)
+        if data.get('correlation'):
+            profiler.correlation = CorrelationAccumulator.from_dict(data['correlation'])
+        profiler.row_count = data['row_count']
+        profiler.sample = data['sample']
+        for column in data['columns']:
+            profiler.columns[column['name']] = ColumnAccumulator.from_dict(column)
+        return profiler
+
+def profile_csv_stream(source, chunksize=None, max_tracked_values=None, approximate=False, names=None):
+    """Profile a CSV file-like object chunk by chunk with bounded memory
+
+    Pass names for headerless input (e.g. a byte range from the middle of a file).
+    """
+    chunksize = chunksize or Config.PROFILER_CHUNK_ROWS
+    profiler = CsvProfiler(max_tracked_values, approximate=approximate)
+    header_options = {'header': None, 'names': names} if names is not None else {}
+
+    for i, chunk in enumerate(pd.read_csv(source, chunksize=chunksize, **header_options)):
+        logger.info(f"Profiling chunk {i} ({len(chunk)} rows)")
+        profiler.update(chunk)
+
+    return profiler
+
+class IncrementalCsvProfiler:
+    """Profile CSV bytes as they arrive (e.g. teed from an upload) without holding the whole file
+
+    Batches are cut only at newlines outside quoted fields, so a quoted field containing newlines
+    stays in one record.
+    """
+
+    def __init__(self, approximate=False, batch_bytes=None):
+        self.profiler = CsvProfiler(approximate=approximate)
+        self.batch_bytes = batch_bytes or Config.PROFILER_BATCH_BYTES
+        self.names = None
+        self._pending = bytearray()
+
+    def feed(self, chunk):
+        """Add the next chunk of raw bytes; complete records are parsed in batches"""
+        self._pending += chunk
+        if len(self._pending) >= self.batch_bytes:
+            self._parse(final=False)
+
+    def close(self):
+        """Parse whatever is left (including a last line without a trailing newline)"""
+        self._parse(final=True)
+        return self.profiler
+
+    def _parse(self, final):
+        if final:
+            cut = len(self._pending)
+        else:
+            cut = self._record_end()
+            if cut == 0:
+                return
+        records = bytes(self._pending[:cut])
+        del self._pending[:cut]
+
+        if self.names is None:
+            header_end = records.find(b'\n')
+            header = records if header_end == -1 else records[:header_end + 1]
+            self.names = list(pd.read_csv(BytesIO(header), nrows=0).columns)
+            records = records[len(header):]
+        if not records.strip():
+            return
+
+        df = pd.read_csv(BytesIO(records), header=None, names=self.names)
+        logger.info(f"Profiling {len(df)} streamed rows")
+        self.profiler.update(df)
+
+    def _record_end(self):
+        """End of the last complete record in the pending bytes (0 if there is none)
+
+        The pending bytes start at a record boundary, so a newline ends a record when an even
+        number of quote characters precedes it.
+        """
+        quotes = self._pending.count(b'"')
+        end = len(self._pending)
+        newline = self._pending.rfind(b'\n')
+        while newline >= 0:
+            quotes -= self._pending.count(b'"', newline, end)
+            if quotes % 2 == 0:
+                break
+            end = newline
+            newline = self._pending.rfind(b'\n', 0, newline)
+        return newline + 1
+
+    def result(self):
+        result = self.profiler.result()
+        if not self.profiler.columns and self.names:
+            # Header-only input: report the columns with empty stats
+            self.profiler.update(pd.DataFrame(columns=self.names))
+            result = self.profiler.result()
+        return result
@@ -0,0 +1,206 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from app.config import Config
+from app.services.metrics import span
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pa_parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Bumped when the CSV conversion changes, so sidecars written by an older conversion are not read
+SIDECAR_FORMAT = 2
+
+def sidecar_enabled():
+    """Sidecars need pyarrow and can be switched off with SIDECAR_ENABLED=false"""
+    return Config.SIDECAR_ENABLED and PYARROW_AVAILABLE
+
+def _sidecar_stem(hdfs_path):
+    return hashlib.sha1(hdfs_path.encode('utf-8')).hexdigest()[:16]
+
+def local_sidecar_path(hdfs_path, modification_time):
+    """Arrow IPC sidecar in the local cache directory, keyed by path and modificationTime"""
+    return os.path.join(Config.SIDECAR_DIR, f"{_sidecar_stem(hdfs_path)}_{modification_time}_v{SIDECAR_FORMAT}.arrow")
+
+def hdfs_sidecar_path(hdfs_path, modification_time):
+    """Parquet sidecar next to the data on HDFS (for Spark), keyed by path and modificationTime"""
+    directory, _, name = hdfs_path.rpartition('/')
+    return f"{directory}/.sidecars/{name}.{modification_time}.v{SIDECAR_FORMAT}.parquet"
+
+def has_local_sidecar(hdfs_path, modification_time):
+    return sidecar_enabled() and os.path.exists(local_sidecar_path(hdfs_path, modification_time))
+
+# Strings pandas.read_csv reads as missing by default (its STR_NA_VALUES), in every column type
+PANDAS_NA_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+]
+
+class _PrefixedReader(io.RawIOBase):
+    """Readable stream of bytes already read from a source followed by the rest of the source"""
+
+    def __init__(self, prefix, source):
+        self.prefix = memoryview(prefix)
+        self.source = source
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.prefix:
+            count = min(len(buffer), len(self.prefix))
+            buffer[:count] = self.prefix[:count]
+            self.prefix = self.prefix[count:]
+            return count
+        data = self.source.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def _convert_options(column_types=None):
+    return pa_csv.ConvertOptions(null_values=PANDAS_NA_VALUES, strings_can_be_null=True,
+                                 column_types=column_types)
+
+def open_csv_batches(source, column_names=None, block_bytes=None):
+    """Stream CSV as Arrow record batches with the types and nulls pandas.read_csv would produce
+
+    Types are inferred from the first block (SIDECAR_BLOCK_BYTES) and then fixed. Arrow infers
+    date/time columns that pandas keeps as strings, so those are read as strings; columns that are
+    empty in the first block are read as float64, as pandas reads an all-missing column. A value
+    that does not fit its column type in a later block raises pyarrow.ArrowInvalid while iterating.
+    Pass column_names for headerless input (e.g. the appended tail of a file).
+    """
+    block_bytes = block_bytes or Config.SIDECAR_BLOCK_BYTES
+    read_options = pa_csv.ReadOptions(block_size=block_bytes, column_names=column_names)
+    # The reader infers its types from the first block alone - its complete lines - so the same
+    # lines give the same types here
+    head = source.read(block_bytes)
+    lines = head[:head.rfind(b'\n') + 1] or head
+    schema = pa_csv.open_csv(io.BytesIO(lines), read_options=read_options,
+                             convert_options=_convert_options()).schema
+    # (pandas reads the columns of a header-only file as object, so those stay null-typed)
+    has_rows = lines.count(b'\n') > (0 if column_names else 1)
+    column_types = {}
+    for field in schema:
+        if pa.types.is_temporal(field.type):
+            column_types[field.name] = pa.string()
+        elif pa.types.is_null(field.type) and has_rows:
+            column_types[field.name] = pa.float64()
+    stream = io.BufferedReader(_PrefixedReader(head, source), buffer_size=block_bytes)
+    return pa_csv.open_csv(stream, read_options=read_options, convert_options=_convert_options(column_types))
+
+def iter_csv_frames(source, column_names=None):
+    """Yield CSV as pandas DataFrames parsed by the sidecar's reader (see open_csv_batches)"""
+    for batch in open_csv_batches(source, column_names):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+def _unconvertible_marker(hdfs_path, modification_time):
+    return os.path.join(Config.SIDECAR_DIR, f"{_sidecar_stem(hdfs_path)}_{modification_time}_v{SIDECAR_FORMAT}.skip")
+
+def sidecar_unconvertible(hdfs_path, modification_time):
+    """Whether converting this file version failed before (its column types change after the first block)"""
+    return os.path.exists(_unconvertible_marker(hdfs_path, modification_time))
+
+def _remove_other_versions(hdfs_path, keep):
+    stem = _sidecar_stem(hdfs_path)
+    for name in os.listdir(Config.SIDECAR_DIR):
+        path = os.path.join(Config.SIDECAR_DIR, name)
+        if name.startswith(f"{stem}_") and name.endswith(('.arrow', '.skip')) and path != keep:
+            os.remove(path)
+
+def write_local_sidecar(hdfs_path, modification_time, batches):
+    """Write record batches to an Arrow IPC file as they arrive and drop sidecars of older versions"""
+    os.makedirs(Config.SIDECAR_DIR, exist_ok=True)
+    target = local_sidecar_path(hdfs_path, modification_time)
+
+    # Write to a temp file first so readers never see a partial sidecar
+    fd, tmp_path = tempfile.mkstemp(dir=Config.SIDECAR_DIR, suffix='.tmp')
+    os.close(fd)
+    rows = 0
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa_ipc.new_file(sink, batches.schema) as writer:
+                for batch in batches:
+                    writer.write_table(pa.Table.from_batches([batch]), max_chunksize=Config.SIDECAR_BATCH_ROWS)
+                    rows += batch.num_rows
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, target)
+    _remove_other_versions(hdfs_path, target)
+
+    logger.info(f"Wrote columnar sidecar for {hdfs_path} ({rows} rows) to {target}")
+    return target
+
+def write_hdfs_sidecar(hdfs_path, modification_time):
+    """Upload a Parquet copy of the local sidecar next to the file on HDFS for Spark reads"""
+    from app.services.webhdfs_client import get_client
+
+    reader = open_sidecar(hdfs_path, modification_time)
+    with tempfile.TemporaryFile() as buffer:
+        with pa_parquet.ParquetWriter(buffer, reader.schema) as writer:
+            for i in range(reader.num_record_batches):
+                writer.write_batch(reader.get_batch(i))
+        buffer.seek(0)
+        target = hdfs_sidecar_path(hdfs_path, modification_time)
+        get_client().create(target, buffer)
+    logger.info(f"Wrote Parquet sidecar for {hdfs_path} to HDFS {target}")
+    return target
+
+def materialize_sidecar(hdfs_path, modification_time, source):
+    """Convert a CSV stream into the columnar sidecar(s) for this file version, block by block
+
+    Memory stays bounded by SIDECAR_BLOCK_BYTES whatever the file size. Returns the sidecar path,
+    or None when a later block does not fit the column types of the first one: the version is then
+    marked so it is analyzed from CSV without another conversion attempt.
+    """
+    try:
+        with span('sidecar.write'):
+            path = write_local_sidecar(hdfs_path, modification_time, open_csv_batches(source))
+    except pa.ArrowInvalid as e:
+        logger.warning(f"Cannot convert {hdfs_path} to a columnar sidecar, analyzing it from CSV: {e}")
+        os.makedirs(Config.SIDECAR_DIR, exist_ok=True)
+        with open(_unconvertible_marker(hdfs_path, modification_time), 'w'):
+            pass
+        _remove_other_versions(hdfs_path, _unconvertible_marker(hdfs_path, modification_time))
+        return None
+    if Config.SIDECAR_HDFS:
+        try:
+            write_hdfs_sidecar(hdfs_path, modification_time)
+        except Exception as e:
+            logger.warning(f"Could not write Parquet sidecar to HDFS for {hdfs_path}: {e}")
+    return path
+
+def open_sidecar(hdfs_path, modification_time):
+    """Memory-map the sidecar and return an Arrow IPC file reader"""
+    source = pa.memory_map(local_sidecar_path(hdfs_path, modification_time), 'r')
+    return pa_ipc.open_file(source)
+
+def read_sidecar_columns(hdfs_path, modification_time, columns=None, categories=None):
+    """Read (a projection of) the sidecar as a pandas DataFrame via zero-copy memory-mapped batches
+
+    Columns named in categories are dictionary-encoded by Arrow into pandas categoricals.
+    """
+    table = open_sidecar(hdfs_path, modification_time).read_all()
+    if columns is not None:
+        table = table.select(columns)
+    return table.to_pandas(categories=categories)
+
+def iter_sidecar_frames(hdfs_path, modification_time, columns=None):
+    """Yield the sidecar record batch by record batch as pandas DataFrames"""
+    reader = open_sidecar(hdfs_path, modification_time)
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        if columns is not None:
+            batch = batch.select(columns)
+        yield batch.to_pandas()
@@ -0,0 +1,238 @@
+import bz2
+import io
+import logging
+import os
+import zlib
+from app.config import Config
+from app.services.metrics import add_bytes
+from app.services.webhdfs_client import get_client
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Codec -> (file extension, magic bytes at the start of every compressed stream)
+CODECS = {
+    'gzip': ('.gz', b'\x1f\x8b'),
+    'bz2': ('.bz2', b'BZh'),
+    'zstd': ('.zst', b'\x28\xb5\x2f\xfd'),
+    'lz4': ('.lz4', b'\x04\x22\x4d\x18')
+}
+MAGIC_BYTES = 4
+
+# Codecs Hadoop (and so Spark) decompresses by file extension. Hadoop's Lz4Codec uses its own block
+# format, so LZ4 frame files are not among them; .zst needs a libhadoop built with zstd.
+HADOOP_CODECS = ('gzip', 'bz2', 'zstd')
+# Codecs whose files Hadoop splits into several input partitions
+SPLITTABLE_CODECS = ('bz2',)
+
+def codec_available(codec):
+    """Whether the package a codec needs is installed (gzip and bz2 are in the standard library)"""
+    if codec == 'zstd':
+        return zstandard is not None
+    if codec == 'lz4':
+        return lz4_frame is not None
+    return codec in CODECS
+
+def resolve_codec(name):
+    """Codec for a setting or request parameter: None for 'none'/empty, ValueError if unknown or not installed"""
+    name = (name or 'none').strip().lower()
+    if name in ('none', 'false', 'off'):
+        return None
+    if name not in CODECS:
+        raise ValueError(f"Unknown compression codec: {name} (choose from none, {', '.join(CODECS)})")
+    if not codec_available(name):
+        raise ValueError(f"Compression codec {name} needs the {'zstandard' if name == 'zstd' else 'lz4'} package")
+    return name
+
+def codec_from_name(name):
+    """Codec implied by a file name's extension, or None"""
+    name = (name or '').lower()
+    for codec, (extension, _) in CODECS.items():
+        if name.endswith(extension):
+            return codec
+    return None
+
+def codec_from_magic(head):
+    """Codec whose magic bytes start head, or None"""
+    for codec, (_, magic) in CODECS.items():
+        if head.startswith(magic):
+            # 'BZh' is printable: also require the block size digit so a CSV header cannot match
+            if codec == 'bz2' and head[3:4] not in b'123456789':
+                continue
+            return codec
+    return None
+
+def detect_codec(name=None, head=None):
+    """Codec of a file from its first bytes when they are known, otherwise from its extension"""
+    if head:
+        return codec_from_magic(head)
+    return codec_from_name(name)
+
+def compressed_name(name, codec):
+    """File name with the codec's extension appended (unless it already has it)"""
+    extension = CODECS[codec][0]
+    return name if name.lower().endswith(extension) else name + extension
+
+class StreamDecompressor:
+    """Incremental decompressor that continues across concatenated streams (e.g. multi-member gzip)"""
+
+    def __init__(self, codec):
+        if not codec_available(codec):
+            raise ValueError(f"Cannot decompress {codec} data: the codec's package is not installed")
+        self.codec = codec
+        self._decompressor = self._new()
+        self._in_stream = False
+
+    def _new(self):
+        if self.codec == 'gzip':
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self.codec == 'bz2':
+            return bz2.BZ2Decompressor()
+        if self.codec == 'zstd':
+            return zstandard.ZstdDecompressor().decompressobj()
+        return lz4_frame.LZ4FrameDecompressor()
+
+    def decompress(self, data):
+        output = []
+        while data:
+            self._in_stream = True
+            output.append(self._decompressor.decompress(data))
+            if not self._decompressor.eof:
+                break
+            # End of one stream: whatever follows is the next one
+            data = self._decompressor.unused_data
+            self._decompressor = self._new()
+            self._in_stream = False
+        return b''.join(output)
+
+    def finish(self):
+        """Raise EOFError if the input ended inside a compressed stream"""
+        if self._in_stream:
+            raise EOFError(f"Compressed {self.codec} data ended before the end-of-stream marker")
+
+class _DecompressingReader(io.RawIOBase):
+    """Readable stream of the decompressed bytes of a compressed source stream"""
+
+    def __init__(self, source, codec, chunk_bytes):
+        self.source = source
+        self.codec = codec
+        self.chunk_bytes = chunk_bytes
+        self.decompressor = StreamDecompressor(codec)
+        self.compressed_bytes = 0
+        self.decompressed_bytes = 0
+        self._pending = memoryview(b'')
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        # Only one source chunk is inflated at a time, so memory stays bounded by chunk x ratio
+        while not self._pending and not self._eof:
+            chunk = self.source.read(self.chunk_bytes)
+            if not chunk:
+                self._eof = True
+                self.decompressor.finish()
+                break
+            self.compressed_bytes += len(chunk)
+            self._pending = memoryview(self.decompressor.decompress(chunk))
+        count = min(len(buffer), len(self._pending))
+        buffer[:count] = self._pending[:count]
+        self._pending = self._pending[count:]
+        self.decompressed_bytes += count
+        return count
+
+    def close(self):
+        if not self.closed and self.compressed_bytes:
+            add_bytes('decompressed', self.decompressed_bytes)
+            logger.info(f"Decompressed {self.compressed_bytes} {self.codec} bytes to {self.decompressed_bytes} "
+                        f"({self.decompressed_bytes / self.compressed_bytes:.1f}x)")
+        super().close()
+
+def _peek(stream, size):
+    if hasattr(stream, 'peek'):
+        return stream.peek(size)[:size]
+    position = stream.tell()
+    head = stream.read(size)
+    stream.seek(position)
+    return head
+
+def open_decompressed(stream, name=None, chunk_bytes=None):
+    """Wrap a binary stream so it reads decompressed CSV bytes (returned as is when not compressed)
+
+    The codec comes from the stream's magic bytes (so a mis-named file is still read correctly);
+    the stream must support peek() or seek(). Decompression is streamed chunk by chunk, the whole
+    file is never inflated in memory.
+    """
+    codec = detect_codec(name, _peek(stream, MAGIC_BYTES))
+    if codec is None:
+        return stream
+    chunk_bytes = chunk_bytes or Config.DOWNLOAD_CHUNK_BYTES
+    logger.info(f"Reading {name or 'stream'} as {codec}-compressed data")
+    return io.BufferedReader(_DecompressingReader(stream, codec, chunk_bytes), buffer_size=chunk_bytes)
+
+class _LZ4Compressor:
+    """LZ4 frame compressor with the compress/flush interface of zlib and bz2"""
+
+    def __init__(self, level):
+        self._compressor = lz4_frame.LZ4FrameCompressor(compression_level=level)
+        self._header = self._compressor.begin()
+
+    def compress(self, data):
+        header, self._header = self._header, b''
+        return header + self._compressor.compress(data)
+
+    def flush(self):
+        header, self._header = self._header, b''
+        return header + self._compressor.flush()
+
+def _compressor(codec, level=None):
+    level = level or Config.UPLOAD_COMPRESSION_LEVEL or None
+    if codec == 'gzip':
+        return zlib.compressobj(level or 6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if codec == 'bz2':
+        return bz2.BZ2Compressor(level or 9)
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=level or 3).compressobj()
+    return _LZ4Compressor(level or 0)
+
+def compress_chunks(chunks, codec, level=None):
+    """Compress an iterator of byte chunks into an iterator of compressed chunks (one stream)"""
+    compressor = _compressor(codec, level)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    data = compressor.flush()
+    if data:
+        yield data
+
+def iter_file_chunks(f, chunk_bytes=None):
+    """Byte chunks of an open binary file"""
+    chunk_bytes = chunk_bytes or Config.DOWNLOAD_CHUNK_BYTES
+    return iter(lambda: f.read(chunk_bytes), b'')
+
+def hdfs_file_codec(hdfs_path):
+    """Codec of an HDFS file from its magic bytes (one small ranged OPEN), or None"""
+    response = get_client().open(hdfs_path, offset=0, length=MAGIC_BYTES)
+    try:
+        return detect_codec(hdfs_path, response.content)
+    finally:
+        response.close()
+
+def local_file_codec(local_path):
+    """Codec of a local file from its magic bytes, or None"""
+    if not os.path.exists(local_path):
+        return None
+    with open(local_path, 'rb') as f:
+        return detect_codec(local_path, f.read(MAGIC_BYTES))
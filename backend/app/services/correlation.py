@@ -0,0 +1,243 @@
+import logging
+import numpy as np
+import pandas as pd
+from app.config import Config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+def correlation_sample_fraction(column_count, full_pass_columns=None):
+    """Fraction of rows used for a matrix over column_count columns
+
+    Up to CORRELATION_FULL_PASS_COLUMNS columns every row is used. The cost per row grows with the
+    square of the width, so wider matrices use a row sample that keeps the work per chunk about that
+    of a CORRELATION_FULL_PASS_COLUMNS-wide matrix.
+    """
+    full_pass_columns = full_pass_columns or Config.CORRELATION_FULL_PASS_COLUMNS
+    if column_count <= full_pass_columns:
+        return 1.0
+    return (full_pass_columns / column_count) ** 2
+
+def _optional(matrix):
+    return [[None if np.isnan(value) else float(value) for value in row] for row in matrix]
+
+def correlation_payload(columns, pearson, covariance, rows, sample_fraction=1.0, omitted_columns=()):
+    """The "correlation" entry of an analysis result (NaN, e.g. of a constant column, as null)"""
+    return {
+        "method": "pearson",
+        "columns": list(columns),
+        "pearson": _optional(pearson),
+        "covariance": _optional(covariance),
+        "rows": int(rows),
+        "sampled": sample_fraction < 1.0,
+        "sample_fraction": sample_fraction,
+        "omitted_columns": list(omitted_columns)
+    }
+
+class CorrelationAccumulator:
+    """Mergeable pairwise-complete Pearson correlation/covariance of the numeric columns
+
+    Per column pair (i, j), over the rows where both are present: the row count N, the sums S of
+    column i, its sums of squares Q and the cross-products P. Each chunk adds four matrix products
+    of its (rows x columns) block, so one pass over the file gives every pair's statistics. Values
+    are shifted by a per-column reference (a mean of its first values) to keep the sums well
+    conditioned; accumulators with different shifts are re-centered when merged.
+    """
+
+    def __init__(self, max_columns=None, full_pass_columns=None):
+        self.max_columns = max_columns or Config.CORRELATION_MAX_COLUMNS
+        self.full_pass_columns = full_pass_columns or Config.CORRELATION_FULL_PASS_COLUMNS
+        self.columns = None  # numeric columns of the first chunk, at most max_columns
+        self.omitted = []  # numeric columns beyond the cap
+        self.excluded = set()  # columns read as non-numeric in some chunk
+        self.sample_fraction = 1.0
+        self.rows_seen = 0
+        self.rows_used = 0
+        self._rng = np.random.default_rng(0)
+
+    def _allocate(self, columns):
+        k = len(columns)
+        self.columns = list(columns)
+        self.shift = np.zeros(k)
+        self.shift_set = np.zeros(k, dtype=bool)
+        self.n = np.zeros((k, k))
+        self.s = np.zeros((k, k))
+        self.q = np.zeros((k, k))
+        self.p = np.zeros((k, k))
+
+    def update(self, df):
+        """Fold one DataFrame chunk into the sums and cross-products"""
+        numeric = []
+        for column in df.columns:
+            if pd.api.types.is_numeric_dtype(df[column]):
+                numeric.append(column)
+            else:
+                self.excluded.add(column)
+        if self.columns is None:
+            self.omitted = numeric[self.max_columns:]
+            self._allocate(numeric[:self.max_columns])
+            self.sample_fraction = correlation_sample_fraction(len(self.columns), self.full_pass_columns)
+            if self.omitted or self.sample_fraction < 1.0:
+                logger.info(f"Correlation over {len(self.columns)} of {len(numeric)} numeric columns, "
+                            f"sampling {self.sample_fraction:.2%} of the rows")
+        self.rows_seen += len(df)
+        columns = [column for column in self.columns if column not in self.excluded]
+        if not columns or not len(df):
+            return self
+
+        if self.sample_fraction < 1.0:
+            df = df[self._rng.random(len(df)) < self.sample_fraction]
+        self.rows_used += len(df)
+        index = [self.columns.index(column) for column in columns]
+        block = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(block)
+
+        # Columns seen for the first time are shifted by their mean in this chunk (their sums are still 0)
+        counts = valid.sum(axis=0)
+        new = ~self.shift_set[index] & (counts > 0)
+        if new.any():
+            with np.errstate(invalid='ignore'):
+                means = np.nansum(block, axis=0) / counts
+            positions = np.asarray(index)[new]
+            self.shift[positions] = means[new]
+            self.shift_set[positions] = True
+
+        centered = np.where(valid, block - self.shift[index], 0.0)
+        grid = np.ix_(index, index)
+        self.p[grid] += centered.T @ centered
+        if valid.all():
+            # No missing values: every pair sees every row
+            self.n[grid] += len(block)
+            self.s[grid] += centered.sum(axis=0)[:, None]
+            self.q[grid] += (centered ** 2).sum(axis=0)[:, None]
+        else:
+            mask = valid.astype(np.float64)
+            self.n[grid] += mask.T @ mask
+            self.s[grid] += centered.T @ mask
+            self.q[grid] += (centered ** 2).T @ mask
+        return self
+
+    def _recenter(self, shift):
+        """Express the sums relative to a new per-column shift"""
+        d = self.shift - shift
+        s = self.s
+        self.p = self.p + d[None, :] * s + d[:, None] * s.T + np.outer(d, d) * self.n
+        self.q = self.q + 2 * d[:, None] * s + (d ** 2)[:, None] * self.n
+        self.s = s + d[:, None] * self.n
+        self.shift = shift.copy()
+
+    def merge(self, other):
+        """Merge the accumulator of a later part of the same file"""
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            rng = self._rng
+            self.__dict__.update(other.copy().__dict__)
+            self._rng = rng
+            return self
+        self.excluded |= other.excluded
+        self.rows_seen += other.rows_seen
+        self.rows_used += other.rows_used
+        self.sample_fraction = min(self.sample_fraction, other.sample_fraction)
+
+        for column in other.columns:
+            if column not in self.columns:
+                self._grow(column)
+        index = [self.columns.index(column) for column in other.columns]
+        # Columns without values here take the other side's shift, then both use the same reference
+        adopt = ~self.shift_set[index] & other.shift_set
+        shift = self.shift.copy()
+        shift[np.asarray(index)[adopt]] = other.shift[adopt]
+        self.shift_set[np.asarray(index)[adopt]] = True
+        self._recenter(shift)
+        other_sums = other.copy()
+        other_sums._recenter(shift[index])
+
+        grid = np.ix_(index, index)
+        self.n[grid] += other_sums.n
+        self.s[grid] += other_sums.s
+        self.q[grid] += other_sums.q
+        self.p[grid] += other_sums.p
+        return self
+
+    def copy(self):
+        acc = CorrelationAccumulator(self.max_columns, self.full_pass_columns)
+        acc.__dict__.update({key: value.copy() if isinstance(value, (np.ndarray, list, set)) else value
+                             for key, value in self.__dict__.items() if key != '_rng'})
+        return acc
+
+    def _grow(self, column):
+        k = len(self.columns)
+        self.columns.append(column)
+        self.shift = np.append(self.shift, 0.0)
+        self.shift_set = np.append(self.shift_set, False)
+        for name in ('n', 's', 'q', 'p'):
+            grown = np.zeros((k + 1, k + 1))
+            grown[:k, :k] = getattr(self, name)
+            setattr(self, name, grown)
+
+    def matrices(self, columns=None):
+        """(columns, pearson, covariance) over the given numeric columns (default: all kept ones)"""
+        keep = [column for column in (columns or self.columns or []) if column in (self.columns or [])
+                and column not in self.excluded]
+        if not keep:
+            return [], np.zeros((0, 0)), np.zeros((0, 0))
+        index = [self.columns.index(column) for column in keep]
+        grid = np.ix_(index, index)
+        n, s, q, p = self.n[grid], self.s[grid], self.q[grid], self.p[grid]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Pair statistics with ddof=1, as pandas DataFrame.cov/corr compute them
+            covariance = (p - s * s.T / n) / (n - 1)
+            variance = (q - s * s / n) / (n - 1)
+            pearson = covariance / np.sqrt(variance * variance.T)
+        covariance[n < 2] = np.nan
+        pearson[(n < 2) | (variance <= 0) | (variance.T <= 0)] = np.nan
+        return keep, np.clip(pearson, -1.0, 1.0), covariance
+
+    def result(self, columns=None):
+        keep, pearson, covariance = self.matrices(columns)
+        return correlation_payload(keep, pearson, covariance, self.rows_used, self.sample_fraction, self.omitted)
+
+    def to_dict(self):
+        data = {
+            'max_columns': self.max_columns,
+            'full_pass_columns': self.full_pass_columns,
+            'columns': self.columns,
+            'omitted': self.omitted,
+            'excluded': sorted(self.excluded),
+            'sample_fraction': self.sample_fraction,
+            'rows_seen': self.rows_seen,
+            'rows_used': self.rows_used
+        }
+        if self.columns is not None:
+            data.update({
+                'shift': self.shift.tolist(),
+                'shift_set': self.shift_set.tolist(),
+                **{name: getattr(self, name).tolist() for name in ('n', 's', 'q', 'p')}
+            })
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        acc = cls(data['max_columns'], data['full_pass_columns'])
+        acc.omitted = data['omitted']
+        acc.excluded = set(data['excluded'])
+        acc.sample_fraction = data['sample_fraction']
+        acc.rows_seen = data['rows_seen']
+        acc.rows_used = data['rows_used']
+        if data['columns'] is not None:
+            acc.columns = list(data['columns'])
+            acc.shift = np.asarray(data['shift'], dtype=np.float64)
+            acc.shift_set = np.asarray(data['shift_set'], dtype=bool)
+            k = len(acc.columns)
+            for name in ('n', 's', 'q', 'p'):
+                setattr(acc, name, np.asarray(data[name], dtype=np.float64).reshape(k, k))
+        return acc
+
+def dataframe_correlation(df, block_rows=None):
+    """Correlation payload of a loaded DataFrame, accumulated in row blocks to bound the temporaries"""
+    block_rows = block_rows or Config.PROFILER_CHUNK_ROWS
+    acc = CorrelationAccumulator()
+    for start in range(0, max(len(df), 1), block_rows):
+        acc.update(df.iloc[start:start + block_rows])
+    return acc.result()
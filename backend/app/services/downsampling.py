@@ -0,0 +1,195 @@
+import json
+import logging
+import warnings
+import numpy as np
+import pandas as pd
+from app.config import Config
+from app.services.analysis_cache import metadata_cache, file_version
+from app.services.hdfs_utils import get_file_status
+from app.services.simple_analyzer import normalize_hdfs_path, iter_column_frames
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+METHODS = ('lttb', 'minmax')
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that best keep the shape of (x, y)"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        # Average of the next bucket (just the last point for the final bucket)
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+class BucketReducer:
+    """Streaming min/max bucketing of a series over equal x intervals with bounded memory
+
+    Points are grouped by floor(x / width); only the points with the smallest and largest x and
+    the smallest and largest y of each bucket are kept (just the y extremes with keep_ends=False).
+    The width starts at the power of two that fits the first x range seen into `buckets` buckets
+    and doubles whenever the x range no longer fits. Buckets of the doubled width are unions of
+    old buckets, so reducing the kept points gives the same result as bucketing all points at the
+    final width, and memory stays O(buckets + chunk). Chunks may arrive in any x order.
+    """
+
+    def __init__(self, buckets, keep_ends=True):
+        self.buckets = max(int(buckets), 1)
+        self.keep_ends = keep_ends
+        self.width = None  # unset until two different x values have been seen
+        self.rows = np.empty(0, dtype=np.int64)
+        self.x = np.empty(0, dtype=np.float64)
+        self.y = np.empty(0, dtype=np.float64)
+
+    def update(self, rows, x, y):
+        """Add a chunk of points (rows are file positions, used to order points with equal x)"""
+        if not len(rows):
+            return self
+        self.rows = np.concatenate([self.rows, rows])
+        self.x = np.concatenate([self.x, x])
+        self.y = np.concatenate([self.y, y])
+        lo, hi = self.x.min(), self.x.max()
+        if self.width is None and hi > lo:
+            self.width = 2.0 ** np.floor(np.log2((hi - lo) / self.buckets))
+        if self.width is not None:
+            while np.floor(hi / self.width) - np.floor(lo / self.width) + 1 > self.buckets:
+                self.width *= 2
+        self._reduce()
+        return self
+
+    def _bucket(self):
+        if self.width is None:
+            return np.zeros(len(self.x), dtype=np.int64)
+        # Division by a power of two is exact, so floor(x / 2w) == floor(floor(x / w) / 2)
+        return np.floor(self.x / self.width).astype(np.int64)
+
+    @staticmethod
+    def _run_ends(sorted_bucket):
+        starts = np.flatnonzero(np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]])
+        return starts, np.r_[starts[1:], len(sorted_bucket)] - 1
+
+    def _reduce(self):
+        bucket = self._bucket()
+        # Order by bucket, then y: the first/last entry of each bucket's run is its min/max
+        order = np.lexsort((self.rows, self.y, bucket))
+        starts, ends = self._run_ends(bucket[order])
+        keep = [order[starts], order[ends]]
+        if self.keep_ends:
+            # Same by x for the bucket's first and last point
+            order = np.lexsort((self.rows, self.x, bucket))
+            starts, ends = self._run_ends(bucket[order])
+            keep += [order[starts], order[ends]]
+        keep = np.unique(np.concatenate(keep))
+        self.rows, self.x, self.y = self.rows[keep], self.x[keep], self.y[keep]
+
+    def points(self):
+        """Kept points in x order"""
+        order = np.lexsort((self.rows, self.x))
+        return self.x[order], self.y[order]
+
+def _x_values(chunk, x_kind):
+    if x_kind == 'datetime':
+        with warnings.catch_warnings():
+            # Per-element parsing fallback for unrecognized formats is expected here
+            warnings.simplefilter('ignore', UserWarning)
+            values = pd.to_datetime(chunk, errors='coerce')
+        if getattr(values.dt, 'tz', None) is not None:
+            values = values.dt.tz_convert(None)
+        return values.to_numpy(dtype='datetime64[ms]').astype(np.float64), values.isna().to_numpy()
+    values = pd.to_numeric(chunk, errors='coerce').to_numpy(dtype=np.float64)
+    return values, ~np.isfinite(values)
+
+def validate_series_query(y, method, points):
+    """Check a series query, raising ValueError with a user-facing message"""
+    if not y:
+        raise ValueError("Missing y column")
+    if method not in METHODS:
+        raise ValueError(f"Unsupported method '{method}' (expected one of {', '.join(METHODS)})")
+    if points < 3:
+        raise ValueError("points must be at least 3")
+
+def downsample_frames(frames, y, x=None, points=1000, method='lttb'):
+    """Downsample the (x, y) series of a stream of DataFrame chunks to at most `points` points"""
+    validate_series_query(y, method, points)
+
+    # LTTB picks from the first/last/min/max candidates of `points` buckets; min/max returns two per bucket
+    reducer = BucketReducer(points if method == 'lttb' else points // 2, keep_ends=(method == 'lttb'))
+    x_kind = 'index' if x is None else None
+    offset = 0
+    for frame in frames:
+        rows = np.arange(offset, offset + len(frame), dtype=np.int64)
+        offset += len(frame)
+        y_values = pd.to_numeric(frame[y], errors='coerce').to_numpy(dtype=np.float64)
+        invalid = ~np.isfinite(y_values)
+        if invalid.all() and frame[y].notna().any() and not pd.api.types.is_numeric_dtype(frame[y]):
+            raise ValueError(f"Column '{y}' is not numeric")
+        if x is None:
+            x_values = rows.astype(np.float64)
+        else:
+            if x_kind is None:
+                x_kind = 'numeric' if pd.api.types.is_numeric_dtype(frame[x]) else 'datetime'
+            x_values, x_invalid = _x_values(frame[x], x_kind)
+            if x_kind == 'datetime' and x_invalid.all() and frame[x].notna().any():
+                raise ValueError(f"Column '{x}' is neither numeric nor a date/time")
+            invalid |= x_invalid
+        valid = ~invalid
+        reducer.update(rows[valid], x_values[valid], y_values[valid])
+
+    xs, ys = reducer.points()
+    if method == 'lttb' and len(xs) > points:
+        selected = lttb(xs, ys, points)
+        xs, ys = xs[selected], ys[selected]
+
+    if x_kind == 'datetime':
+        x_out = [str(value) for value in pd.to_datetime(xs, unit='ms')]
+    elif x_kind == 'index':
+        x_out = [int(value) for value in xs]
+    else:
+        x_out = xs.tolist()
+    return {
+        "x_column": x,
+        "y_column": y,
+        "x_type": x_kind or 'numeric',
+        "method": method,
+        "rows": offset,
+        "points": len(ys),
+        "x": x_out,
+        "y": ys.tolist()
+    }
+
+def series_variant(y, x, points, method):
+    """Cache variant of a series query (results are cached per path, file version and query)"""
+    return 'series:' + json.dumps([y, x, points, method])
+
+def downsample_file(hdfs_path, y, x=None, points=None, method='lttb'):
+    """Downsampled x/y series of a whole HDFS file, streamed chunk by chunk from the sidecar or CSV"""
+    points = min(points or Config.SERIES_DEFAULT_POINTS, Config.SERIES_MAX_POINTS)
+    validate_series_query(y, method, points)
+    normalized_path = normalize_hdfs_path(hdfs_path)
+    version = file_version(get_file_status(normalized_path))
+    variant = series_variant(y, x, points, method)
+
+    cached = metadata_cache.get(normalized_path, version, variant)
+    if cached is not None:
+        logger.info(f"Returning cached series for {normalized_path}")
+        return cached
+
+    columns = [y] if x is None else list(dict.fromkeys([x, y]))
+    try:
+        result = downsample_frames(iter_column_frames(normalized_path, columns), y, x, points, method)
+    except KeyError as e:
+        raise ValueError(f"Unknown column(s) in {columns}: {e}")
+
+    metadata_cache.put(normalized_path, version, result, variant)
+    return result
@@ -0,0 +1,152 @@
+import math
+
+# Group-by aggregation over a whole dataset (pandas or Spark DataFrame). Both engines return the
+# same payload: the top `limit` groups by aggregated value (descending) plus one "other" bucket
+# folding every remaining group, so the result stays small however many groups the data has.
+AGGREGATIONS = ('sum', 'mean', 'count', 'min', 'max')
+
+def validate_query(group_by, measure, agg, limit):
+    """Check an aggregation query, raising ValueError with a user-facing message"""
+    if not group_by:
+        raise ValueError("At least one group_by column is required")
+    if agg not in AGGREGATIONS:
+        raise ValueError(f"Unsupported aggregation '{agg}' (expected one of {', '.join(AGGREGATIONS)})")
+    if measure is None and agg != 'count':
+        raise ValueError(f"Aggregation '{agg}' needs a measure column")
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+
+def _builtin(value):
+    """JSON-friendly scalar (numpy scalars unwrapped, NaN as None)"""
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+def _other_value(agg, count, total, minimum, maximum):
+    """Aggregate of the folded groups, from their combined partial aggregates"""
+    if agg == 'count':
+        return count
+    if agg == 'sum':
+        return total
+    if agg == 'mean':
+        return total / count if count else None
+    return minimum if agg == 'min' else maximum
+
+def _payload(group_by, measure, agg, groups, other, total_groups, engine):
+    return {
+        "group_by": group_by,
+        "measure": measure,
+        "agg": agg,
+        "groups": groups,
+        "other": other,
+        "total_groups": total_groups,
+        "engine": engine
+    }
+
+def aggregate_pandas(df, group_by, measure, agg, limit):
+    """Aggregate a pandas DataFrame"""
+    import pandas as pd
+
+    validate_query(group_by, measure, agg, limit)
+    missing = [column for column in group_by + ([measure] if measure else []) if column not in df.columns]
+    if missing:
+        raise ValueError(f"Unknown column(s): {', '.join(missing)}")
+    if agg in ('sum', 'mean') and not pd.api.types.is_numeric_dtype(df[measure]):
+        raise ValueError(f"Column '{measure}' is not numeric")
+
+    grouped = df.groupby(group_by, dropna=False, sort=False)
+    if measure is None:
+        partials = grouped.size().to_frame('count')
+        partials['sum'] = partials['min'] = partials['max'] = float('nan')
+    else:
+        numeric = pd.api.types.is_numeric_dtype(df[measure])
+        partials = grouped[measure].agg(['count', 'sum', 'min', 'max'] if numeric else ['count', 'min', 'max'])
+        if not numeric:
+            partials['sum'] = float('nan')
+    partials['value'] = partials['sum'] / partials['count'] if agg == 'mean' else partials[agg]
+
+    # Stable sort so ties keep first-seen group order
+    partials = partials.sort_values('value', ascending=False, kind='mergesort', na_position='last')
+    top, rest = partials.iloc[:limit], partials.iloc[limit:]
+
+    groups = []
+    for keys, value, count in zip(top.index, top['value'].tolist(), top['count'].tolist()):
+        keys = keys if isinstance(keys, tuple) else (keys,)
+        groups.append({
+            "keys": {column: _builtin(key) for column, key in zip(group_by, keys)},
+            "value": _builtin(value),
+            "count": int(count)
+        })
+
+    other = None
+    if len(rest):
+        count = int(rest['count'].sum())
+        other = {
+            "groups": len(rest),
+            "value": _builtin(_other_value(agg, count, rest['sum'].sum(), rest['min'].min(), rest['max'].max())),
+            "count": count
+        }
+    return _payload(group_by, measure, agg, groups, other, len(partials), 'pandas')
+
+def aggregate_spark(df, group_by, measure, agg, limit):
+    """Aggregate a Spark DataFrame: one grouped aggregation, top-N collected, the rest folded on the cluster"""
+    from pyspark.sql import functions as F
+    from pyspark.sql.types import NumericType
+
+    validate_query(group_by, measure, agg, limit)
+    missing = [column for column in group_by + ([measure] if measure else []) if column not in df.columns]
+    if missing:
+        raise ValueError(f"Unknown column(s): {', '.join(missing)}")
+    numeric = measure is not None and isinstance(df.schema[measure].dataType, NumericType)
+    if agg in ('sum', 'mean') and not numeric:
+        raise ValueError(f"Column '{measure}' is not numeric")
+
+    if measure is None:
+        partial_exprs = [F.count(F.lit(1)).alias('count')]
+    else:
+        col = F.col(f"`{measure}`")
+        partial_exprs = [F.count(col).alias('count'), F.min(col).alias('min'), F.max(col).alias('max')]
+        if numeric:
+            partial_exprs.append(F.sum(col).alias('sum'))
+    partials = df.groupBy(*[F.col(f"`{column}`") for column in group_by]).agg(*partial_exprs)
+    value = F.col('sum') / F.col('count') if agg == 'mean' else F.col(agg)
+    partials = partials.withColumn('value', value).cache()
+
+    try:
+        top_rows = partials.orderBy(F.desc_nulls_last('value')).limit(limit).collect()
+        groups = [{
+            "keys": {column: _builtin(row[column]) for column in group_by},
+            "value": _builtin(row['value']),
+            "count": int(row['count'])
+        } for row in top_rows]
+
+        # Fold everything outside the top groups (null-safe anti join against the collected keys)
+        top_keys = partials.sparkSession.createDataFrame(
+            [tuple(row[column] for column in group_by) for row in top_rows],
+            partials.select(*[F.col(f"`{column}`") for column in group_by]).schema
+        ) if top_rows else None
+        rest = partials
+        if top_keys is not None:
+            condition = [partials[column].eqNullSafe(top_keys[column]) for column in group_by]
+            rest = partials.join(F.broadcast(top_keys), condition, 'left_anti')
+        folded_exprs = [F.count(F.lit(1)).alias('groups'), F.sum('count').alias('count')]
+        if measure is not None:
+            folded_exprs += [F.min('min').alias('min'), F.max('max').alias('max')]
+            if numeric:
+                folded_exprs.append(F.sum('sum').alias('sum'))
+        folded = rest.agg(*folded_exprs).first().asDict()
+    finally:
+        partials.unpersist()
+
+    other_groups = folded['groups']
+    other = None
+    if other_groups:
+        count = int(folded['count'] or 0)
+        other = {
+            "groups": other_groups,
+            "value": _builtin(_other_value(agg, count, folded.get('sum'), folded.get('min'), folded.get('max'))),
+            "count": count
+        }
+    return _payload(group_by, measure, agg, groups, other, len(groups) + other_groups, 'spark')
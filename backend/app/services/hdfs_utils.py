@@ -1,61 +1,38 @@
-import requests
-import os
-import re
-import socket
 from app.config import Config
+from app.services.webhdfs_client import get_client
+from app.services.metrics import span
+from app.services.compression import compress_chunks, iter_file_chunks
+
+def webhdfs_request(method, url, **kwargs):
+    """Issue a WebHDFS request on the pooled client (invalidates discovery on connection errors)"""
+    return get_client().request(method, url, **kwargs)
 
 def get_webhdfs_url(path, operation):
     """Build WebHDFS URL for a specific operation"""
-    config = Config()
-    base_url = config.HDFS_URL.rstrip('/')
-    return f"{base_url}/webhdfs/v1{path}?op={operation}&user.name={Config.HDFS_USER}"
+    return get_client().url(path, operation)
 
 def fix_datanode_url(url):
     """Replace hostname with IP address in DataNode URLs"""
-    # Get the current HDFS IP
-    config = Config()
-    current_ip = config.get_hdfs_ip()
-    
-    # Replace quickstart.cloudera with the current IP address
-    fixed_url = url.replace('quickstart.cloudera', current_ip)
-    
-    # Also replace any other hostnames that might be in the URL
-    # Extract IP from URL if it contains a different IP
-    ip_pattern = r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b'
-    ips_in_url = re.findall(ip_pattern, url)
-    
-    for old_ip in ips_in_url:
-        if old_ip != current_ip:
-            fixed_url = fixed_url.replace(old_ip, current_ip)
-    
-    return fixed_url
+    return get_client().fix_datanode_url(url)
 
-def upload_to_hdfs(local_path, hdfs_path):
-    """Upload file to HDFS using direct WebHDFS REST API"""
+def upload_to_hdfs(local_path, hdfs_path, codec=None):
+    """Upload file to HDFS using direct WebHDFS REST API (compressed on the way with codec, if given)"""
     try:
-        # Step 1: Create file (this returns a redirect to a DataNode)
-        create_url = get_webhdfs_url(hdfs_path, 'CREATE')
-        create_params = {'overwrite': 'true'}
-        
-        response = requests.put(create_url, params=create_params, allow_redirects=False)
-        
-        if response.status_code == 307:  # Redirect to DataNode
-            # Step 2: Get the redirect URL and fix the hostname
-            datanode_url = response.headers['Location']
+        with open(local_path, 'rb') as f, span('hdfs.upload'):
+            if codec:
+                return get_client().create(hdfs_path, compress_chunks(iter_file_chunks(f), codec))
+            return get_client().create(hdfs_path, f)
             
-            # Fix the hostname in the URL
-            fixed_datanode_url = fix_datanode_url(datanode_url)
-            
-            # Step 3: Upload to DataNode with fixed URL
-            with open(local_path, 'rb') as f:
-                upload_response = requests.put(fixed_datanode_url, data=f, headers={'Content-Type': 'application/octet-stream'})
-            
-            if upload_response.status_code == 201:
-                return hdfs_path
-            else:
-                raise Exception(f"Upload failed: {upload_response.status_code} - {upload_response.text}")
-        else:
-            raise Exception(f"Create failed: {response.status_code} - {response.text}")
+    except Exception as e:
+        raise Exception(f"Failed to upload to HDFS: {str(e)}")
+
+def upload_stream_to_hdfs(chunks, hdfs_path, codec=None):
+    """Upload an iterator of byte chunks to HDFS with chunked transfer encoding (compressed with codec, if given)"""
+    try:
+        with span('hdfs.upload'):
+            if codec:
+                chunks = compress_chunks(chunks, codec)
+            return get_client().create(hdfs_path, chunks)
             
     except Exception as e:
         raise Exception(f"Failed to upload to HDFS: {str(e)}")
@@ -63,18 +40,45 @@ def upload_to_hdfs(local_path, hdfs_path):
 def list_hdfs_directory(path='/'):
     """List HDFS directory using direct WebHDFS REST API"""
     try:
-        list_url = get_webhdfs_url(path, 'LISTSTATUS')
-        response = requests.get(list_url)
-        
-        if response.status_code == 200:
-            data = response.json()
-            return [item['pathSuffix'] for item in data['FileStatuses']['FileStatus']]
-        else:
-            raise Exception(f"List failed: {response.status_code} - {response.text}")
+        return [item['pathSuffix'] for item in get_client().list_status(path)]
             
     except Exception as e:
         raise Exception(f"Failed to list HDFS directory: {str(e)}")
 
+def list_hdfs_files(path='/', recursive=False, suffix=None):
+    """(path, FileStatus) of the files in an HDFS directory, optionally recursive and by name suffix
+
+    Hidden entries (names starting with '.' or '_', e.g. _SUCCESS markers) are skipped, as Hadoop
+    input formats do.
+    """
+    try:
+        files = []
+        directories = [path.rstrip('/') or '/']
+        while directories:
+            directory = directories.pop(0)
+            for status in get_client().list_status(directory):
+                name = status['pathSuffix']
+                if name.startswith(('.', '_')):
+                    continue
+                full_path = f"{directory.rstrip('/')}/{name}"
+                if status['type'] == 'DIRECTORY':
+                    if recursive:
+                        directories.append(full_path)
+                elif suffix is None or name.lower().endswith(suffix.lower()):
+                    files.append((full_path, status))
+        return files
+            
+    except Exception as e:
+        raise Exception(f"Failed to list HDFS directory: {str(e)}")
+
+def get_file_status(path):
+    """Get file metadata (length, modificationTime, ...) using WebHDFS GETFILESTATUS"""
+    try:
+        return get_client().get_file_status(path)
+            
+    except Exception as e:
+        raise Exception(f"Failed to get HDFS file status: {str(e)}")
+
 def test_hdfs_connection():
     """Test HDFS connection and return status"""
     try:
@@ -82,7 +86,7 @@ def test_hdfs_connection():
         ip = config.get_hdfs_ip()
         url = f"http://{ip}:{Config.WEBHDFS_PORT}/webhdfs/v1/?op=LISTSTATUS"
         
-        response = requests.get(url, timeout=5)
+        response = webhdfs_request('GET', url, timeout=5)
         if response.status_code == 200:
             return {
                 'status': 'connected',
@@ -0,0 +1,188 @@
+import atexit
+import logging
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, BrokenExecutor
+from app.config import Config
+from app.services.analysis_cache import analysis_cache, file_version
+from app.services.metrics import collect_spans, merge_recorded
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+def _init_worker(hdfs_ip, verified):
+    """Pool process initializer: start from the parent's HDFS endpoint instead of discovering it again"""
+    if hdfs_ip is not None:
+        Config.seed_hdfs_ip(hdfs_ip, verified)
+
+def _run_analysis(hdfs_path, streaming, approximate):
+    """Worker entry point (runs in a pool process): the result and the spans recorded for it"""
+    from app.services.simple_analyzer import analyze_hdfs_file_simple
+    with collect_spans() as collector:
+        result = analyze_hdfs_file_simple(hdfs_path, streaming=streaming, approximate=approximate)
+    return result, collector.to_dict()
+
+class AnalysisJob:
+    """One (possibly shared) analysis of a file version"""
+
+    def __init__(self, hdfs_path, key, future=None, result=None):
+        self.id = uuid.uuid4().hex
+        self.hdfs_path = hdfs_path
+        self.key = key
+        self.future = future
+        self.submitted_at = time.time()
+        self.finished_at = None if future is not None else self.submitted_at
+        self._result = result
+
+    @property
+    def done(self):
+        return self.future is None or self.future.done()
+
+    @property
+    def status(self):
+        if self.future is None:
+            return 'done'
+        if self.future.done():
+            return 'failed' if self.future.exception() is not None else 'done'
+        return 'running' if self.future.running() else 'queued'
+
+    def result(self, timeout=None):
+        """Wait for the result (raises concurrent.futures.TimeoutError after timeout seconds)"""
+        if self.future is None:
+            return self._result
+        return self.future.result(timeout=timeout)[0]
+
+    @property
+    def recorded(self):
+        """Spans and byte counts recorded while the job ran (None for cached or unfinished jobs)"""
+        if self.future is None or not self.future.done() or self.future.exception() is not None:
+            return None
+        return self.future.result()[1]
+
+    def to_dict(self, include_result=True):
+        data = {
+            'job_id': self.id,
+            'hdfs_path': self.hdfs_path,
+            'status': self.status,
+            'submitted_at': self.submitted_at,
+            'finished_at': self.finished_at
+        }
+        if self.status == 'failed':
+            data['error'] = str(self.future.exception())
+        elif self.status == 'done' and include_result:
+            data['result'] = self.result()
+        return data
+
+class AnalysisJobQueue:
+    """Runs analyses off the request thread, coalescing identical in-flight requests (single-flight)"""
+
+    def __init__(self, backend=None, workers=None):
+        self.backend = backend or Config.JOB_BACKEND
+        self.workers = workers or Config.JOB_WORKERS
+        self._executor = None
+        self._jobs = {}  # job id -> AnalysisJob
+        self._inflight = {}  # (path, version, variant) -> AnalysisJob
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.backend == 'process':
+                context = multiprocessing.get_context(Config.JOB_START_METHOD)
+                # Spawned workers start with empty module state: hand them the endpoint this process
+                # discovered so their first job does not block on a full discovery
+                hdfs_ip = Config.get_hdfs_ip()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=context, initializer=_init_worker,
+                    initargs=(hdfs_ip, Config.get_discovery_status()['verified']))
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='analysis-job')
+        return self._executor
+
+    def submit(self, hdfs_path, streaming=None, approximate=None, file_status=None):
+        """Submit an analysis and return its job (an existing one if the same version is in flight)
+
+        A FileStatus the caller already fetched for this path can be passed to skip a GETFILESTATUS.
+        """
+        from app.services.simple_analyzer import normalize_hdfs_path, analysis_variant
+        from app.services.hdfs_utils import get_file_status
+
+        normalized_path = normalize_hdfs_path(hdfs_path)
+        try:
+            file_status = file_status or get_file_status(normalized_path)
+            version = file_version(file_status)
+        except Exception as e:
+            logger.warning(f"Could not get file status for {normalized_path}, job will not be shared: {e}")
+            file_status, version = None, None
+        # Same variant the analysis caches its result under, so a streaming job never answers an exact one
+        variant = analysis_variant(normalized_path, file_status, streaming, approximate)
+
+        with self._lock:
+            self._prune()
+
+            if version is not None:
+                cached = analysis_cache.get(normalized_path, version, variant)
+                if cached is not None:
+                    job = AnalysisJob(normalized_path, None, result=cached)
+                    self._jobs[job.id] = job
+                    return job
+
+            key = (normalized_path, version, variant) if version is not None else None
+            job = self._inflight.get(key) if key is not None else None
+            if job is not None:
+                logger.info(f"Joining in-flight analysis {job.id} for {normalized_path}")
+                return job
+
+            try:
+                future = self._get_executor().submit(_run_analysis, normalized_path, streaming, approximate)
+            except BrokenExecutor:
+                # A worker process died - replace the pool and retry once
+                logger.warning("Analysis worker pool is broken, restarting it")
+                self._executor = None
+                future = self._get_executor().submit(_run_analysis, normalized_path, streaming, approximate)
+            job = AnalysisJob(normalized_path, key, future=future)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._inflight[key] = job
+            logger.info(f"Submitted analysis job {job.id} for {normalized_path}")
+
+        future.add_done_callback(lambda f, job=job, version=version, variant=variant: self._finish(job, version, variant))
+        return job
+
+    def _finish(self, job, version, variant):
+        job.finished_at = time.time()
+        with self._lock:
+            if job.key is not None and self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+        if job.future.exception() is None:
+            result, recorded = job.future.result()
+            if version is not None:
+                # Pool processes have their own caches - keep the result in this process's cache
+                analysis_cache.put(job.hdfs_path, version, result, variant)
+            if self.backend == 'process':
+                # ... and their own metrics registry
+                merge_recorded(recorded)
+        else:
+            logger.error(f"Analysis job {job.id} failed: {job.future.exception()}")
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        # Caller holds the lock; forget finished jobs after JOB_RESULT_TTL seconds
+        cutoff = time.time() - Config.JOB_RESULT_TTL
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.done and job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# Process-wide queue used by the analysis routes
+job_queue = AnalysisJobQueue()
+atexit.register(job_queue.shutdown)
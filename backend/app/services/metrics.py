@@ -0,0 +1,184 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+METRIC_HELP = {
+    'intelliview_stage_duration_seconds': ('histogram', 'Time spent in each processing stage'),
+    'intelliview_http_request_duration_seconds': ('histogram', 'HTTP request latency by endpoint'),
+    'intelliview_bytes_total': ('counter', 'Bytes transferred by direction'),
+    'intelliview_analysis_cache': ('gauge', 'Analysis result cache counters')
+}
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus semantics)"""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Process-wide histograms and counters, keyed by metric name and label set"""
+
+    def __init__(self):
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._counters = {}  # (name, labels) -> value
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self, gauges=()):
+        """Prometheus text exposition format; gauges are extra (name, labels, value) samples"""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        described = set()
+
+        def describe(name):
+            if name not in described:
+                described.add(name)
+                kind, text = METRIC_HELP.get(name, ('untyped', name))
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), histogram in histograms:
+            describe(name)
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for name, labels, value in gauges:
+            describe(name)
+            lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {value}")
+        return '\n'.join(lines) + '\n'
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+# Process-wide registry exposed by /metrics
+metrics = MetricsRegistry()
+
+# Spans of the current request (or analysis job), for the Server-Timing breakdown
+_collector = contextvars.ContextVar('metrics_collector', default=None)
+
+class SpanCollector:
+    """Spans and byte counts recorded while it is active (a request or one analysis job)"""
+
+    def __init__(self):
+        self.spans = []  # (stage, seconds)
+        self.bytes = {}  # direction -> bytes
+
+    def to_dict(self):
+        return {'spans': list(self.spans), 'bytes': dict(self.bytes)}
+
+    def extend(self, recorded):
+        self.spans.extend((stage, seconds) for stage, seconds in recorded['spans'])
+        for direction, count in recorded['bytes'].items():
+            self.bytes[direction] = self.bytes.get(direction, 0) + count
+
+    def server_timing(self):
+        """Server-Timing header value: total duration per stage, in order of first occurrence"""
+        totals = {}
+        for stage, seconds in self.spans:
+            total, calls = totals.get(stage, (0.0, 0))
+            totals[stage] = (total + seconds, calls + 1)
+        entries = []
+        for stage, (total, calls) in totals.items():
+            entry = f"{stage};dur={total * 1000:.1f}"
+            if calls > 1:
+                entry += f';desc="{calls} calls"'
+            entries.append(entry)
+        return ', '.join(entries)
+
+@contextmanager
+def collect_spans():
+    """Collect the spans recorded in this context (nested collectors also feed the outer one)"""
+    collector = SpanCollector()
+    outer = _collector.get()
+    token = _collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
+        if outer is not None:
+            outer.extend(collector.to_dict())
+
+def start_collecting():
+    """Start collecting spans for the current request; returns the token for stop_collecting"""
+    return _collector.set(SpanCollector())
+
+def stop_collecting(token):
+    _collector.reset(token)
+
+def current_collector():
+    return _collector.get()
+
+def record_span(stage, seconds):
+    metrics.observe('intelliview_stage_duration_seconds', seconds, stage=stage)
+    collector = _collector.get()
+    if collector is not None:
+        collector.spans.append((stage, seconds))
+
+@contextmanager
+def span(stage):
+    """Time a processing stage into the stage histogram and the current request's breakdown"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(stage, time.perf_counter() - started)
+
+def add_bytes(direction, count):
+    """Count bytes transferred (e.g. 'hdfs_read', 'hdfs_write')"""
+    if not count:
+        return
+    metrics.inc('intelliview_bytes_total', count, direction=direction)
+    collector = _collector.get()
+    if collector is not None:
+        collector.bytes[direction] = collector.bytes.get(direction, 0) + count
+
+def merge_recorded(recorded, into_registry=True):
+    """Add spans recorded elsewhere (an analysis job) to the registry and the current request"""
+    if into_registry:
+        for stage, seconds in recorded['spans']:
+            metrics.observe('intelliview_stage_duration_seconds', seconds, stage=stage)
+        for direction, count in recorded['bytes'].items():
+            metrics.inc('intelliview_bytes_total', count, direction=direction)
+    collector = _collector.get()
+    if collector is not None:
+        collector.extend(recorded)
@@ -0,0 +1,178 @@
+import asyncio
+import ipaddress
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.config import Config
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+WEBHDFS_PORTS = (50070, 9870)  # NameNode web UI / WebHDFS (Hadoop 2.x, 3.x)
+HDFS_RPC_PORTS = (8020, 9000)
+DEFAULT_PORTS = WEBHDFS_PORTS + HDFS_RPC_PORTS
+
+# Upper bound on the addresses of one scan (a /16)
+MAX_SCAN_HOSTS = 65536
+
+def expand_targets(specs, max_hosts=MAX_SCAN_HOSTS):
+    """Host addresses of CIDR ranges and single addresses, in the given order and without duplicates"""
+    networks = []
+    for spec in specs:
+        try:
+            networks.append(ipaddress.ip_network(str(spec).strip(), strict=False))
+        except ValueError:
+            raise ValueError(f"Not an IP address or CIDR range: {spec}")
+    total = sum(network.num_addresses for network in networks)
+    if total > max_hosts:
+        raise ValueError(f"Scan covers {total} addresses, the limit is {max_hosts}")
+
+    hosts, seen = [], set()
+    for network in networks:
+        # hosts() leaves out the network and broadcast addresses of ranges larger than /31
+        addresses = network.hosts() if network.num_addresses > 2 else iter(network)
+        for address in addresses:
+            host = str(address)
+            if host not in seen:
+                seen.add(host)
+                hosts.append(host)
+    return hosts
+
+def _max_concurrency(requested):
+    """Concurrent connects, capped below the process's open file limit"""
+    if resource is not None:
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY:
+            return max(1, min(requested, soft - 64))
+    return max(1, requested)
+
+async def _close(writer):
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+
+async def _verify_webhdfs(reader, writer, host, port, timeout):
+    """Send a LISTSTATUS of / on the open connection; a 200 answer is a WebHDFS endpoint"""
+    request = (f"GET /webhdfs/v1/?op=LISTSTATUS HTTP/1.1\r\nHost: {host}:{port}\r\n"
+               f"Connection: close\r\n\r\n")
+    try:
+        writer.write(request.encode('ascii'))
+        await asyncio.wait_for(writer.drain(), timeout)
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    parts = status_line.split()
+    return len(parts) >= 2 and parts[0].startswith(b'HTTP/') and parts[1] == b'200'
+
+async def _check(host, port, verify_ports, connect_timeout, http_timeout):
+    """Result dict for an open port (WebHDFS ports verified over the same connection), None if closed"""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), connect_timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    try:
+        verified = port in verify_ports and await _verify_webhdfs(reader, writer, host, port, http_timeout)
+    finally:
+        await _close(writer)
+
+    if verified:
+        kind = 'webhdfs'
+    elif port in HDFS_RPC_PORTS:
+        kind = 'service'
+    else:
+        kind = 'open'
+    return {'ip': host, 'port': port, 'type': kind, 'verified': verified}
+
+async def scan(hosts, ports=DEFAULT_PORTS, verify_ports=WEBHDFS_PORTS, concurrency=None,
+               connect_timeout=None, http_timeout=None, stop_on_first=False):
+    """Probe every (host, port) with non-blocking connects and yield open ports as they are found
+
+    At most `concurrency` probes are in flight; each connect and each HTTP exchange has its own
+    timeout, so a slow host only holds up its own probe. With stop_on_first the scan ends at the
+    first verified WebHDFS endpoint and outstanding probes are cancelled.
+    """
+    concurrency = _max_concurrency(concurrency or Config.HDFS_SCAN_CONCURRENCY)
+    connect_timeout = connect_timeout or Config.HDFS_SCAN_CONNECT_TIMEOUT
+    http_timeout = http_timeout or Config.HDFS_SCAN_HTTP_TIMEOUT
+    verify_ports = set(verify_ports or ())
+    total = len(hosts) * len(ports)
+    if not total:
+        return
+
+    probes = ((host, port) for host in hosts for port in ports)
+    results = asyncio.Queue()
+    started = time.monotonic()
+
+    async def worker():
+        # Workers share one iterator, so each probe is taken exactly once
+        for host, port in probes:
+            result = await _check(host, port, verify_ports, connect_timeout, http_timeout)
+            if result is not None:
+                result['elapsed_s'] = round(time.monotonic() - started, 3)
+                await results.put(result)
+
+    async def finish(workers):
+        await asyncio.gather(*workers, return_exceptions=True)
+        await results.put(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, total))]
+    finisher = asyncio.create_task(finish(workers))
+    try:
+        while True:
+            result = await results.get()
+            if result is None:
+                break
+            yield result
+            if stop_on_first and result['verified']:
+                break
+    finally:
+        for task in workers + [finisher]:
+            task.cancel()
+        await asyncio.gather(*workers, finisher, return_exceptions=True)
+        logger.info(f"Scanned {total} host:port pairs in {time.monotonic() - started:.2f}s "
+                    f"({concurrency} concurrent probes)")
+
+def _run(coro):
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # Already inside an event loop: run the scan on its own loop in a helper thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+def scan_network(hosts, ports=DEFAULT_PORTS, on_result=None, **options):
+    """Run a scan to completion (or to the first WebHDFS endpoint with stop_on_first) and return the results
+
+    on_result is called with each result as soon as it is found.
+    """
+    async def collect():
+        found = []
+        async for result in scan(hosts, ports, **options):
+            found.append(result)
+            if on_result is not None:
+                on_result(result)
+        return found
+
+    return _run(collect())
+
+def find_webhdfs(hosts, port, ordered=False, **options):
+    """Address of a verified WebHDFS endpoint among hosts, or None
+
+    By default the first endpoint to answer wins and the scan stops there; with ordered=True all
+    hosts are checked (concurrently) and the first verified one in the given order is returned.
+    """
+    port = int(port)
+    found = scan_network(hosts, [port], verify_ports=[port], stop_on_first=not ordered, **options)
+    verified = {result['ip'] for result in found if result['verified']}
+    for host in hosts:
+        if host in verified:
+            return host
+    return None
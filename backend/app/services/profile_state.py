@@ -0,0 +1,192 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from app.config import Config
+from app.services.column_profiler import CsvProfiler
+from app.services.columnar_sidecar import PYARROW_AVAILABLE, iter_csv_frames
+from app.services.compression import detect_codec
+from app.services.metrics import span
+from app.services.range_reader import read_header
+from app.services.webhdfs_client import get_client
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Bytes before the profiled length that must be unchanged for the file to count as appended to
+FINGERPRINT_BYTES = 64 * 1024
+
+class _TailTrackingReader(io.RawIOBase):
+    """Pass-through stream remembering the last FINGERPRINT_BYTES read"""
+
+    def __init__(self, stream, tail=b''):
+        self.stream = stream
+        self.tail = tail
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        if data:
+            self.tail = (self.tail + data)[-FINGERPRINT_BYTES:]
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def _digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+def _json_default(value):
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+def profile_state_path(hdfs_path, variant):
+    """Local state file keyed by path and cache variant (one per file, replaced as it grows)"""
+    stem = hashlib.sha1(hdfs_path.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(Config.PROFILE_STATE_DIR, f"{stem}_{variant}.json")
+
+def _read_range(hdfs_path, offset, length):
+    response = get_client().open(hdfs_path, offset=offset, length=length)
+    try:
+        return response.content
+    finally:
+        response.close()
+
+def _write_state(hdfs_path, variant, file_status, header, tail, profiler, reader):
+    # Only whole records can be extended: a last line without a newline may still be growing
+    if not tail.endswith(b'\n'):
+        logger.info(f"{hdfs_path} does not end with a newline, not keeping its profile state")
+        return
+    state = {
+        'path': hdfs_path,
+        'variant': variant,
+        'length': file_status['length'],
+        'modification_time': file_status['modificationTime'],
+        'header': header.decode('utf-8', errors='replace'),
+        'tail_sha1': _digest(tail),
+        'tail_bytes': len(tail),
+        'reader': reader,
+        'profile': profiler.to_dict()
+    }
+    path = profile_state_path(hdfs_path, variant)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Write to a temp file first so readers never see a partial state
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(state, f, default=_json_default)
+    os.replace(tmp_path, path)
+
+def save_profile_state(hdfs_path, file_status, variant, profiler, reader='pandas'):
+    """Keep the profile of the file's current length so a later append can be merged into it
+
+    reader is the CSV reader the profile was built with - 'arrow' (the sidecar's) or 'pandas' -
+    so appended rows are parsed with the same type and null rules. Files below
+    INCREMENTAL_MIN_BYTES are cheap to re-profile and are not tracked. Failures are logged and
+    ignored; the next change then triggers a full recompute.
+    """
+    length = file_status['length']
+    if length < Config.INCREMENTAL_MIN_BYTES:
+        return
+    try:
+        header = read_header(hdfs_path, length)
+        if detect_codec(hdfs_path, header[:4]) is not None:
+            return  # appended compressed bytes cannot be profiled on their own
+        tail_start = max(length - FINGERPRINT_BYTES, 0)
+        tail = _read_range(hdfs_path, tail_start, length - tail_start)
+        _write_state(hdfs_path, variant, file_status, header, tail, profiler, reader)
+    except Exception as e:
+        logger.warning(f"Could not save profile state for {hdfs_path}: {e}")
+
+def _iter_appended_frames(stream, names, reader):
+    # Parsed like the stored profile's rows, so a refresh matches a full recompute
+    if reader == 'arrow':
+        return iter_csv_frames(stream, column_names=names)
+    return pd.read_csv(stream, header=None, names=names, chunksize=Config.PROFILER_CHUNK_ROWS)
+
+def load_profile_state(hdfs_path, variant):
+    path = profile_state_path(hdfs_path, variant)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except Exception as e:
+        logger.warning(f"Could not load profile state {path}, ignoring it: {e}")
+        return None
+    return state if state.get('path') == hdfs_path else None
+
+def extend_profile_state(hdfs_path, file_status, variant, approximate=False):
+    """Profile of the current file version built from the stored state, or None for a full recompute
+
+    When the file only grew since the state was saved - same header, same bytes just before the
+    old length - only the appended bytes are fetched (one ranged OPEN) and profiled, and their
+    profile is merged into the stored one. Truncated or rewritten files return None.
+    """
+    state = load_profile_state(hdfs_path, variant)
+    if state is None or state['profile']['approximate'] != approximate:
+        return None
+    reader = state.get('reader')
+    if reader is None or (reader == 'arrow' and not PYARROW_AVAILABLE):
+        return None  # saved before the reader was recorded (or its reader is unavailable)
+    if bool(state['profile'].get('correlation')) != Config.PROFILER_CORRELATION:
+        return None  # the stored profile lacks (or has) the correlation sums the result needs
+    if approximate and (state['profile']['distinct_error'] != Config.APPROX_DISTINCT_ERROR
+                        or state['profile']['quantile_error'] != Config.APPROX_QUANTILE_ERROR):
+        return None  # sketches of a different size cannot be merged
+
+    length, modification_time = file_status['length'], file_status['modificationTime']
+    old_length = state['length']
+    if length == old_length and modification_time == state['modification_time']:
+        logger.info(f"Serving {hdfs_path} from its stored profile state")
+        return CsvProfiler.from_dict(state['profile'])
+    if length <= old_length:
+        logger.info(f"{hdfs_path} was truncated or rewritten ({old_length} -> {length} bytes), full recompute")
+        return None
+
+    header = state['header'].encode('utf-8')
+    if read_header(hdfs_path, length) != header:
+        logger.info(f"Header of {hdfs_path} changed, full recompute")
+        return None
+
+    tail_start = old_length - state['tail_bytes']
+    response = get_client().open(hdfs_path, offset=tail_start, length=length - tail_start)
+    try:
+        response.raw.decode_content = True
+        tail = response.raw.read(state['tail_bytes'])
+        if _digest(tail) != state['tail_sha1']:
+            logger.info(f"{hdfs_path} changed before its previous end ({old_length} bytes), full recompute")
+            return None
+
+        logger.info(f"{hdfs_path} grew from {old_length} to {length} bytes, profiling the appended "
+                    f"{length - old_length} bytes")
+        names = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+        stream = _TailTrackingReader(response.raw, tail)
+        # New chunks are folded into the stored accumulators, as if the original pass had continued
+        profiler = CsvProfiler.from_dict(state['profile'])
+        with span('profile.incremental'):
+            try:
+                for chunk in _iter_appended_frames(stream, names, reader):
+                    if len(chunk):
+                        profiler.update(chunk)
+            except pd.errors.EmptyDataError:
+                pass  # only blank lines were appended
+            except ValueError as e:
+                # e.g. the appended rows do not fit the sidecar's column types (pyarrow.ArrowInvalid)
+                logger.info(f"Cannot profile the rows appended to {hdfs_path} on their own, full recompute: {e}")
+                return None
+    finally:
+        response.close()
+
+    try:
+        _write_state(hdfs_path, variant, file_status, header, stream.tail, profiler, reader)
+    except Exception as e:
+        logger.warning(f"Could not save profile state for {hdfs_path}: {e}")
+    return profiler
@@ -0,0 +1,118 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from app.config import Config
+from app.services.webhdfs_client import get_client
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class QuotedNewlineError(ValueError):
+    """Records contain quoted fields with newlines, so they cannot be split at arbitrary newlines"""
+
+def has_quoted_newline(records):
+    """True when some line of the records has an odd number of quote characters
+    
+    In well-formed CSV every record holds an even number of quotes, so an odd line is part of a
+    record that spans lines (or the bytes did not start at a record boundary).
+    """
+    if b'"' not in records:
+        return False
+    data = np.frombuffer(records, dtype=np.uint8)
+    # Running quote count mod 2 (uint8 wraps around, which keeps the parity)
+    parity = np.cumsum(data == 34, dtype=np.uint8) & 1
+    return bool(parity[data == 10].any() or parity[-1])
+
+def plan_byte_ranges(length, range_bytes=None):
+    """Split a file of the given length into [start, end) byte ranges"""
+    range_bytes = range_bytes or Config.PARALLEL_READ_RANGE_BYTES
+    return [(start, min(start + range_bytes, length)) for start in range(0, length, range_bytes)]
+
+class _RangeBuffer:
+    """Bytes of an HDFS file from base_offset on, extended by further ranged OPEN calls on demand"""
+
+    def __init__(self, path, base_offset, length, file_length):
+        self.path = path
+        self.base_offset = base_offset
+        self.file_length = file_length
+        self.data = bytearray()
+        self._extend(length)
+
+    @property
+    def eof(self):
+        return self.base_offset + len(self.data) >= self.file_length
+
+    def _extend(self, length):
+        offset = self.base_offset + len(self.data)
+        length = min(length, self.file_length - offset)
+        if length <= 0:
+            return
+        response = get_client().open(self.path, offset=offset, length=length)
+        try:
+            for chunk in response.iter_content(Config.DOWNLOAD_CHUNK_BYTES):
+                self.data += chunk
+        finally:
+            response.close()
+
+    def find_newline(self, index):
+        """Index of the first newline at or after index, fetching more bytes as needed (-1 at EOF)"""
+        while True:
+            found = self.data.find(b'\n', index)
+            if found != -1 or self.eof:
+                return found
+            index = max(index, len(self.data))
+            self._extend(Config.PARALLEL_READ_OVERSHOOT_BYTES)
+
+def read_header(path, file_length):
+    """Read the first line (CSV header) of an HDFS file"""
+    buffer = _RangeBuffer(path, 0, Config.PARALLEL_READ_OVERSHOOT_BYTES, file_length)
+    end = buffer.find_newline(0)
+    return bytes(buffer.data[:end + 1] if end != -1 else buffer.data)
+
+def read_record_range(path, start, end, file_length, skip_header=True):
+    """Read the complete records that start inside [start, end)
+
+    A record starts at offset 0 or right after a newline. The range is fetched from start - 1 so
+    the byte before start tells whether a record begins exactly at start; the last record is read
+    past end up to its terminating newline. Consecutive ranges therefore cover every record exactly
+    once. Raises QuotedNewlineError when the records contain quoted fields with newlines.
+    """
+    fetch_start = max(start - 1, 0)
+    buffer = _RangeBuffer(path, fetch_start, end - fetch_start + Config.PARALLEL_READ_OVERSHOOT_BYTES, file_length)
+
+    # First record boundary inside the range
+    if start == 0:
+        begin = buffer.find_newline(0) + 1 if skip_header else 0
+        if begin == 0 and skip_header:
+            return b''
+    else:
+        newline = buffer.find_newline(0)
+        if newline == -1:
+            return b''
+        begin = newline + 1
+    if fetch_start + begin >= end:
+        return b''
+
+    # Last record starting before end runs to the first newline at or after end - 1
+    newline = buffer.find_newline(end - 1 - fetch_start)
+    stop = newline + 1 if newline != -1 else len(buffer.data)
+    records = bytes(buffer.data[begin:stop])
+    if has_quoted_newline(records):
+        raise QuotedNewlineError(f"{path} has quoted fields containing newlines, it cannot be read as byte ranges")
+    return records
+
+def map_record_ranges(path, file_length, func, range_bytes=None, workers=None):
+    """Fetch the file's byte ranges concurrently and apply func(index, record_bytes) to each
+
+    Results are returned in range order so partial profiles can be merged deterministically.
+    """
+    ranges = plan_byte_ranges(file_length, range_bytes)
+    workers = workers or Config.PARALLEL_READ_WORKERS
+    logger.info(f"Reading {path} ({file_length} bytes) as {len(ranges)} ranges with {workers} workers")
+
+    def process(item):
+        index, (start, end) = item
+        return func(index, read_record_range(path, start, end, file_length))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hdfs-range') as executor:
+        return list(executor.map(process, enumerate(ranges)))
@@ -0,0 +1,235 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from io import BytesIO
+import numpy as np
+import pandas as pd
+from app.config import Config
+from app.services.analysis_cache import file_version
+from app.services.hdfs_utils import get_file_status
+from app.services.webhdfs_client import get_client
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class RowIndex:
+    """Sparse record index of a CSV file version: byte offset of every `stride`-th data record
+
+    Records end at newlines outside quoted fields, so a quoted field may contain newlines.
+    """
+
+    def __init__(self, stride, offsets, row_count, header, length, modification_time):
+        self.stride = stride
+        self.offsets = offsets  # offsets[k] = byte offset of data record k * stride
+        self.row_count = row_count
+        self.header = header
+        self.length = length
+        self.modification_time = modification_time
+
+    @property
+    def columns(self):
+        return list(pd.read_csv(BytesIO(self.header), nrows=0).columns)
+
+    def byte_range(self, offset, limit):
+        """[start, end) bytes holding records offset .. offset + limit - 1, and how many records to skip"""
+        checkpoint = offset // self.stride
+        start = int(self.offsets[checkpoint])
+        last = (offset + limit + self.stride - 1) // self.stride
+        end = int(self.offsets[last]) if last < len(self.offsets) else self.length
+        return start, end, offset - checkpoint * self.stride
+
+    @classmethod
+    def build(cls, stream, stride, modification_time, chunk_bytes=None):
+        """Scan a file stream once, recording record offsets
+        
+        A newline ends a record when an even number of quote characters precedes it in the file.
+        """
+        chunk_bytes = chunk_bytes or Config.DOWNLOAD_CHUNK_BYTES
+        offsets = []
+        header = b''
+        header_end = None  # byte offset of the first data record
+        newlines = 0  # record-ending newlines seen after the header
+        record_start = 0  # byte offset after the last record-ending newline
+        position = 0
+        quoted = 0  # 1 while inside a quoted field at the end of the previous chunk
+
+        while True:
+            chunk = stream.read(chunk_bytes)
+            if not chunk:
+                break
+            data = np.frombuffer(chunk, dtype=np.uint8)
+            positions = np.flatnonzero(data == 10)
+            if b'"' in chunk or quoted:
+                # Running quote count mod 2 (uint8 wraps around, which keeps the parity)
+                parity = (np.cumsum(data == 34, dtype=np.uint8) + quoted) & 1
+                positions = positions[parity[positions] == 0]
+                quoted = int(parity[-1])
+            if len(positions):
+                record_start = position + int(positions[-1]) + 1
+            if header_end is None:
+                header += chunk[:positions[0] + 1] if len(positions) else chunk
+                if len(positions):
+                    header_end = position + int(positions[0]) + 1
+                    positions = positions[1:]
+                    offsets.append(header_end)
+            if header_end is not None and len(positions):
+                # Data record n starts after the n-th newline following the header
+                record_numbers = newlines + 1 + np.arange(len(positions))
+                selected = positions[record_numbers % stride == 0]
+                offsets.extend((position + selected + 1).tolist())
+                newlines += len(positions)
+            position += len(chunk)
+
+        row_count = newlines
+        if header_end is not None and position > max(record_start, header_end):
+            row_count += 1  # last record without a trailing newline
+        # Drop a checkpoint that points at end of file (trailing newline)
+        offsets = [offset for offset in offsets if offset < position] or [position]
+        return cls(stride, np.asarray(offsets, dtype=np.int64), row_count, header, position, modification_time)
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        meta = {
+            'stride': self.stride,
+            'row_count': self.row_count,
+            'header': self.header.decode('utf-8', errors='replace'),
+            'length': self.length,
+            'modification_time': self.modification_time
+        }
+        # Write to a temp file first so readers never see a partial index
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, offsets=self.offsets, meta=np.array(json.dumps(meta)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            return cls(meta['stride'], data['offsets'], meta['row_count'], meta['header'].encode('utf-8'),
+                       meta['length'], meta['modification_time'])
+
+# Bumped when the meaning of the stored offsets changes (2: record ends outside quoted fields)
+ROW_INDEX_FORMAT = 2
+
+def row_index_path(hdfs_path, modification_time):
+    """Local index file keyed by path, modificationTime and index format"""
+    stem = hashlib.sha1(hdfs_path.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(Config.ROW_INDEX_DIR, f"{stem}_{modification_time}.v{ROW_INDEX_FORMAT}.npz")
+
+class RowIndexStore:
+    """Row indexes per file version: in memory (LRU), on local disk, built on first use"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._indexes = OrderedDict()  # (path, version) -> RowIndex
+        self._building = {}  # (path, version) -> lock held while the index is built
+        self._lock = threading.Lock()
+
+    def get(self, hdfs_path, file_status):
+        version = file_version(file_status)
+        key = (hdfs_path, version)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        # Concurrent requests for the same version wait for a single build
+        with build_lock:
+            with self._lock:
+                index = self._indexes.get(key)
+            if index is None:
+                index = self._load_or_build(hdfs_path, file_status)
+            with self._lock:
+                self._building.pop(key, None)
+                for stale in [k for k in self._indexes if k[0] == hdfs_path]:
+                    del self._indexes[stale]
+                self._indexes[key] = index
+                while len(self._indexes) > self.max_entries:
+                    self._indexes.popitem(last=False)
+            return index
+
+    def _load_or_build(self, hdfs_path, file_status):
+        modification_time = file_status['modificationTime']
+        path = row_index_path(hdfs_path, modification_time)
+        if os.path.exists(path):
+            try:
+                return RowIndex.load(path)
+            except Exception as e:
+                logger.warning(f"Could not load row index {path}, rebuilding: {e}")
+
+        from app.services.simple_analyzer import open_hdfs_file
+        
+        logger.info(f"Building row index for {hdfs_path} (every {Config.ROW_INDEX_STRIDE} records)")
+        with open_hdfs_file(hdfs_path) as stream:
+            index = RowIndex.build(stream, Config.ROW_INDEX_STRIDE, modification_time)
+        try:
+            index.save(path)
+            self._remove_stale(path)
+        except Exception as e:
+            logger.warning(f"Could not save row index for {hdfs_path}: {e}")
+        logger.info(f"Row index for {hdfs_path}: {index.row_count} rows, {len(index.offsets)} checkpoints")
+        return index
+
+    def _remove_stale(self, current):
+        prefix = os.path.basename(current).rsplit('_', 1)[0] + '_'
+        for name in os.listdir(Config.ROW_INDEX_DIR):
+            if name.startswith(prefix) and name.endswith('.npz') and os.path.join(Config.ROW_INDEX_DIR, name) != current:
+                os.remove(os.path.join(Config.ROW_INDEX_DIR, name))
+
+# Process-wide row index store used by /rows
+row_index_store = RowIndexStore()
+
+def read_rows(hdfs_path, offset=0, limit=None):
+    """Records offset .. offset + limit - 1 of an HDFS CSV, fetched with one ranged OPEN
+    
+    Compressed files cannot be read from an offset; they are streamed up to the requested rows.
+    """
+    from app.services.simple_analyzer import normalize_hdfs_path
+
+    limit = min(limit or Config.ROWS_DEFAULT_LIMIT, Config.ROWS_MAX_LIMIT)
+    if offset < 0 or limit < 1:
+        raise ValueError("offset must be >= 0 and limit >= 1")
+
+    normalized_path = normalize_hdfs_path(hdfs_path)
+    file_status = get_file_status(normalized_path)
+    index = row_index_store.get(normalized_path, file_status)
+    columns = index.columns
+    result = {
+        "columns": columns,
+        "offset": offset,
+        "limit": limit,
+        "total_rows": index.row_count,
+        "rows": [],
+        "bytes_read": 0
+    }
+    if offset >= index.row_count:
+        return result
+
+    if index.length != file_status['length']:
+        # Index offsets of a compressed file point into its decompressed bytes
+        from app.services.simple_analyzer import open_hdfs_file
+        with open_hdfs_file(normalized_path, spool=False) as stream:
+            df = pd.read_csv(stream, header=None, names=columns, skiprows=offset + 1, nrows=limit)
+        result["rows"] = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+        result["bytes_read"] = None
+        return result
+
+    start, end, skip = index.byte_range(offset, limit)
+    response = get_client().open(normalized_path, offset=start, length=end - start)
+    try:
+        data = response.content
+    finally:
+        response.close()
+
+    df = pd.read_csv(BytesIO(data), header=None, names=columns, skiprows=skip, nrows=limit)
+    result["rows"] = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+    result["bytes_read"] = len(data)
+    return result
@@ -0,0 +1,163 @@
+import logging
+import random
+from io import BytesIO
+import numpy as np
+import pandas as pd
+from app.config import Config
+from app.services.analysis_cache import metadata_cache, file_version
+from app.services.compression import detect_codec
+from app.services.hdfs_utils import get_file_status
+from app.services.metrics import span
+from app.services.range_reader import read_record_range
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SCHEMA_VARIANT = 'schema'
+
+def sample_csv(hdfs_path, file_length, modification_time=None):
+    """Header and records from the head of the file plus a few random byte ranges after it
+
+    One range is drawn from each of SCHEMA_SAMPLE_RANGES equal strata of the rest of the file, so
+    ranges never overlap. The draw is seeded by path and version, so a version is always sampled
+    the same way.
+    """
+    head_end = min(Config.SCHEMA_SAMPLE_HEAD_BYTES, file_length)
+    parts = [read_record_range(hdfs_path, 0, head_end, file_length, skip_header=False)]
+
+    rest = file_length - head_end
+    ranges = Config.SCHEMA_SAMPLE_RANGES
+    if rest > 0 and ranges > 0:
+        rng = random.Random(f"{hdfs_path}:{modification_time}")
+        stratum = rest / ranges
+        range_bytes = int(min(Config.SCHEMA_SAMPLE_RANGE_BYTES, stratum))
+        for k in range(ranges):
+            low = head_end + int(k * stratum)
+            start = rng.randint(low, max(low, head_end + int((k + 1) * stratum) - range_bytes))
+            parts.append(read_record_range(hdfs_path, start, min(start + range_bytes, file_length), file_length))
+
+    # Every part ends with a newline except possibly one that reaches end of file
+    return b''.join(part if part.endswith(b'\n') else part + b'\n' for part in parts if part)
+
+def infer_schema(sample, category_max_ratio=None):
+    """Column kinds and compact representations chosen from a sample DataFrame
+
+    Strings become categorical when the sample has at most category_max_ratio distinct values per
+    non-null value; floats are marked float32 candidates when every sampled value survives the
+    round trip through float32.
+    """
+    if category_max_ratio is None:
+        category_max_ratio = Config.SCHEMA_CATEGORY_MAX_RATIO
+
+    columns = []
+    for name, values in sample.items():
+        non_null = values.dropna()
+        if not len(non_null):
+            kind = 'empty'
+        elif pd.api.types.is_bool_dtype(values):
+            kind = 'boolean'
+        elif pd.api.types.is_integer_dtype(values):
+            kind = 'integer'
+        elif pd.api.types.is_float_dtype(values):
+            kind = 'float'
+        else:
+            kind = 'string'
+
+        column = {"name": name, "kind": kind}
+        if kind == 'float':
+            column["float32"] = _float32_lossless(non_null.to_numpy(dtype=np.float64))
+        elif kind == 'string':
+            column["category"] = bool(non_null.nunique() <= category_max_ratio * len(non_null))
+        columns.append(column)
+
+    return {"columns": columns, "sampled_rows": len(sample)}
+
+def get_schema(hdfs_path, file_status=None):
+    """Inferred schema of the current file version, cached per version"""
+    from app.services.simple_analyzer import normalize_hdfs_path
+
+    normalized_path = normalize_hdfs_path(hdfs_path)
+    file_status = file_status or get_file_status(normalized_path)
+    version = file_version(file_status)
+
+    cached = metadata_cache.get(normalized_path, version, SCHEMA_VARIANT)
+    if cached is not None:
+        return cached
+
+    # Byte ranges of a compressed file are not records
+    if detect_codec(normalized_path) is not None:
+        raise ValueError(f"{normalized_path} is compressed, its schema cannot be sampled by byte range")
+    with span('schema.infer'):
+        sample = sample_csv(normalized_path, file_status['length'], file_status.get('modificationTime'))
+        if detect_codec(head=sample[:4]) is not None:
+            raise ValueError(f"{normalized_path} is compressed, its schema cannot be sampled by byte range")
+        schema = infer_schema(pd.read_csv(BytesIO(sample)))
+    schema["sampled_bytes"] = len(sample)
+    logger.info(f"Inferred schema of {normalized_path} from {schema['sampled_rows']} sampled rows "
+                f"({len(sample)} bytes)")
+
+    metadata_cache.put(normalized_path, version, schema, SCHEMA_VARIANT)
+    return schema
+
+def category_columns(schema):
+    """Columns the schema stores as categoricals"""
+    return [column["name"] for column in schema["columns"] if column.get("category")]
+
+def pandas_dtypes(schema):
+    """Parse-time dtypes for pd.read_csv
+
+    Only categoricals are set while parsing: they hold any value, whereas a narrow numeric dtype
+    chosen from a sample would fail on (or, for integers, silently wrap) a value outside it.
+    Numeric columns are narrowed by compact_dataframe after the whole column is known.
+    """
+    return {name: 'category' for name in category_columns(schema)}
+
+def _float32_lossless(values):
+    with np.errstate(over='ignore'):
+        narrowed = values.astype(np.float32)
+    return bool(np.array_equal(narrowed.astype(np.float64), values, equal_nan=True))
+
+def compact_dataframe(df, schema=None, category_max_ratio=None):
+    """Narrow a loaded DataFrame in place: smallest integer dtype, float32 where lossless, categoricals
+
+    Without a schema the categorical choice is made from the frame itself.
+    """
+    if category_max_ratio is None:
+        category_max_ratio = Config.SCHEMA_CATEGORY_MAX_RATIO
+    specs = {column["name"]: column for column in schema["columns"]} if schema else {}
+
+    for i, (name, values) in enumerate(list(df.items())):
+        spec = specs.get(name)
+        if pd.api.types.is_bool_dtype(values) or isinstance(values.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_integer_dtype(values):
+            df.isetitem(i, pd.to_numeric(values, downcast='integer'))
+        elif pd.api.types.is_float_dtype(values):
+            if values.dtype != np.float32 and (spec is None or spec.get("float32", True)):
+                data = values.to_numpy()
+                if _float32_lossless(data):
+                    df.isetitem(i, pd.Series(data.astype(np.float32), index=values.index, name=name))
+        elif pd.api.types.is_string_dtype(values) or values.dtype == object:
+            if spec is not None:
+                categorical = spec.get("category", False)
+            else:
+                non_null = values.count()
+                categorical = non_null > 0 and values.nunique() <= category_max_ratio * non_null
+            if categorical:
+                df.isetitem(i, values.astype('category'))
+    return df
+
+def memory_footprint(df):
+    """Deep memory use of the frame as loaded and as pandas would hold it with its default dtypes"""
+    before = int(df.index.memory_usage(deep=True))
+    for _, values in df.items():
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            before += int(values.astype(values.cat.categories.dtype).memory_usage(deep=True, index=False))
+        elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            before += len(values) * 8  # int64 / float64
+        else:
+            before += int(values.memory_usage(deep=True, index=False))
+    return {
+        "before_bytes": before,
+        "after_bytes": int(df.memory_usage(deep=True).sum())
+    }
@@ -2,35 +2,34 @@ import pandas as pd
 import numpy as np
 import logging
 from app.config import Config
-from app.services.hdfs_utils import list_hdfs_directory
-import requests
+from app.services.hdfs_utils import list_hdfs_directory, get_file_status
+from app.services.webhdfs_client import get_client
+from app.services.analysis_cache import analysis_cache, file_version, cache_variant
+from app.services.column_profiler import CsvProfiler, profile_csv_stream
+from app.services.batch_stats import compute_numeric_stats
+from app.services.correlation import dataframe_correlation
+from app.services.metrics import span, record_span
+from app.services.schema_inference import (
+    get_schema, pandas_dtypes, category_columns, compact_dataframe, memory_footprint
+)
+from app.services.range_reader import QuotedNewlineError, map_record_ranges, read_header
+from app.services.profile_state import extend_profile_state, save_profile_state
+from app.services.compression import open_decompressed, detect_codec
+from app.services.columnar_sidecar import (
+    sidecar_enabled, has_local_sidecar, sidecar_unconvertible, materialize_sidecar, read_sidecar_columns,
+    iter_sidecar_frames
+)
+import io
 import json
-from io import StringIO
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from io import StringIO, BytesIO
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-def fix_datanode_url(url):
-    """Replace hostname with IP address in DataNode URLs"""
-    # Get the current HDFS IP
-    config = Config()
-    current_ip = config.get_hdfs_ip()
-    
-    # Replace quickstart.cloudera with the current IP address
-    fixed_url = url.replace('quickstart.cloudera', current_ip)
-    
-    # Also replace any other hostnames that might be in the URL
-    # Extract IP from URL if it contains a different IP
-    import re
-    ip_pattern = r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b'
-    ips_in_url = re.findall(ip_pattern, url)
-    
-    for old_ip in ips_in_url:
-        if old_ip != current_ip:
-            fixed_url = fixed_url.replace(old_ip, current_ip)
-    
-    return fixed_url
-
 def normalize_hdfs_path(hdfs_path):
     """Normalize HDFS path to ensure it's a relative path for WebHDFS"""
     # If it's a full HDFS URI, extract just the path part
@@ -47,52 +46,79 @@ def normalize_hdfs_path(hdfs_path):
             return '/' + hdfs_path
         return hdfs_path
 
-def download_hdfs_file(hdfs_path):
-    """Download file from HDFS using WebHDFS REST API"""
+@contextmanager
+def open_hdfs_file(hdfs_path, spool=None):
+    """Open an HDFS file as a binary stream that the CSV parser can read from directly
+    
+    The DataNode response is never materialized as a full bytes/str object. With spool=True the
+    body is copied chunk by chunk into a SpooledTemporaryFile (kept in memory up to
+    DOWNLOAD_SPOOL_MAX_MEMORY, then on disk) so the HTTP connection is released before parsing.
+    Compressed files (gzip, bz2, zstd, lz4) are transferred and spooled compressed and decompressed
+    as the parser reads.
+    """
+    if spool is None:
+        spool = Config.DOWNLOAD_SPOOL
+    
+    logger.info(f"Opening HDFS path: {hdfs_path}")
+    
+    # Normalize the path
+    normalized_path = normalize_hdfs_path(hdfs_path)
+    
+    # Use WebHDFS to read the file (NameNode redirect is followed by the client)
+    response = get_client().open(normalized_path)
+    
+    try:
+        # Undo any Content-Encoding while reading the raw socket stream
+        response.raw.decode_content = True
+        if spool:
+            with tempfile.SpooledTemporaryFile(max_size=Config.DOWNLOAD_SPOOL_MAX_MEMORY) as spooled:
+                with span('hdfs.transfer'):
+                    shutil.copyfileobj(response.raw, spooled, Config.DOWNLOAD_CHUNK_BYTES)
+                response.close()
+                spooled.seek(0)
+                with open_decompressed(spooled, normalized_path) as stream:
+                    yield stream
+        else:
+            # Kept open at EOF so the buffered reader returns b'' instead of failing on a closed stream
+            response.raw.auto_close = False
+            buffered = io.BufferedReader(response.raw, Config.DOWNLOAD_CHUNK_BYTES)
+            with open_decompressed(buffered, normalized_path) as stream:
+                yield stream
+    finally:
+        response.close()
+
+def _csv_source(csv_content):
+    """Accept either CSV text or a file-like object (e.g. from open_hdfs_file)"""
+    if isinstance(csv_content, str):
+        return StringIO(csv_content)
+    return csv_content
+
+def analyze_csv_data(csv_content, streaming=None, approximate=None, schema=None):
+    """Analyze CSV data using pandas (with the file's inferred schema, if given)"""
+    if streaming is None:
+        streaming = Config.PROFILER_STREAMING
+    if approximate is None:
+        approximate = Config.PROFILER_APPROXIMATE
+    if streaming or approximate:
+        return analyze_csv_data_streaming(csv_content, approximate=approximate)
+    
     try:
-        logger.info(f"Downloading from HDFS path: {hdfs_path}")
+        # Read CSV from string content or stream, then narrow it to compact dtypes
+        # (a streamed HDFS body is transferred while parsing, so csv.parse includes the download)
+        with span('csv.parse'):
+            df = pd.read_csv(_csv_source(csv_content), dtype=pandas_dtypes(schema) if schema else None)
+        with span('csv.compact'):
+            compact_dataframe(df, schema)
         
-        # Normalize the path
-        normalized_path = normalize_hdfs_path(hdfs_path)
-        
-        # Use WebHDFS to read the file
-        config = Config()
-        webhdfs_url = f"{config.HDFS_URL}/webhdfs/v1{normalized_path}?op=OPEN&user.name={Config.HDFS_USER}"
-        
-        response = requests.get(webhdfs_url, stream=True, allow_redirects=False)
+        return analyze_dataframe(df)
         
-        if response.status_code == 307:  # Redirect to DataNode
-            # Get the redirect URL and fix the hostname
-            datanode_url = response.headers['Location']
-            
-            # Fix the hostname in the URL
-            fixed_datanode_url = fix_datanode_url(datanode_url)
-            
-            # Download from DataNode with fixed URL
-            download_response = requests.get(fixed_datanode_url, stream=True)
-            if download_response.status_code == 200:
-                # Read the CSV content
-                content = download_response.content.decode('utf-8')
-                return content
-            else:
-                raise Exception(f"Failed to download from DataNode: {download_response.status_code} - {download_response.text}")
-        elif response.status_code == 200:
-            # Direct response (no redirect)
-            content = response.content.decode('utf-8')
-            return content
-        else:
-            raise Exception(f"Failed to download file: {response.status_code} - {response.text}")
-            
     except Exception as e:
-        logger.error(f"Error downloading file: {str(e)}")
-        raise
+        logger.error(f"Error analyzing CSV data: {str(e)}")
+        raise Exception(f"Analysis failed: {str(e)}")
 
-def analyze_csv_data(csv_content):
-    """Analyze CSV data using pandas"""
+def analyze_dataframe(df):
+    """Analyze a loaded DataFrame (from CSV text/stream or a columnar sidecar)"""
     try:
-        # Read CSV from string content
-        df = pd.read_csv(StringIO(csv_content))
-        
         logger.info(f"DataFrame loaded with {len(df)} rows and {len(df.columns)} columns")
         
         # Get schema
@@ -104,19 +130,33 @@ def analyze_csv_data(csv_content):
         # Get row count
         row_count = len(df)
         
+        # Numeric columns are profiled together as one batched block
+        try:
+            with span('stats.numeric'):
+                numeric_stats = compute_numeric_stats(df, histogram_bins=Config.PROFILER_HISTOGRAM_BINS)
+        except Exception as e:
+            logger.warning(f"Batched numeric statistics failed, falling back to per-column analysis: {e}")
+            numeric_stats = {}
+        
         # Analyze columns
         col_stats = []
         summary_lines = []
+        columns_started = time.perf_counter()
         
         for column in df.columns:
-            logger.info(f"Analyzing column: {column}")
+            logger.debug(f"Analyzing column: {column}")
             
             col_data = df[column]
             dtype = str(col_data.dtype)
+            batched = numeric_stats.get(column)
             
             # Basic stats
-            missing = col_data.isnull().sum()
-            unique = col_data.nunique()
+            if batched is not None:
+                missing = int(batched["missing"])
+                unique = int(batched["unique"])
+            else:
+                missing = col_data.isnull().sum()
+                unique = col_data.nunique()
             
             stat = {
                 "name": column,
@@ -128,17 +168,22 @@ def analyze_csv_data(csv_content):
             # Numeric analysis
             if pd.api.types.is_numeric_dtype(col_data):
                 try:
-                    stat.update({
-                        "mean": float(col_data.mean()) if not pd.isna(col_data.mean()) else None,
-                        "std": float(col_data.std()) if not pd.isna(col_data.std()) else None,
-                        "min": float(col_data.min()) if not pd.isna(col_data.min()) else None,
-                        "max": float(col_data.max()) if not pd.isna(col_data.max()) else None,
-                        "median": float(col_data.median()) if not pd.isna(col_data.median()) else None,
-                    })
-                    
-                    # Mode
-                    mode_values = col_data.mode()
-                    stat["mode"] = float(mode_values.iloc[0]) if len(mode_values) > 0 else None
+                    if batched is not None:
+                        stat.update({key: batched[key] for key in ("mean", "std", "min", "max", "median", "mode")})
+                        if "histogram" in batched:
+                            stat["histogram"] = batched["histogram"]
+                    else:
+                        stat.update({
+                            "mean": float(col_data.mean()) if not pd.isna(col_data.mean()) else None,
+                            "std": float(col_data.std()) if not pd.isna(col_data.std()) else None,
+                            "min": float(col_data.min()) if not pd.isna(col_data.min()) else None,
+                            "max": float(col_data.max()) if not pd.isna(col_data.max()) else None,
+                            "median": float(col_data.median()) if not pd.isna(col_data.median()) else None,
+                        })
+                        
+                        # Mode
+                        mode_values = col_data.mode()
+                        stat["mode"] = float(mode_values.iloc[0]) if len(mode_values) > 0 else None
                     
                     summary_lines.append(f"Column '{column}' (numeric): min={stat['min']}, max={stat['max']}, mean={stat['mean']:.2f}, median={stat['median']}, missing={missing}, unique={unique}.")
                     
@@ -158,34 +203,249 @@ def analyze_csv_data(csv_content):
                     summary_lines.append(f"Column '{column}' (type: {dtype}): missing={missing}, unique={unique}.")
             
             col_stats.append(stat)
+        record_span('stats.columns', time.perf_counter() - columns_started)
         
         # Create summary paragraph
         summary_para = f"The dataset contains {row_count} rows and {len(df.columns)} columns. " + ' '.join(summary_lines)
         
-        logger.info("Analysis completed successfully")
-        
-        return {
+        result = {
             "schema": schema,
             "sample": sample,
             "row_count": row_count,
             "columns": col_stats,
-            "summary": summary_para
+            "summary": summary_para,
+            "memory": memory_footprint(df)
         }
+        if Config.PROFILER_CORRELATION:
+            with span('stats.correlation'):
+                result["correlation"] = dataframe_correlation(df)
+        
+        logger.info("Analysis completed successfully")
+        
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error analyzing CSV data: {str(e)}")
+        raise Exception(f"Analysis failed: {str(e)}")
+
+def analyze_csv_data_streaming(csv_content, chunksize=None, approximate=False):
+    """Analyze CSV data in chunks with bounded memory (same payload as analyze_csv_data)"""
+    try:
+        with span('profile.stream'):
+            profiler = profile_csv_stream(_csv_source(csv_content), chunksize=chunksize, approximate=approximate)
+        
+        logger.info(f"Streaming profile completed with {profiler.row_count} rows and {len(profiler.columns)} columns")
+        
+        return profiler.result()
         
     except Exception as e:
         logger.error(f"Error analyzing CSV data: {str(e)}")
         raise Exception(f"Analysis failed: {str(e)}")
 
-def analyze_hdfs_file_simple(hdfs_path):
+def analyze_sidecar(hdfs_path, modification_time, streaming=None, approximate=False, schema=None):
+    """Analyze a file version from its memory-mapped columnar sidecar instead of re-parsing CSV"""
+    if streaming is None:
+        streaming = Config.PROFILER_STREAMING
+    if not (streaming or approximate):
+        categories = category_columns(schema) if schema else None
+        with span('sidecar.read'):
+            df = read_sidecar_columns(hdfs_path, modification_time, categories=categories)
+        with span('csv.compact'):
+            compact_dataframe(df, schema)
+        return analyze_dataframe(df)
+    
+    return profile_sidecar(hdfs_path, modification_time, approximate=approximate).result()
+
+def profile_sidecar(hdfs_path, modification_time, approximate=False):
+    """Fold a file version's sidecar record batches into a mergeable profile"""
+    profiler = CsvProfiler(approximate=approximate)
+    with span('profile.stream'):
+        for frame in iter_sidecar_frames(hdfs_path, modification_time):
+            profiler.update(frame)
+    return profiler
+
+def ensure_sidecar(normalized_path, modification_time):
+    """Whether a sidecar of this file version is available, materializing it on first use
+    
+    False when sidecars are disabled or the version cannot be converted (callers read CSV then).
+    """
+    if not sidecar_enabled() or sidecar_unconvertible(normalized_path, modification_time):
+        return False
+    if not has_local_sidecar(normalized_path, modification_time):
+        with open_hdfs_file(normalized_path) as stream:
+            return materialize_sidecar(normalized_path, modification_time, stream) is not None
+    return True
+
+def load_columns(hdfs_path, columns=None):
+    """Load selected columns of an HDFS file, from the columnar sidecar when one exists"""
+    normalized_path = normalize_hdfs_path(hdfs_path)
+    modification_time = get_file_status(normalized_path)['modificationTime']
+    
+    if ensure_sidecar(normalized_path, modification_time):
+        return read_sidecar_columns(normalized_path, modification_time, columns)
+    
+    with open_hdfs_file(normalized_path) as stream:
+        return pd.read_csv(stream, usecols=columns)
+
+def iter_column_frames(hdfs_path, columns, chunksize=None):
+    """Yield selected columns of an HDFS file chunk by chunk, from the columnar sidecar when enabled
+    
+    Missing columns surface as KeyError when the chunk is indexed.
+    """
+    normalized_path = normalize_hdfs_path(hdfs_path)
+    modification_time = get_file_status(normalized_path)['modificationTime']
+    
+    if ensure_sidecar(normalized_path, modification_time):
+        # Record batches are projected before conversion, so only these columns reach pandas
+        for frame in iter_sidecar_frames(normalized_path, modification_time, columns):
+            yield frame
+        return
+    
+    with open_hdfs_file(normalized_path) as stream:
+        for chunk in pd.read_csv(stream, usecols=lambda column: column in columns,
+                                 chunksize=chunksize or Config.PROFILER_CHUNK_ROWS):
+            yield chunk
+
+def profile_hdfs_file_parallel(hdfs_path, file_length, approximate=False):
+    """Profile an HDFS file as concurrently fetched byte ranges, merging per-range profiles"""
+    normalized_path = normalize_hdfs_path(hdfs_path)
+    
+    # Every range is parsed with the header's column names
+    header = read_header(normalized_path, file_length)
+    codec = detect_codec(head=header[:4])
+    if codec is not None:
+        # Compressed bytes cannot be split at record boundaries
+        logger.info(f"{normalized_path} is {codec}-compressed, profiling it as one stream")
+        with open_hdfs_file(normalized_path) as stream, span('profile.stream'):
+            return profile_csv_stream(stream, approximate=approximate)
+    names = list(pd.read_csv(BytesIO(header), nrows=0).columns)
+    
+    def profile_range(index, records):
+        if not records:
+            return CsvProfiler(approximate=approximate)
+        logger.info(f"Profiling range {index} ({len(records)} bytes)")
+        return profile_csv_stream(BytesIO(records), names=names, approximate=approximate)
+    
+    try:
+        with span('profile.parallel'):
+            profilers = map_record_ranges(normalized_path, file_length, profile_range)
+    except QuotedNewlineError as e:
+        logger.info(f"{e}, profiling it as one stream")
+        with open_hdfs_file(normalized_path) as stream, span('profile.stream'):
+            return profile_csv_stream(stream, approximate=approximate)
+    
+    profiler = profilers[0]
+    for partial in profilers[1:]:
+        profiler.merge(partial)
+    
+    # Keep the header's column order even if the first range was empty
+    profiler.columns = {name: profiler.columns[name] for name in names if name in profiler.columns}
+    
+    logger.info(f"Parallel profile completed with {profiler.row_count} rows from {len(profilers)} ranges")
+    return profiler
+
+def analyze_hdfs_file_parallel(hdfs_path, file_length, approximate=False):
+    """Analyze an HDFS file as concurrently fetched byte ranges, merging per-range profiles"""
+    try:
+        return profile_hdfs_file_parallel(hdfs_path, file_length, approximate=approximate).result()
+        
+    except Exception as e:
+        logger.error(f"Error in analyze_hdfs_file_parallel: {str(e)}")
+        raise Exception(f"Analysis failed: {str(e)}")
+
+def profile_hdfs_file(hdfs_path, file_status=None, approximate=False, parallel=False):
+    """Mergeable profile of an HDFS file: from parallel byte ranges, its sidecar or a streamed download"""
+    normalized_path = normalize_hdfs_path(hdfs_path)
+    if parallel and file_status is not None:
+        return profile_hdfs_file_parallel(normalized_path, file_status['length'], approximate=approximate)
+    
+    # First analysis of a version materializes the sidecar, later ones skip CSV parsing
+    if file_status is not None and ensure_sidecar(normalized_path, file_status['modificationTime']):
+        return profile_sidecar(normalized_path, file_status['modificationTime'], approximate=approximate)
+    
+    # Stream the file from HDFS straight into the chunked profiler
+    with open_hdfs_file(normalized_path) as stream, span('profile.stream'):
+        return profile_csv_stream(stream, approximate=approximate)
+
+def use_parallel_read(normalized_path, file_status, parallel=None):
+    """Whether a file is read as parallel byte ranges (large uncompressed files, if PARALLEL_READ)"""
+    if parallel is not None:
+        return parallel
+    # Needs the length from GETFILESTATUS; compressed files are only read as one stream
+    return (Config.PARALLEL_READ and file_status is not None and detect_codec(normalized_path) is None
+            and file_status['length'] >= Config.PARALLEL_READ_MIN_BYTES)
+
+def analysis_variant(normalized_path, file_status, streaming=None, approximate=None, parallel=None):
+    """Cache variant of an analysis request, as analyze_hdfs_file_simple will compute it"""
+    if streaming is None:
+        streaming = Config.PROFILER_STREAMING
+    if approximate is None:
+        approximate = Config.PROFILER_APPROXIMATE
+    return cache_variant(approximate, streaming or use_parallel_read(normalized_path, file_status, parallel))
+
+def analyze_hdfs_file_simple(hdfs_path, streaming=None, approximate=None, parallel=None):
     """Analyze HDFS file using simple pandas approach"""
     try:
         logger.info(f"Starting simple analysis for HDFS path: {hdfs_path}")
         
-        # Download file from HDFS
-        csv_content = download_hdfs_file(hdfs_path)
+        # Validate the cached result against the current file version
+        normalized_path = normalize_hdfs_path(hdfs_path)
+        if streaming is None:
+            streaming = Config.PROFILER_STREAMING
+        if approximate is None:
+            approximate = Config.PROFILER_APPROXIMATE
+        try:
+            file_status = get_file_status(normalized_path)
+            version = file_version(file_status)
+        except Exception as e:
+            logger.warning(f"Could not get file status for {normalized_path}, bypassing cache: {e}")
+            file_status, version = None, None
+        
+        # Large files are read as parallel byte ranges, into the same mergeable profile as streaming
+        compressed = detect_codec(normalized_path) is not None
+        parallel = use_parallel_read(normalized_path, file_status, parallel)
+        variant = analysis_variant(normalized_path, file_status, streaming, approximate, parallel)
+        
+        if version is not None:
+            cached = analysis_cache.get(normalized_path, version, variant)
+            if cached is not None:
+                logger.info(f"Serving cached analysis for {normalized_path}")
+                return cached
+        
+        # Whole-file DataFrames are read with the schema inferred from a sample of this version
+        schema = None
+        if (Config.SCHEMA_INFERENCE and file_status is not None and not parallel and not compressed
+                and not (streaming or approximate)):
+            try:
+                schema = get_schema(normalized_path, file_status)
+            except Exception as e:
+                logger.warning(f"Schema inference failed for {normalized_path}, using pandas inference: {e}")
+        
+        if parallel or streaming or approximate:
+            # Mergeable profile: an append-only file that grew is profiled from its new tail only
+            profiler = None
+            incremental = Config.INCREMENTAL_ANALYSIS and file_status is not None and not compressed
+            if incremental:
+                profiler = extend_profile_state(normalized_path, file_status, variant, approximate)
+            if profiler is None:
+                profiler = profile_hdfs_file(normalized_path, file_status, approximate=approximate, parallel=parallel)
+                if incremental:
+                    # Appended rows are parsed by the reader this profile came from
+                    from_sidecar = not parallel and has_local_sidecar(normalized_path, file_status['modificationTime'])
+                    save_profile_state(normalized_path, file_status, variant, profiler,
+                                       reader='arrow' if from_sidecar else 'pandas')
+            result = profiler.result()
+        elif file_status is not None and ensure_sidecar(normalized_path, file_status['modificationTime']):
+            # First analysis of a version materializes the sidecar, later ones skip CSV parsing
+            result = analyze_sidecar(normalized_path, file_status['modificationTime'], streaming=streaming,
+                                     approximate=approximate, schema=schema)
+        else:
+            # Stream the file from HDFS straight into the parser
+            with open_hdfs_file(hdfs_path) as stream:
+                result = analyze_csv_data(stream, streaming=streaming, approximate=approximate, schema=schema)
         
-        # Analyze the data
-        result = analyze_csv_data(csv_content)
+        if version is not None:
+            analysis_cache.put(normalized_path, version, result, variant)
         
         return result
         
@@ -0,0 +1,351 @@
+import base64
+import math
+import numpy as np
+import pandas as pd
+
+def _hash_values(values):
+    """Deterministic 64-bit hashes (stable across processes, so sketches can be merged anywhere)"""
+    return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy(dtype=np.uint64)
+
+def _count_leading_zeros(x):
+    """Exact count of leading zero bits for an array of uint64"""
+    x = x.copy()
+    zeros = np.zeros(len(x), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = x < np.uint64(1 << (64 - shift))
+        zeros[mask] += shift
+        x[mask] <<= np.uint64(shift)
+    zeros[x == 0] = 64
+    return zeros
+
+def _encode_array(arr):
+    return base64.b64encode(np.ascontiguousarray(arr).tobytes()).decode('ascii')
+
+def _decode_array(data, dtype):
+    return np.frombuffer(base64.b64decode(data), dtype=dtype).copy()
+
+class HyperLogLog:
+    """HyperLogLog distinct-count sketch (mergeable by register-wise max)"""
+
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @classmethod
+    def for_error(cls, relative_error):
+        """Smallest sketch whose standard error (1.04 / sqrt(m)) is within relative_error"""
+        precision = math.ceil(math.log2((1.04 / relative_error) ** 2))
+        return cls(min(max(precision, 4), 18))
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update(self, values):
+        """Add an array/Series of (non-null) values"""
+        if len(values) == 0:
+            return self
+        hashes = _hash_values(values)
+        p = np.uint64(self.precision)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rank = _count_leading_zeros(hashes << p) + 1
+        rank = np.minimum(rank, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and empty:
+            # Small-range correction (linear counting)
+            return int(round(m * math.log(m / empty)))
+        return int(round(raw))
+
+    def to_dict(self):
+        return {'type': 'hll', 'precision': self.precision, 'registers': _encode_array(self.registers)}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['precision'])
+        sketch.registers = _decode_array(data['registers'], np.uint8)
+        return sketch
+
+class KllSketch:
+    """KLL quantile sketch over floats (mergeable, rank error ~ 2.296 / k^0.9723)"""
+
+    def __init__(self, k=200, seed=None):
+        if k < 8:
+            raise ValueError(f"KLL k must be at least 8, got {k}")
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def for_error(cls, rank_error):
+        """Smallest k whose normalized rank error is within rank_error"""
+        return cls(max(8, math.ceil((2.296 / rank_error) ** (1 / 0.9723))))
+
+    @property
+    def rank_error(self):
+        return 2.296 / self.k ** 0.9723
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values):
+        """Add an array of (non-null) numeric values"""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        if other.k != self.k:
+            raise ValueError("Cannot merge KLL sketches with different k")
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                items = np.sort(items)
+                # Keep one item behind when the buffer is odd so total weight is preserved
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[:len(items) - len(keep)]
+                promoted = pairs[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1)"""
+        if self.n == 0:
+            return None
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 1 << level, dtype=np.int64)
+                                  for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, cumulative = values[order], np.cumsum(weights[order])
+        index = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return float(values[min(index, len(values) - 1)])
+
+    def to_dict(self):
+        return {
+            'type': 'kll',
+            'k': self.k,
+            'n': self.n,
+            'levels': [_encode_array(items) for items in self.levels]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['k'])
+        sketch.n = data['n']
+        sketch.levels = [_decode_array(items, np.float64) for items in data['levels']]
+        return sketch
+
+class FrequentItems:
+    """Misra-Gries heavy-hitters sketch for the mode (counts are underestimated by at most n / capacity)"""
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counters = {}
+        self.n = 0
+
+    @property
+    def max_error(self):
+        return self.n / (self.capacity + 1) if self.n else 0
+
+    def update(self, counts):
+        """Add a {value: count} mapping (e.g. one chunk's value_counts)"""
+        for value, count in counts.items():
+            self.counters[value] = self.counters.get(value, 0) + int(count)
+            self.n += int(count)
+        self._prune()
+        return self
+
+    def merge(self, other):
+        self.n += other.n
+        for value, count in other.counters.items():
+            self.counters[value] = self.counters.get(value, 0) + count
+        self._prune()
+        return self
+
+    def _prune(self):
+        if len(self.counters) <= self.capacity:
+            return
+        # Subtract the (capacity+1)-th largest count from every counter and drop non-positive ones
+        threshold = sorted(self.counters.values(), reverse=True)[self.capacity]
+        self.counters = {v: c - threshold for v, c in self.counters.items() if c > threshold}
+
+    def most_frequent(self):
+        if not self.counters:
+            return None
+        top = max(self.counters.values())
+        candidates = [v for v, c in self.counters.items() if c == top]
+        try:
+            return min(candidates)
+        except TypeError:
+            return min(candidates, key=str)
+
+    def to_dict(self):
+        return {
+            'type': 'frequent_items',
+            'capacity': self.capacity,
+            'n': self.n,
+            'items': [[value, count] for value, count in self.counters.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['capacity'])
+        sketch.n = data['n']
+        sketch.counters = {value: count for value, count in data['items']}
+        return sketch
+
+class StreamingHistogram:
+    """Fixed-bin histogram over an unknown range (mergeable)
+
+    The first values fix the bin width; values outside the current range double the range (pairs
+    of adjacent bins are combined) until they fit, so memory stays at `bins` counters. Keep
+    several times more bins than are reported (see result) so doubling does not cost resolution.
+    Merging re-bins the other histogram's bins by their centers, which is approximate at bin edges.
+    """
+
+    def __init__(self, bins=20):
+        if bins < 2 or bins % 2:
+            raise ValueError(f"Histogram bins must be an even number >= 2, got {bins}")
+        self.bins = bins
+        self.lo = None
+        self.width = None
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.min = None
+        self.max = None
+
+    @property
+    def hi(self):
+        return self.lo + self.bins * self.width
+
+    def _start(self, vmin, vmax):
+        self.lo = vmin
+        self.width = (vmax - vmin) / self.bins if vmax > vmin else 1.0
+
+    def _expand(self, vmin, vmax):
+        """Double the range (towards whichever side is exceeded) until [vmin, vmax] fits"""
+        half = self.bins // 2
+        while vmin < self.lo or vmax > self.hi:
+            merged = self.counts[0::2] + self.counts[1::2]
+            self.counts = np.zeros(self.bins, dtype=np.int64)
+            if vmin < self.lo:
+                self.lo -= self.bins * self.width
+                self.counts[half:] = merged
+            else:
+                self.counts[:half] = merged
+            self.width *= 2
+
+    def _add(self, values, counts=None):
+        index = np.clip(np.floor((values - self.lo) / self.width), 0, self.bins - 1).astype(np.int64)
+        self.counts += np.bincount(index, weights=counts, minlength=self.bins).astype(np.int64)
+
+    def update(self, values):
+        """Add an array of (non-null) numeric values"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+        vmin, vmax = float(values.min()), float(values.max())
+        if self.lo is None:
+            self._start(vmin, vmax)
+        self._expand(vmin, vmax)
+        self._add(values)
+        self.min = vmin if self.min is None else min(self.min, vmin)
+        self.max = vmax if self.max is None else max(self.max, vmax)
+        return self
+
+    def merge(self, other):
+        if other.bins != self.bins:
+            raise ValueError("Cannot merge histograms with different bin counts")
+        if other.lo is None:
+            return self
+        if self.lo is None:
+            self.lo, self.width, self.counts = other.lo, other.width, other.counts.copy()
+            self.min, self.max = other.min, other.max
+            return self
+        self._expand(other.min, other.max)
+        while self.width < other.width:
+            self._expand(self.lo, self.hi + self.width)
+        occupied = np.flatnonzero(other.counts)
+        centers = other.lo + (occupied + 0.5) * other.width
+        self._add(np.clip(centers, self.lo, self.hi), other.counts[occupied])
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def result(self, max_bins=None):
+        """Edges and counts of the occupied bins (adjacent bins combined down to max_bins)
+
+        The outer edges are clipped to the observed min/max.
+        """
+        occupied = np.flatnonzero(self.counts)
+        if self.lo is None or not len(occupied):
+            return None
+        first, last = occupied[0], occupied[-1] + 1
+        group = max(1, math.ceil((last - first) / max_bins)) if max_bins else 1
+        counts = np.add.reduceat(self.counts[first:last], np.arange(0, last - first, group))
+        edges = [self.lo + (first + i * group) * self.width for i in range(len(counts) + 1)]
+        edges[0], edges[-1] = self.min, self.max
+        return {"edges": [float(edge) for edge in edges], "counts": counts.tolist()}
+
+    def to_dict(self):
+        return {
+            'type': 'histogram',
+            'bins': self.bins,
+            'lo': self.lo,
+            'width': self.width,
+            'min': self.min,
+            'max': self.max,
+            'counts': _encode_array(self.counts)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['bins'])
+        sketch.lo, sketch.width = data['lo'], data['width']
+        sketch.min, sketch.max = data['min'], data['max']
+        sketch.counts = _decode_array(data['counts'], np.int64)
+        return sketch
+
+SKETCH_TYPES = {
+    'hll': HyperLogLog,
+    'kll': KllSketch,
+    'frequent_items': FrequentItems,
+    'histogram': StreamingHistogram
+}
+
+def sketch_from_dict(data):
+    """Deserialize any sketch produced by to_dict()"""
+    return SKETCH_TYPES[data['type']].from_dict(data)
@@ -1,6 +1,18 @@
 from pyspark.sql import SparkSession
 from pyspark.sql import functions as F
+from pyspark.sql import Window
+from pyspark.sql.types import NumericType, StructType, StructField, LongType, DoubleType, BooleanType, StringType
 from app.config import Config
+from app.services.hdfs_utils import get_file_status
+from app.services.analysis_cache import metadata_cache, file_version
+from app.services.columnar_sidecar import PANDAS_NA_VALUES, hdfs_sidecar_path
+from app.services.spark_runtime import spark_runtime
+from app.services.schema_inference import get_schema
+from app.services.metrics import span
+from app.services.compression import HADOOP_CODECS, SPLITTABLE_CODECS, codec_from_name, hdfs_file_codec
+from app.services.correlation import CorrelationAccumulator
+import pandas as pd
+import json
 import logging
 import os
 
@@ -39,9 +51,254 @@ def create_spark_session():
         logger.error(f"Failed to create Spark session: {str(e)}")
         raise
 
+def find_parquet_sidecar(hdfs_path, modification_time):
+    """Return the HDFS URI of a Parquet sidecar for the file's current version, if one exists"""
+    if not Config.SIDECAR_HDFS or modification_time is None:
+        return None
+    try:
+        sidecar_path = hdfs_sidecar_path(hdfs_path, modification_time)
+        get_file_status(sidecar_path)
+        return f"{Config().HDFS_URI_PREFIX}{sidecar_path}"
+    except Exception:
+        return None
+
+# Spark types for inferred column kinds (strings and all-null columns stay strings). Integers stay
+# 64-bit so that the kinds check below only has to widen them to float.
+SPARK_TYPES = {'integer': LongType, 'float': DoubleType, 'boolean': BooleanType}
+SPARK_KINDS_VARIANT = 'spark_kinds'
+
+def build_spark_schema(schema):
+    """Explicit all-string Spark schema from a sampled schema, replacing the inferSchema pass
+    
+    Columns are not read as their sampled types: in PERMISSIVE mode a value the sample did not
+    cover (a "1.5" in an integer column) would silently become null. cast_sampled_columns casts
+    them once every value has been checked.
+    """
+    return StructType([StructField(column["name"], StringType(), True) for column in schema["columns"]])
+
+def check_kinds(df, sampled):
+    """Kinds every present value of the columns converts to, with one aggregation over df
+    
+    sampled maps column name -> sampled kind. An integer column holding other numbers becomes
+    float and a column holding other values stays a string, as pandas would read them.
+    """
+    exprs = []
+    for i, (name, kind) in enumerate(sampled.items()):
+        col = F.col(f"`{name}`")
+        present = col.isNotNull() & ~col.isin(PANDAS_NA_VALUES)
+        floats = col.cast('double').isNotNull()
+        if kind == 'integer':
+            # A string cast to long truncates decimals instead of failing
+            fits = col.rlike(r'^\s*[+-]?[0-9]+\s*$') & col.cast('long').isNotNull()
+        elif kind == 'float':
+            fits = floats
+        else:
+            fits = col.cast('boolean').isNotNull()
+        exprs.append(F.sum(F.when(present & ~fits, 1).otherwise(0)).alias(f"{i}_other"))
+        exprs.append(F.sum(F.when(present & ~floats, 1).otherwise(0)).alias(f"{i}_non_float"))
+    row = df.agg(*exprs).collect()[0]
+
+    kinds = {}
+    for i, (name, kind) in enumerate(sampled.items()):
+        if not row[f"{i}_other"]:
+            kinds[name] = kind
+            continue
+        kinds[name] = 'float' if kind == 'integer' and not row[f"{i}_non_float"] else 'string'
+        logger.info(f"Column {name} sampled as {kind} has {row[f'{i}_other']} other values, reading it as {kinds[name]}")
+    return kinds
+
+def cast_sampled_columns(df, hdfs_path, file_status, schema):
+    """Cast string columns of a CSV read to the kinds sampled for them, checked against every row
+    
+    The check runs once per file version (skipped when the sample was the whole file) over the
+    cached DataFrame; values pandas reads as missing become null.
+    """
+    strings = {field.name for field in df.schema.fields if isinstance(field.dataType, StringType)}
+    sampled = {column["name"]: column["kind"] for column in schema["columns"]
+               if column["kind"] in SPARK_TYPES and column["name"] in strings}
+    if not sampled:
+        return df
+    
+    version = file_version(file_status)
+    kinds = metadata_cache.get(hdfs_path, version, SPARK_KINDS_VARIANT)
+    if kinds is None:
+        if schema.get("sampled_bytes", 0) >= file_status['length']:
+            kinds = sampled
+        else:
+            with span('spark.check_kinds'):
+                kinds = check_kinds(df, sampled)
+        metadata_cache.put(hdfs_path, version, kinds, SPARK_KINDS_VARIANT)
+    
+    columns = []
+    for field in df.schema.fields:
+        col = F.col(f"`{field.name}`")
+        kind = kinds.get(field.name)
+        if kind in SPARK_TYPES:
+            col = F.when(~col.isin(PANDAS_NA_VALUES), col.cast(SPARK_TYPES[kind]()))
+        columns.append(col.alias(field.name))
+    return df.select(columns)
+
+def load_dataframe(full_hdfs_path):
+    """Get the (cached) DataFrame for the current version of an HDFS file from the shared runtime"""
+    hdfs_path = '/' + full_hdfs_path.split('/', 3)[3]
+    try:
+        file_status = get_file_status(hdfs_path)
+        modification_time, length = file_status['modificationTime'], file_status['length']
+    except Exception as e:
+        logger.warning(f"Could not get file status for {hdfs_path}, DataFrame will not be cached: {e}")
+        file_status, modification_time, length = None, None, 0
+    
+    # Kinds sampled from this file version (compressed files cannot be sampled by byte range)
+    schema = None
+    if Config.SCHEMA_INFERENCE and file_status is not None and codec_from_name(hdfs_path) is None:
+        try:
+            schema = get_schema(hdfs_path, file_status)
+        except Exception as e:
+            logger.warning(f"Schema inference failed for {hdfs_path}, falling back to inferSchema: {e}")
+    
+    def loader(spark):
+        sidecar_uri = find_parquet_sidecar(hdfs_path, modification_time)
+        if sidecar_uri:
+            # Columnar sidecar of this exact file version - no CSV parsing or schema inference pass
+            logger.info(f"Reading Parquet sidecar from: {sidecar_uri}")
+            return spark.read.parquet(sidecar_uri)
+        
+        codec = hdfs_file_codec(hdfs_path)
+        if codec is not None and (codec not in HADOOP_CODECS or codec_from_name(hdfs_path) != codec):
+            # Hadoop picks its codec by extension and has no LZ4 frame codec: decompress the stream here
+            logger.info(f"Hadoop cannot read {hdfs_path} ({codec}), loading it through the driver")
+            from app.services.simple_analyzer import open_hdfs_file
+            with open_hdfs_file(hdfs_path) as stream:
+                return spark.createDataFrame(pd.read_csv(stream))
+        
+        # Read the CSV file with more robust options
+        logger.info(f"Reading CSV from: {full_hdfs_path}")
+        reader = spark.read.format("csv") \
+            .option("header", "true") \
+            .option("mode", "PERMISSIVE") \
+            .option("columnNameOfCorruptRecord", "_corrupt_record")
+        
+        # Columns sampled from this file version; Spark only infers them (one more full pass) as a fallback
+        if schema is not None:
+            df = reader.schema(build_spark_schema(schema)).load(full_hdfs_path)
+        else:
+            df = reader.option("inferSchema", "true").load(full_hdfs_path)
+        if codec is not None and codec not in SPLITTABLE_CODECS:
+            # A gzip/zstd file is read by a single task; spread its rows before caching and profiling
+            df = df.repartition(spark.sparkContext.defaultParallelism)
+        return df
+    
+    # Cached size is estimated from the file length (deserialized rows are larger than CSV text)
+    with span('spark.load'):
+        df = spark_runtime.get_dataframe(full_hdfs_path, modification_time, loader,
+                                         estimated_bytes=int(length * Config.SPARK_CACHE_SIZE_FACTOR))
+    if schema is not None:
+        df = cast_sampled_columns(df, hdfs_path, file_status, schema)
+    return df
+
+NUMERIC_TYPES = (NumericType,)
+
+def build_profile_aggregation(df, distinct_rsd=None, percentile_accuracy=None):
+    """Build one aggregation that profiles every column of df in a single Spark job
+    
+    Per column: null/empty count, approx_count_distinct and, for numeric columns,
+    min/max/mean/stddev and percentile_approx for the median. The row count is included too.
+    """
+    distinct_rsd = distinct_rsd or Config.APPROX_DISTINCT_ERROR
+    percentile_accuracy = percentile_accuracy or int(round(1 / Config.APPROX_QUANTILE_ERROR))
+    
+    exprs = [F.count(F.lit(1)).alias('__rows')]
+    for i, field in enumerate(df.schema.fields):
+        col = F.col(f"`{field.name}`")
+        exprs.append(F.sum(F.when(col.isNull() | (col.cast('string') == ''), 1).otherwise(0)).alias(f"{i}_missing"))
+        exprs.append(F.approx_count_distinct(col, rsd=distinct_rsd).alias(f"{i}_unique"))
+        if isinstance(field.dataType, NUMERIC_TYPES):
+            exprs.extend([
+                F.min(col).cast('double').alias(f"{i}_min"),
+                F.max(col).cast('double').alias(f"{i}_max"),
+                F.mean(col).alias(f"{i}_mean"),
+                F.stddev(col).alias(f"{i}_std"),
+                F.percentile_approx(col, 0.5, percentile_accuracy).cast('double').alias(f"{i}_median"),
+            ])
+    return exprs
+
+def compute_modes(df):
+    """Most frequent value of every column with one grouped job (not one job per column)"""
+    pairs = F.array(*[
+        F.struct(F.lit(i).alias('column'), F.col(f"`{field.name}`").cast('string').alias('value'))
+        for i, field in enumerate(df.schema.fields)
+    ])
+    counts = df.select(F.explode(pairs).alias('pair')) \
+        .select('pair.column', 'pair.value') \
+        .where(F.col('value').isNotNull()) \
+        .groupBy('column', 'value').count()
+    ranked = counts.withColumn('rank', F.row_number().over(
+        Window.partitionBy('column').orderBy(F.desc('count'), F.asc('value'))))
+    return {row['column']: row['value'] for row in ranked.where(F.col('rank') == 1).collect()}
+
+def compute_histograms(df, ranges, bins, value_counts):
+    """Equal-width histograms of numeric columns with one grouped job
+
+    ranges maps column index -> (min, max) and value_counts column index -> non-null count, both
+    from the profile aggregation. Returns column index -> {"edges", "counts"} in the same format
+    as the pandas profilers (a constant column has a single bin holding all its values).
+    """
+    fields = df.schema.fields
+    histograms = {}
+    pairs = []
+    for i, (lo, hi) in ranges.items():
+        if hi == lo:
+            histograms[i] = {"edges": [lo, hi], "counts": [value_counts[i]]}
+            continue
+        width = (hi - lo) / bins
+        histograms[i] = {"edges": [lo + b * width for b in range(bins)] + [hi], "counts": [0] * bins}
+        col = F.col(f"`{fields[i].name}`").cast('double')
+        bin_index = F.least(F.floor((col - F.lit(lo)) / F.lit(width)), F.lit(bins - 1)).cast('int')
+        pairs.append(F.struct(F.lit(i).alias('column'), bin_index.alias('bin')))
+    if not pairs:
+        return histograms
+    counts = df.select(F.explode(F.array(*pairs)).alias('pair')) \
+        .select('pair.column', 'pair.bin') \
+        .where(F.col('bin').isNotNull()) \
+        .groupBy('column', 'bin').count() \
+        .collect()
+    for row in counts:
+        histograms[row['column']]["counts"][row['bin']] += row['count']
+    return histograms
+
+def compute_correlation(df):
+    """Pearson correlation/covariance of the numeric columns with one pass (one Spark job)
+    
+    Every partition folds its Arrow batches into a CorrelationAccumulator - the blocked sums and
+    cross-products the pandas profiler keeps - and the driver merges the partition states, so the
+    job count does not grow with the number of column pairs. Wide tables are capped and row sampled
+    as in the pandas path.
+    """
+    max_columns, full_pass_columns = Config.CORRELATION_MAX_COLUMNS, Config.CORRELATION_FULL_PASS_COLUMNS
+    numeric = [field.name for field in df.schema.fields if isinstance(field.dataType, NUMERIC_TYPES)]
+    columns = numeric[:max_columns]
+    
+    def accumulate(batches):
+        acc = CorrelationAccumulator(max_columns, full_pass_columns)
+        for batch in batches:
+            acc.update(batch)
+        yield pd.DataFrame({'state': [json.dumps(acc.to_dict())]})
+    
+    acc = CorrelationAccumulator(max_columns, full_pass_columns)
+    if columns:
+        projected = df.select([F.col(f"`{column}`").cast('double').alias(column) for column in columns])
+        for row in projected.mapInPandas(accumulate, 'state string').collect():
+            acc.merge(CorrelationAccumulator.from_dict(json.loads(row['state'])))
+    result = acc.result(columns)
+    result["omitted_columns"] = numeric[max_columns:]
+    return result
+
+def _optional_float(value):
+    return float(value) if value is not None else None
+
 def analyze_hdfs_file(hdfs_path):
     """Analyze HDFS file using Spark"""
-    spark = None
+    percentile_accuracy = int(round(1 / Config.APPROX_QUANTILE_ERROR))
     try:
         logger.info(f"Starting analysis for HDFS path: {hdfs_path}")
         
@@ -54,116 +311,101 @@ def analyze_hdfs_file(hdfs_path):
             
         logger.info(f"Full HDFS URI: {full_hdfs_path}")
         
-        # Create Spark session
-        spark = create_spark_session()
-        
-        # Read the CSV file with more robust options
-        logger.info(f"Reading CSV from: {full_hdfs_path}")
-        df = spark.read.format("csv") \
-            .option("header", "true") \
-            .option("inferSchema", "true") \
-            .option("mode", "PERMISSIVE") \
-            .option("columnNameOfCorruptRecord", "_corrupt_record") \
-            .load(full_hdfs_path)
-        
-        # Cache the DataFrame to avoid recomputation
-        df.cache()
-        
-        logger.info(f"DataFrame loaded with {df.count()} rows and {len(df.columns)} columns")
+        # Shared long-lived session; the DataFrame stays cached for later requests
+        df = load_dataframe(full_hdfs_path)
         
         # Get schema
         schema = [(f.name, f.dataType.simpleString()) for f in df.schema.fields]
         logger.info(f"Schema: {schema}")
         
+        # Profile every column in one aggregation job (plus one grouped job for modes)
+        with span('spark.profile'):
+            profile = df.agg(*build_profile_aggregation(df, percentile_accuracy=percentile_accuracy)).first().asDict()
+        with span('spark.modes'):
+            modes = compute_modes(df) if Config.SPARK_PROFILE_MODES else {}
+        histogram_ranges = {
+            i: (profile[f"{i}_min"], profile[f"{i}_max"])
+            for i, field in enumerate(df.schema.fields)
+            if isinstance(field.dataType, NUMERIC_TYPES) and profile[f"{i}_min"] is not None
+        }
+        with span('spark.histograms'):
+            value_counts = {i: profile['__rows'] - (profile[f"{i}_missing"] or 0) for i in histogram_ranges}
+            histograms = compute_histograms(df, histogram_ranges, Config.PROFILER_HISTOGRAM_BINS, value_counts) \
+                if Config.PROFILER_HISTOGRAM_BINS else {}
+        
+        with span('spark.correlation'):
+            correlation = compute_correlation(df) if Config.PROFILER_CORRELATION else None
+        
         # Get sample data (limit to avoid memory issues)
-        sample = df.limit(5).toPandas().to_dict(orient='records')
+        with span('spark.sample'):
+            sample = df.limit(5).toPandas().to_dict(orient='records')
         
         # Get row count
-        row_count = df.count()
-        logger.info(f"Total rows: {row_count}")
+        row_count = profile['__rows']
+        logger.info(f"DataFrame loaded with {row_count} rows and {len(df.columns)} columns")
         
-        # Analyze columns (simplified to avoid complex operations)
         col_stats = []
         summary_lines = []
         
-        for field in df.schema.fields:
+        for i, field in enumerate(df.schema.fields):
             name = field.name
             dtype = field.dataType.simpleString()
-            logger.info(f"Analyzing column: {name} (type: {dtype})")
+            missing = profile[f"{i}_missing"] or 0
+            unique = profile[f"{i}_unique"]
+            
+            stat = {
+                "name": name, 
+                "type": dtype, 
+                "missing": missing, 
+                "unique": unique,
+                "unique_exact": False
+            }
             
-            try:
-                col = df[name]
-                missing = df.filter(col.isNull() | (col == '')).count()
-                unique = df.select(name).distinct().count()
-                
-                stat = {
-                    "name": name, 
-                    "type": dtype, 
-                    "missing": missing, 
-                    "unique": unique
-                }
-                
-                if dtype in ["int", "bigint", "double", "float", "decimal"]:
-                    # Simplified numeric analysis
-                    try:
-                        desc = df.select(name).describe().toPandas().set_index('summary').to_dict()[name]
-                        stat.update({
-                            "mean": float(desc.get("mean", 0)) if desc.get("mean") != "null" else None,
-                            "std": float(desc.get("stddev", 0)) if desc.get("stddev") != "null" else None,
-                            "min": float(desc.get("min", 0)) if desc.get("min") != "null" else None,
-                            "max": float(desc.get("max", 0)) if desc.get("max") != "null" else None,
-                        })
-                        
-                        # Skip median and mode for now to avoid complex operations
-                        stat["median"] = None
-                        stat["mode"] = None
-                        
-                        summary_lines.append(f"Column '{name}' (numeric): min={stat['min']}, max={stat['max']}, mean={stat['mean']:.2f}, missing={missing}, unique={unique}.")
-                    except Exception as e:
-                        logger.warning(f"Could not analyze numeric column {name}: {e}")
-                        stat.update({"mean": None, "std": None, "min": None, "max": None, "median": None, "mode": None})
-                        summary_lines.append(f"Column '{name}' (numeric): analysis failed, missing={missing}, unique={unique}.")
-                else:
-                    # Non-numeric column analysis
-                    stat["mode"] = None
-                    summary_lines.append(f"Column '{name}' (type: {dtype}): missing={missing}, unique={unique}.")
-                
-                col_stats.append(stat)
-                
-            except Exception as e:
-                logger.warning(f"Could not analyze column {name}: {e}")
-                col_stats.append({
-                    "name": name,
-                    "type": dtype,
-                    "missing": 0,
-                    "unique": 0,
-                    "error": str(e)
+            if isinstance(field.dataType, NUMERIC_TYPES):
+                mode = modes.get(i)
+                stat.update({
+                    "mean": _optional_float(profile[f"{i}_mean"]),
+                    "std": _optional_float(profile[f"{i}_std"]),
+                    "min": profile[f"{i}_min"],
+                    "max": profile[f"{i}_max"],
+                    "median": profile[f"{i}_median"],
+                    "mode": float(mode) if mode is not None else None,
                 })
+                if Config.PROFILER_HISTOGRAM_BINS:
+                    stat["histogram"] = histograms.get(i)
+                try:
+                    summary_lines.append(f"Column '{name}' (numeric): min={stat['min']}, max={stat['max']}, mean={stat['mean']:.2f}, median={stat['median']}, missing={missing}, unique={unique}.")
+                except Exception as e:
+                    logger.warning(f"Could not summarize numeric column {name}: {e}")
+                    summary_lines.append(f"Column '{name}' (numeric): analysis failed, missing={missing}, unique={unique}.")
+            else:
+                # Non-numeric column analysis
+                stat["mode"] = modes.get(i)
+                summary_lines.append(f"Column '{name}' (type: {dtype}): missing={missing}, unique={unique}, mode={stat['mode']}.")
+            
+            col_stats.append(stat)
         
         # Create summary paragraph
         summary_para = f"The dataset contains {row_count} rows and {len(df.columns)} columns. " + ' '.join(summary_lines)
         
         logger.info("Analysis completed successfully")
         
-        return {
+        result = {
             "schema": schema,
             "sample": sample,
             "row_count": row_count,
             "columns": col_stats,
-            "summary": summary_para
+            "summary": summary_para,
+            "approximation": {
+                "distinct": {"method": "hyperloglog++", "relative_error": Config.APPROX_DISTINCT_ERROR},
+                "median": {"method": "percentile_approx", "accuracy": percentile_accuracy,
+                           "rank_error": 1 / percentile_accuracy}
+            }
         }
+        if correlation is not None:
+            result["correlation"] = correlation
+        return result
         
     except Exception as e:
         logger.error(f"Error in analyze_hdfs_file: {str(e)}")
         raise Exception(f"Analysis failed: {str(e)}")
-        
-    finally:
-        if spark:
-            try:
-                # Uncache and stop
-                if 'df' in locals():
-                    df.unpersist()
-                spark.stop()
-                logger.info("Spark session stopped")
-            except Exception as e:
-                logger.warning(f"Error stopping Spark session: {e}")
@@ -0,0 +1,169 @@
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from app.config import Config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+class SparkRuntime:
+    """Process-wide SparkSession (lazily started, health-checked) with a cached DataFrame registry"""
+
+    def __init__(self, max_cache_bytes=None):
+        self.max_cache_bytes = max_cache_bytes or Config.SPARK_CACHE_MAX_BYTES
+        self._spark = None
+        self._started_at = None
+        self._lock = threading.RLock()
+        self._frames = OrderedDict()  # (uri, modificationTime) -> (DataFrame, estimated bytes)
+        self._inflight = {}  # (uri, modificationTime) -> Future of the DataFrame being loaded
+        self._cached_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def session(self):
+        """Get the shared session, (re)starting it if it was never started or has died"""
+        with self._lock:
+            if self._spark is not None and not self._healthy():
+                logger.warning("Spark session is no longer healthy, restarting it")
+                self._discard_session()
+            if self._spark is None:
+                from app.services.spark_processor import create_spark_session
+                self._spark = create_spark_session()
+                self._started_at = time.time()
+            return self._spark
+
+    def _healthy(self):
+        try:
+            return not self._spark.sparkContext._jsc.sc().isStopped()
+        except Exception:
+            return False
+
+    def _discard_session(self):
+        self._frames.clear()
+        self._cached_bytes = 0
+        try:
+            self._spark.stop()
+        except Exception:
+            pass
+        self._spark = None
+        self._started_at = None
+
+    def get_dataframe(self, uri, modification_time, loader, estimated_bytes=0):
+        """Return the cached DataFrame for this file version, loading and caching it on a miss
+
+        loader(spark) must return an (uncached) DataFrame. Versions without a modificationTime are
+        loaded but not kept in the registry. Concurrent misses for the same version run one loader
+        (single-flight); the other callers wait for its DataFrame.
+        """
+        spark = self.session()
+        key = (uri, modification_time)
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is not None:
+                self._frames.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            pending = self._inflight.get(key) if modification_time is not None else None
+            if pending is None:
+                self.misses += 1
+                if modification_time is not None:
+                    self._inflight[key] = loading = Future()
+            else:
+                self.hits += 1
+        
+        if pending is not None:
+            logger.info(f"Waiting for the in-flight load of {uri}")
+            return pending.result()
+
+        if modification_time is None:
+            return loader(spark)
+
+        try:
+            df = loader(spark).cache()
+            with self._lock:
+                # Drop older versions of the same file first
+                for stale in [k for k in self._frames if k[0] == uri]:
+                    self._evict(stale)
+                self._frames[key] = (df, estimated_bytes)
+                self._cached_bytes += estimated_bytes
+                self._enforce_budget(keep=key)
+            loading.set_result(df)
+            return df
+        except Exception as e:
+            loading.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _enforce_budget(self, keep):
+        # Evict least recently used frames while over budget or short on storage memory
+        while len(self._frames) > 1 and (self._cached_bytes > self.max_cache_bytes or self._storage_memory_low()):
+            oldest = next(iter(self._frames))
+            if oldest == keep:
+                break
+            self._evict(oldest)
+
+    def _storage_memory_low(self):
+        """True when the cluster's free storage memory drops below SPARK_CACHE_MIN_FREE_FRACTION"""
+        try:
+            status = self._spark.sparkContext._jsc.sc().getExecutorMemoryStatus()
+            iterator = status.values().iterator()
+            total = free = 0
+            while iterator.hasNext():
+                memory = iterator.next()
+                total += memory._1()
+                free += memory._2()
+            return total > 0 and free / total < Config.SPARK_CACHE_MIN_FREE_FRACTION
+        except Exception:
+            return False
+
+    def _evict(self, key):
+        df, size = self._frames.pop(key)
+        self._cached_bytes -= size
+        try:
+            df.unpersist(blocking=False)
+        except Exception as e:
+            logger.warning(f"Error unpersisting DataFrame for {key[0]}: {e}")
+        logger.info(f"Evicted cached DataFrame for {key[0]}")
+
+    def invalidate(self, uri):
+        """Drop cached DataFrames of every version of a file"""
+        with self._lock:
+            for key in [k for k in self._frames if k[0] == uri]:
+                self._evict(key)
+
+    def status(self):
+        """Session and cache state for monitoring"""
+        with self._lock:
+            return {
+                'running': self._spark is not None,
+                'uptime_seconds': (time.time() - self._started_at) if self._started_at else None,
+                'cached_frames': len(self._frames),
+                'cached_bytes': self._cached_bytes,
+                'max_cache_bytes': self.max_cache_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def shutdown(self):
+        """Unpersist everything and stop the session (registered to run at exit)"""
+        with self._lock:
+            if self._spark is None:
+                return
+            for key in list(self._frames):
+                self._evict(key)
+            try:
+                self._spark.stop()
+                logger.info("Spark session stopped")
+            except Exception as e:
+                logger.warning(f"Error stopping Spark session: {e}")
+            self._spark = None
+            self._started_at = None
+
+# Process-wide runtime shared by all Spark analyses
+spark_runtime = SparkRuntime()
+atexit.register(spark_runtime.shutdown)
@@ -0,0 +1,197 @@
+import logging
+import os
+import re
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.config import Config
+from app.services.metrics import span, add_bytes
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+IP_PATTERN = re.compile(r'^(?:[0-9]{1,3}\.){3}[0-9]{1,3}$')
+NAMENODE_ADDRESS_PATTERN = re.compile(r'(namenoderpcaddress=)([^&]+)')
+
+@lru_cache(maxsize=256)
+def _rewrite_netloc(netloc, current_ip):
+    """Point a DataNode host:port at the discovered HDFS IP (memoized per host and IP)"""
+    host, sep, port = netloc.rpartition(':')
+    if not sep:
+        host, port = netloc, ''
+    if host == current_ip:
+        return netloc
+    # Replace quickstart.cloudera and any other IP address with the current IP
+    if host == Config.HDFS_HOSTNAME or host == 'quickstart.cloudera' or IP_PATTERN.match(host):
+        host = current_ip
+    return f"{host}:{port}" if port else host
+
+def _count_read_bytes(response):
+    """Count the body bytes read from a streamed response when it is closed"""
+    close = response.close
+
+    def close_and_count():
+        if response.raw is not None and not getattr(response, '_bytes_counted', False):
+            response._bytes_counted = True
+            add_bytes('hdfs_read', response.raw.tell())
+        close()
+
+    response.close = close_and_count
+    return response
+
+def _count_written_bytes(data):
+    """Count upload bytes: the size of bytes/file data, or the chunks as an iterator yields them"""
+    if isinstance(data, (bytes, bytearray)):
+        add_bytes('hdfs_write', len(data))
+        return data
+    if hasattr(data, 'fileno'):
+        try:
+            add_bytes('hdfs_write', os.fstat(data.fileno()).st_size - data.tell())
+        except (OSError, ValueError):
+            pass
+        return data
+
+    def counted():
+        for chunk in data:
+            add_bytes('hdfs_write', len(chunk))
+            yield chunk
+    return counted()
+
+class WebHdfsClient:
+    """WebHDFS REST client with pooled keep-alive sessions per host, timeouts and retries"""
+
+    def __init__(self, pool_size=None, timeout=None, retries=None, backoff=None):
+        self.pool_size = pool_size or Config.WEBHDFS_POOL_SIZE
+        self.timeout = timeout or Config.HDFS_TIMEOUT
+        self.retries = Config.WEBHDFS_RETRIES if retries is None else retries
+        self.backoff = Config.WEBHDFS_BACKOFF if backoff is None else backoff
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _session(self, url):
+        """Get (or create) the pooled session for the URL's host"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                retry = Retry(
+                    total=self.retries,
+                    backoff_factor=self.backoff,
+                    status_forcelist=(500, 502, 503, 504),
+                    allowed_methods=frozenset(['GET', 'HEAD']),
+                    raise_on_status=False
+                )
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+            return session
+
+    def request(self, method, url, **kwargs):
+        """Issue a request on the host's pooled session, invalidating discovery on connection errors"""
+        kwargs.setdefault('timeout', self.timeout)
+        try:
+            return self._session(url).request(method, url, **kwargs)
+        except requests.exceptions.ConnectionError:
+            Config.invalidate_hdfs_ip()
+            raise
+
+    def url(self, path, operation, **params):
+        """Build WebHDFS URL for a specific operation"""
+        with span('hdfs.discovery'):
+            base_url = Config().HDFS_URL.rstrip('/')
+        query = ''.join(f"&{key}={value}" for key, value in params.items() if value is not None)
+        return f"{base_url}/webhdfs/v1{path}?op={operation}&user.name={Config.HDFS_USER}{query}"
+
+    def fix_datanode_url(self, url):
+        """Replace hostname with IP address in DataNode URLs"""
+        current_ip = Config.get_hdfs_ip()
+        parts = urlsplit(url)
+        # The NameNode RPC address is passed along in the query and needs the same rewrite
+        query = NAMENODE_ADDRESS_PATTERN.sub(
+            lambda m: m.group(1) + _rewrite_netloc(m.group(2), current_ip), parts.query)
+        return urlunsplit(parts._replace(netloc=_rewrite_netloc(parts.netloc, current_ip), query=query))
+
+    def get_file_status(self, path):
+        """GETFILESTATUS - file metadata (length, modificationTime, ...)"""
+        url = self.url(path, 'GETFILESTATUS')
+        with span('hdfs.namenode'):
+            response = self.request('GET', url)
+        if response.status_code != 200:
+            raise Exception(f"Status failed: {response.status_code} - {response.text}")
+        return response.json()['FileStatus']
+
+    def list_status(self, path):
+        """LISTSTATUS - FileStatus entries of a directory"""
+        url = self.url(path, 'LISTSTATUS')
+        with span('hdfs.namenode'):
+            response = self.request('GET', url)
+        if response.status_code != 200:
+            raise Exception(f"List failed: {response.status_code} - {response.text}")
+        return response.json()['FileStatuses']['FileStatus']
+
+    def open(self, path, offset=None, length=None):
+        """OPEN - streamed response for the file (or the byte range offset/length)
+
+        The DataNode span covers the time to the response headers; the body is streamed by the
+        caller, so its transfer time falls in the caller's span (bytes are counted on close).
+        """
+        url = self.url(path, 'OPEN', offset=offset, length=length)
+        with span('hdfs.namenode'):
+            response = self.request('GET', url, stream=True, allow_redirects=False)
+
+        if response.status_code == 307:  # Redirect to DataNode
+            datanode_url = self.fix_datanode_url(response.headers['Location'])
+            response.close()
+            with span('hdfs.datanode'):
+                response = self.request('GET', datanode_url, stream=True)
+            if response.status_code != 200:
+                raise Exception(f"Failed to download from DataNode: {response.status_code} - {response.text}")
+        elif response.status_code != 200:
+            raise Exception(f"Failed to download file: {response.status_code} - {response.text}")
+
+        return _count_read_bytes(response)
+
+    def create(self, path, data, overwrite=True, headers=None):
+        """CREATE - write data (bytes, file or iterator of chunks) to a new file"""
+        create_params = {'overwrite': 'true' if overwrite else 'false'}
+
+        # Step 1: Create file (this returns a redirect to a DataNode)
+        url = self.url(path, 'CREATE')
+        with span('hdfs.namenode'):
+            response = self.request('PUT', url, params=create_params, allow_redirects=False)
+        if response.status_code != 307:
+            raise Exception(f"Create failed: {response.status_code} - {response.text}")
+
+        # Step 2: Upload to DataNode with fixed URL
+        datanode_url = self.fix_datanode_url(response.headers['Location'])
+        upload_headers = {'Content-Type': 'application/octet-stream'}
+        upload_headers.update(headers or {})
+        with span('hdfs.datanode'):
+            upload_response = self.request('PUT', datanode_url, data=_count_written_bytes(data),
+                                           headers=upload_headers)
+        if upload_response.status_code != 201:
+            raise Exception(f"Upload failed: {upload_response.status_code} - {upload_response.text}")
+        return path
+
+    def close(self):
+        """Close all pooled connections"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Process-wide WebHDFS client shared by every HDFS I/O path"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = WebHdfsClient()
+        return _client
@@ -1 +1,110 @@
-# Placeholder for general utility functions
+import gzip
+import hashlib
+import json
+import logging
+import numpy as np
+import pandas as pd
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from app.config import Config
+from app.services.metrics import span
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/csv', 'application/x-ndjson')
+
+def _default(value):
+    """Values neither encoder handles natively: NumPy/pandas scalars and arrays, then Flask's rules"""
+    if value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()  # only reached with the stdlib encoder
+    return DefaultJSONProvider.default(value)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify via orjson (NumPy scalars and arrays serialized natively), falling back to the stdlib
+
+    Output matches Flask's provider (sorted keys, dates as HTTP dates) except that NaN and
+    infinity become null - the stdlib writes them as bare NaN, which is not valid JSON.
+    """
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        if ORJSON_AVAILABLE and not kwargs:
+            return self._orjson_dumps(obj).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def _orjson_dumps(self, obj):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def response(self, *args, **kwargs):
+        if not ORJSON_AVAILABLE:
+            return super().response(*args, **kwargs)
+        # Skip the bytes -> str -> bytes round trip of the default implementation
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._orjson_dumps(obj) + b'\n', mimetype=self.mimetype)
+
+def _choose_encoding():
+    """Best supported Content-Encoding the client accepts (brotli preferred on equal quality)"""
+    candidates = (['br'] if BROTLI_AVAILABLE else []) + ['gzip']
+    best, best_quality = None, 0
+    for encoding in candidates:
+        quality = request.accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress_response(response):
+    """Compress JSON/text bodies of at least COMPRESS_MIN_BYTES with the negotiated encoding"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < Config.COMPRESS_MIN_BYTES:
+        return response
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    with span('response.compress'):
+        if encoding == 'br':
+            compressed = brotli.compress(body, quality=Config.COMPRESS_BROTLI_QUALITY)
+        else:
+            compressed = gzip.compress(body, compresslevel=Config.COMPRESS_GZIP_LEVEL)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    # A strong ETag names the exact bytes, which differ per encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def version_etag(*parts):
+    """ETag value for a response derived from a file version and the query that shaped it"""
+    return hashlib.sha1(json.dumps(parts, default=str).encode('utf-8')).hexdigest()[:24]
+
+def init_response_layer(app):
+    """Install the fast JSON provider and response compression (register after other after_request hooks)"""
+    app.json = FastJSONProvider(app)
+    if Config.COMPRESS_RESPONSES:
+        app.after_request(compress_response)
+    compression = ('gzip+br' if BROTLI_AVAILABLE else 'gzip') if Config.COMPRESS_RESPONSES else 'off'
+    logger.info(f"Response layer: orjson={'on' if ORJSON_AVAILABLE else 'off'}, compression={compression}")
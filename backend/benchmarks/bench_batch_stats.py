@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: per-column pandas statistics loop vs. the batched NumPy stats engine
+
+Builds wide synthetic tables (--rows x --columns, mixed int/float columns with some NaNs
+and repeated values) and times the numeric statistics analyze_dataframe reports (missing,
+unique, mean, std, min, max, median, mode) computed the old way (one column at a time,
+every reducer called twice) and with compute_numeric_stats. Results are checked for equality.
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+from app.services.batch_stats import compute_numeric_stats
+
+def make_frame(rows, columns, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(columns):
+        if i % 2:
+            values = rng.integers(0, 50 + i, rows).astype('float64')
+        else:
+            values = np.round(rng.normal(i, 10, rows), 2)
+        values[rng.random(rows) < 0.02] = np.nan
+        data[f"c{i}"] = values
+    df = pd.DataFrame(data)
+    # Columns without NaNs stay int64, as pandas.read_csv would read them
+    for i in range(1, columns, 4):
+        df[f"c{i}"] = df[f"c{i}"].fillna(0).astype('int64')
+    return df
+
+def legacy_stats(df):
+    """The per-column loop analyze_dataframe used before the batched engine"""
+    stats = {}
+    for column in df.columns:
+        col_data = df[column]
+        stats[column] = {
+            "missing": float(col_data.isnull().sum()),
+            "unique": float(col_data.nunique()),
+            "mean": float(col_data.mean()) if not pd.isna(col_data.mean()) else None,
+            "std": float(col_data.std()) if not pd.isna(col_data.std()) else None,
+            "min": float(col_data.min()) if not pd.isna(col_data.min()) else None,
+            "max": float(col_data.max()) if not pd.isna(col_data.max()) else None,
+            "median": float(col_data.median()) if not pd.isna(col_data.median()) else None,
+        }
+        mode_values = col_data.mode()
+        stats[column]["mode"] = float(mode_values.iloc[0]) if len(mode_values) > 0 else None
+    return stats
+
+def same(a, b):
+    if a is None or b is None:
+        return a is b
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--columns', type=int, nargs='+', default=[100, 300, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'columns':>8} {'loop (s)':>10} {'batched (s)':>12} {'speedup':>8}  match")
+    for columns in args.columns:
+        df = make_frame(args.rows, columns)
+        loop_time, expected = best_time(lambda: legacy_stats(df), args.repeat)
+        batch_time, actual = best_time(lambda: compute_numeric_stats(df), args.repeat)
+        mismatches = [(column, key) for column in expected for key in expected[column]
+                      if not same(expected[column][key], actual[column][key])]
+        print(f"{columns:>8} {loop_time:>10.3f} {batch_time:>12.3f} {loop_time / batch_time:>7.1f}x  "
+              f"{'yes' if not mismatches else f'NO {mismatches[:3]}'}")
+
+if __name__ == '__main__':
+    main()
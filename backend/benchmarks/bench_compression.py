@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Compressed-CSV benchmark: wire bytes and end-to-end time per codec, upload and analysis
+
+Serves the uploads/*.csv fixtures (and copies scaled by --scale) from the local WebHDFS stand-in,
+usually with a --bandwidth-mbps cap, and for each codec (none plus every installed one):
+
+  upload     upload_to_hdfs with the codec - compression runs while the body is sent
+  analyze    a cold analyze_hdfs_file_simple of the stored file - decompression runs while parsing
+
+and reports the bytes on the wire, the time, and both relative to uncompressed CSV. Sidecars,
+profile states and the result cache are disabled so every analysis transfers and parses the file.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_webhdfs import FakeWebHdfsServer, configure_environment
+from bench_download_memory import make_scaled_copy
+
+CODECS = ['none', 'gzip', 'bz2', 'zstd', 'lz4']
+
+def measure(server, func):
+    """Seconds func takes and the bytes the fake server sent/received meanwhile"""
+    before = server.counters()
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    after = server.counters()
+    return elapsed, after['bytes_sent'] - before['bytes_sent'], after['bytes_received'] - before['bytes_received']
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=10, help='repeat factor for synthetic copies (1 = fixtures only)')
+    parser.add_argument('--fixtures', nargs='+', help='fixture file names (default: all uploads/*.csv)')
+    parser.add_argument('--codecs', nargs='+', choices=CODECS, default=CODECS)
+    parser.add_argument('--level', type=int, default=0, help='compression level (0 = codec default)')
+    parser.add_argument('--streaming', action='store_true', help='use the chunked profiler instead of one DataFrame')
+    parser.add_argument('--latency-ms', type=float, default=0, help='added to every WebHDFS response')
+    parser.add_argument('--bandwidth-mbps', type=float, default=100, help='per-transfer cap in Mbit/s (0 = none)')
+    parser.add_argument('--output', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    server = FakeWebHdfsServer(root, latency=args.latency_ms / 1000,
+                               bandwidth=args.bandwidth_mbps * 125000 or None).start()
+    configure_environment(server.server_port)
+    os.environ.update({
+        'SIDECAR_ENABLED': 'false',
+        'INCREMENTAL_ANALYSIS': 'false',
+        'UPLOAD_COMPRESSION_LEVEL': str(args.level)
+    })
+    from app.services.analysis_cache import analysis_cache
+    from app.services.compression import codec_available, compressed_name
+    from app.services.hdfs_utils import upload_to_hdfs
+    from app.services.simple_analyzer import analyze_hdfs_file_simple
+
+    codecs = [codec for codec in args.codecs if codec == 'none' or codec_available(codec)]
+    skipped = sorted(set(args.codecs) - set(codecs))
+    if skipped:
+        print(f"Skipping {', '.join(skipped)} (package not installed)")
+
+    fixtures = args.fixtures or sorted(f for f in os.listdir(os.path.join(BACKEND_DIR, 'uploads')) if f.endswith('.csv'))
+    local_files = []
+    for name in fixtures:
+        src = os.path.join(BACKEND_DIR, 'uploads', name)
+        local_files.append(src)
+        if args.scale > 1:
+            scaled = os.path.join(root, f'x{args.scale}_{name}')
+            make_scaled_copy(src, scaled, args.scale)
+            local_files.append(scaled)
+
+    results = []
+    print(f"{'file':<26}{'codec':<7}{'size MB':>9}{'wire MB':>9}{'ratio':>7}{'upload s':>10}{'analyze s':>11}{'vs none':>9}")
+    try:
+        for local_path in local_files:
+            name = os.path.basename(local_path)
+            size = os.path.getsize(local_path)
+            baseline = None
+            for codec in codecs:
+                hdfs_path = f'/bench/{compressed_name(name, codec) if codec != "none" else name}'
+                upload_s, _, received = measure(server, lambda: upload_to_hdfs(
+                    local_path, hdfs_path, codec=None if codec == 'none' else codec))
+                analysis_cache.clear()
+                analyze_s, sent, _ = measure(server, lambda: analyze_hdfs_file_simple(
+                    hdfs_path, streaming=args.streaming))
+                total = upload_s + analyze_s
+                baseline = baseline or total
+                result = {
+                    'file': name,
+                    'codec': codec,
+                    'size_bytes': size,
+                    'upload_bytes': received,
+                    'download_bytes': sent,
+                    'ratio': round(size / received, 2),
+                    'upload_s': round(upload_s, 4),
+                    'analyze_s': round(analyze_s, 4),
+                    'speedup': round(baseline / total, 2)
+                }
+                results.append(result)
+                print(f"{name:<26}{codec:<7}{size / 1e6:>9.1f}{received / 1e6:>9.1f}{result['ratio']:>6.1f}x"
+                      f"{upload_s:>10.2f}{analyze_s:>11.2f}{result['speedup']:>8.2f}x")
+    finally:
+        server.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'bandwidth_mbps': args.bandwidth_mbps, 'streaming': args.streaming, 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == '__main__':
+    main()
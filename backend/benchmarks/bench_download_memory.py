@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Peak-RSS benchmark: legacy str download vs. streaming/spooled download into the CSV parser
+
+Serves the uploads/*.csv fixtures (and synthetic copies scaled by --scale) from a local
+WebHDFS stand-in and measures, in a fresh subprocess per run, how much the peak RSS grows
+while downloading and parsing each file.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_webhdfs import FakeWebHdfsServer, configure_environment
+
+MODES = ['legacy', 'stream', 'spool']
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_worker(mode, hdfs_path, streaming):
+    """Download + parse one file in this process and report the peak-RSS growth"""
+    from app.services import simple_analyzer
+    
+    baseline = peak_rss_mb()
+    if mode == 'legacy':
+        # The old download: the whole body decoded into one str before parsing
+        with simple_analyzer.open_hdfs_file(hdfs_path, spool=False) as stream:
+            content = stream.read().decode('utf-8')
+        result = simple_analyzer.analyze_csv_data(content, streaming=streaming)
+    else:
+        with simple_analyzer.open_hdfs_file(hdfs_path, spool=(mode == 'spool')) as stream:
+            result = simple_analyzer.analyze_csv_data(stream, streaming=streaming)
+    
+    print(json.dumps({
+        'mode': mode,
+        'path': hdfs_path,
+        'rows': result['row_count'],
+        'peak_rss_growth_mb': round(peak_rss_mb() - baseline, 1)
+    }))
+
+def make_scaled_copy(src, dst, scale):
+    """Write a synthetic file made of the fixture's rows repeated scale times"""
+    with open(src, 'rb') as f:
+        header = f.readline()
+        body = f.read()
+    if not body.endswith(b'\n'):
+        body += b'\n'
+    with open(dst, 'wb') as f:
+        f.write(header)
+        for _ in range(scale):
+            f.write(body)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=10, help='repeat factor for synthetic copies (0 to skip)')
+    parser.add_argument('--streaming', action='store_true', help='use the chunked profiler instead of one DataFrame')
+    parser.add_argument('--worker', nargs=2, metavar=('MODE', 'HDFS_PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.worker:
+        return run_worker(args.worker[0], args.worker[1], args.streaming)
+    
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, 'uploads'))
+        fixtures = sorted(f for f in os.listdir(os.path.join(BACKEND_DIR, 'uploads')) if f.endswith('.csv'))
+        for name in fixtures:
+            src = os.path.join(BACKEND_DIR, 'uploads', name)
+            os.symlink(src, os.path.join(root, 'uploads', name))
+            if args.scale > 1:
+                make_scaled_copy(src, os.path.join(root, 'uploads', f'x{args.scale}_{name}'), args.scale)
+        
+        server = FakeWebHdfsServer(root).start()
+        env = dict(os.environ)
+        configure_environment(server.server_port)
+        env.update({k: os.environ[k] for k in ('FORCE_IP', 'HDFS_IP', 'WEBHDFS_PORT')})
+        
+        print(f"{'file':<28}{'size MB':>9}" + ''.join(f"{m + ' MB':>12}" for m in MODES))
+        try:
+            for name in sorted(os.listdir(os.path.join(root, 'uploads'))):
+                size_mb = os.path.getsize(os.path.join(root, 'uploads', name)) / 1024 / 1024
+                row = f"{name:<28}{size_mb:>9.1f}"
+                for mode in MODES:
+                    cmd = [sys.executable, __file__, '--worker', mode, f'/uploads/{name}']
+                    if args.streaming:
+                        cmd.append('--streaming')
+                    output = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+                    row += f"{json.loads(output.strip().splitlines()[-1])['peak_rss_growth_mb']:>12.1f}"
+                print(row)
+        finally:
+            server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark: /upload, /summary and /analyze/preview through the Flask app
+
+Serves the uploads/*.csv fixtures and synthetic copies scaled by --scales (rows repeated N
+times) from the local WebHDFS stand-in, optionally with added latency and a bandwidth cap.
+Every measurement runs in a fresh subprocess with its own empty sidecar, row index and profile
+state directories (analysis jobs run on the thread backend so their memory is counted) and
+records:
+
+  wall_s        time of the first (cold) request
+  warm_wall_s   time of the same request repeated in that process (caches warm)
+  peak_rss_mb   peak resident set size of the process, and its growth over the baseline
+  bytes_sent    bytes served by the fake DataNode (reads), bytes_received for uploads
+  requests      WebHDFS calls by operation (traffic counts both the cold and the warm request)
+
+Results are written as JSON (--output); --compare prints the change against an earlier run.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_webhdfs import FakeWebHdfsServer, configure_environment
+from bench_download_memory import make_scaled_copy
+
+ENDPOINTS = ['upload', 'summary', 'preview']
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_worker(endpoint, local_path, workdir):
+    """Issue one request twice (cold, then warm) in this process and print the measurements"""
+    os.environ.update({
+        'JOB_BACKEND': 'thread',
+        'SIDECAR_DIR': os.path.join(workdir, 'sidecars'),
+        'ROW_INDEX_DIR': os.path.join(workdir, 'row_index'),
+        # Stored profile state would turn repeat runs into incremental refreshes
+        'PROFILE_STATE_DIR': os.path.join(workdir, 'profile_state')
+    })
+    from app import create_app
+    from app.routes import upload_routes
+
+    # Local copies made by /upload go to the scratch directory, not the repository
+    upload_routes.UPLOAD_FOLDER = os.path.join(workdir, 'local_uploads')
+    os.makedirs(upload_routes.UPLOAD_FOLDER, exist_ok=True)
+
+    client = create_app().test_client()
+    name = os.path.basename(local_path)
+
+    def request():
+        if endpoint == 'upload':
+            # Uploaded under a new name so the served fixture is not overwritten while read
+            with open(local_path, 'rb') as f:
+                return client.post('/upload', data={'file': (f, f'upload_{name}')},
+                                   content_type='multipart/form-data')
+        if endpoint == 'summary':
+            return client.get('/summary', query_string={'filename': name})
+        return client.post('/analyze/preview', json={'hdfs_path': f'/uploads/{name}'})
+
+    baseline = peak_rss_mb()
+    timings = []
+    for _ in range(2):
+        started = time.perf_counter()
+        response = request()
+        timings.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            break
+
+    print(json.dumps({
+        'status': response.status_code,
+        'error': None if response.status_code == 200 else response.get_data(as_text=True)[:500],
+        'wall_s': round(timings[0], 4),
+        'warm_wall_s': round(timings[1], 4) if len(timings) > 1 else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'rss_growth_mb': round(peak_rss_mb() - baseline, 1)
+    }))
+
+def prepare_files(root, scales, fixtures):
+    """Link the fixtures into the served /uploads directory and write the scaled copies"""
+    uploads = os.path.join(root, 'uploads')
+    os.makedirs(uploads)
+    files = []
+    for name in fixtures:
+        src = os.path.join(BACKEND_DIR, 'uploads', name)
+        for scale in scales:
+            if scale == 1:
+                target = os.path.join(uploads, name)
+                os.symlink(os.path.abspath(src), target)
+            else:
+                target = os.path.join(uploads, f'x{scale}_{name}')
+                make_scaled_copy(src, target, scale)
+            files.append((name, scale, target))
+    return files
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def counter_delta(before, after):
+    requests = {op: count - before['requests'].get(op, 0) for op, count in after['requests'].items()}
+    return {
+        'bytes_sent': after['bytes_sent'] - before['bytes_sent'],
+        'bytes_received': after['bytes_received'] - before['bytes_received'],
+        'requests': {op: count for op, count in sorted(requests.items()) if count}
+    }
+
+def compare(results, previous_path):
+    """Print wall time and peak RSS relative to an earlier results file"""
+    with open(previous_path) as f:
+        previous = {(r['endpoint'], r['fixture'], r['scale']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {previous_path}:")
+    print(f"{'endpoint':<10}{'file':<26}{'wall':>10}{'warm':>10}{'peak RSS':>10}")
+    for result in results:
+        old = previous.get((result['endpoint'], result['fixture'], result['scale']))
+        if old is None or result['status'] != 200 or old['status'] != 200:
+            continue
+        ratios = []
+        for key in ('wall_s', 'warm_wall_s', 'peak_rss_mb'):
+            ratios.append(f"{result[key] / old[key]:>9.2f}x" if result[key] and old[key] else f"{'-':>10}")
+        print(f"{result['endpoint']:<10}{result['file']:<26}" + ''.join(ratios))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100],
+                        help='row repeat factors (1 = the fixture itself; 1000 needs several GB of disk)')
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument('--fixtures', nargs='+', help='fixture file names (default: all uploads/*.csv)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='added to every WebHDFS response')
+    parser.add_argument('--bandwidth-mbps', type=float, default=0, help='per-transfer cap in Mbit/s (0 = none)')
+    parser.add_argument('--output', default='bench_e2e_results.json', help='where to write the JSON results')
+    parser.add_argument('--compare', metavar='RESULTS_JSON', help='earlier results to compare against')
+    parser.add_argument('--worker', nargs=3, metavar=('ENDPOINT', 'LOCAL_PATH', 'WORKDIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return run_worker(*args.worker)
+
+    fixtures = args.fixtures or sorted(f for f in os.listdir(os.path.join(BACKEND_DIR, 'uploads')) if f.endswith('.csv'))
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        files = prepare_files(root, args.scales, fixtures)
+        server = FakeWebHdfsServer(root, latency=args.latency_ms / 1000,
+                                   bandwidth=args.bandwidth_mbps * 125000 or None).start()
+        env = dict(os.environ)
+        configure_environment(server.server_port)
+        env.update({k: os.environ[k] for k in ('FORCE_IP', 'HDFS_IP', 'WEBHDFS_PORT')})
+
+        print(f"{'endpoint':<10}{'file':<26}{'size MB':>9}{'wall s':>9}{'warm s':>9}{'peak MB':>9}{'read MB':>9}{'written MB':>11}")
+        try:
+            for endpoint in args.endpoints:
+                for fixture, scale, path in files:
+                    workdir = tempfile.mkdtemp(dir=root)
+                    before = server.counters()
+                    cmd = [sys.executable, os.path.abspath(__file__), '--worker', endpoint, path, workdir]
+                    process = subprocess.run(cmd, env=env, capture_output=True, text=True)
+                    traffic = counter_delta(before, server.counters())
+                    shutil.rmtree(workdir, ignore_errors=True)
+                    try:
+                        measured = json.loads(process.stdout.strip().splitlines()[-1])
+                    except (IndexError, ValueError):
+                        measured = {'status': None, 'error': process.stderr[-500:], 'wall_s': None,
+                                    'warm_wall_s': None, 'peak_rss_mb': None, 'rss_growth_mb': None}
+
+                    result = {
+                        'endpoint': endpoint,
+                        'fixture': fixture,
+                        'scale': scale,
+                        'file': os.path.basename(path),
+                        'size_bytes': os.path.getsize(path),
+                        **measured,
+                        **traffic
+                    }
+                    results.append(result)
+                    if result['status'] == 200:
+                        print(f"{endpoint:<10}{result['file']:<26}{result['size_bytes'] / 1e6:>9.1f}"
+                              f"{result['wall_s']:>9.2f}{result['warm_wall_s']:>9.2f}{result['peak_rss_mb']:>9.0f}"
+                              f"{result['bytes_sent'] / 1e6:>9.1f}{result['bytes_received'] / 1e6:>11.1f}")
+                    else:
+                        print(f"{endpoint:<10}{result['file']:<26} failed ({result['status']}): {result['error']}")
+        finally:
+            server.stop()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'latency_ms': args.latency_ms,
+            'bandwidth_mbps': args.bandwidth_mbps,
+            'scales': args.scales
+        },
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Read-time benchmark: pandas CSV parsing vs. the memory-mapped Arrow IPC sidecar
+
+Runs on the bundled ratings.csv / movies.csv and synthetic copies scaled by --scale
+(default 100x). Reports the one-time sidecar materialization cost, then the best of
+--repeat reads for CSV, full sidecar and a single-column projection.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_download_memory import make_scaled_copy
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=100, help='repeat factor for synthetic copies')
+    parser.add_argument('--repeat', type=int, default=3, help='reads per measurement (best is reported)')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ['SIDECAR_DIR'] = os.path.join(workdir, 'sidecars')
+        import pandas as pd
+        from app.services import columnar_sidecar
+        
+        if not columnar_sidecar.PYARROW_AVAILABLE:
+            print("❌ pyarrow is not installed - sidecars are unavailable")
+            return 1
+        
+        files = []
+        for name in ('ratings.csv', 'movies.csv'):
+            src = os.path.join(BACKEND_DIR, 'uploads', name)
+            files.append((name, src))
+            if args.scale > 1:
+                scaled = os.path.join(workdir, f'x{args.scale}_{name}')
+                make_scaled_copy(src, scaled, args.scale)
+                files.append((f'x{args.scale}_{name}', scaled))
+        
+        print(f"{'file':<20}{'size MB':>9}{'build s':>10}{'csv s':>9}{'sidecar s':>11}{'1 col s':>9}{'speedup':>9}")
+        for label, path in files:
+            hdfs_path, version = f'/bench/{label}', 1
+            started = time.perf_counter()
+            with open(path, 'rb') as source:
+                columnar_sidecar.materialize_sidecar(hdfs_path, version, source)
+            build = time.perf_counter() - started
+            
+            first_column = pd.read_csv(path, nrows=0).columns[0]
+            csv_time = best_time(lambda: pd.read_csv(path), args.repeat)
+            sidecar_time = best_time(lambda: columnar_sidecar.read_sidecar_columns(hdfs_path, version), args.repeat)
+            column_time = best_time(lambda: columnar_sidecar.read_sidecar_columns(hdfs_path, version, [first_column]), args.repeat)
+            
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            print(f"{label:<20}{size_mb:>9.1f}{build:>10.3f}{csv_time:>9.3f}{sidecar_time:>11.3f}{column_time:>9.3f}"
+                  f"{csv_time / sidecar_time:>8.1f}x")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Parity check: analyses from the columnar sidecar must match analyses from CSV
+
+Serves a synthetic file with the values pandas reads as missing (blank, "None", "n/a", ...) in
+numeric, string and date columns from the local WebHDFS stand-in, and analyzes it in exact,
+streaming and approximate mode with sidecars on and off. Per column, missing/unique/mode (and
+median, where exact) must agree between the two, and missing must equal pandas.read_csv's count.
+Approximate mode skips mode: Misra-Gries picks among tied counts by chunk boundaries.
+A second file changes a column's type after the first block; it must fall back to CSV with the
+same results.
+
+Incremental refreshes are checked too: rows with blank values are appended to the first file and
+the refreshed streaming/approximate profile (stored state plus the parsed tail) must match a full
+recompute of the grown file, with sidecars on and off.
+"""
+import argparse
+import math
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_webhdfs import FakeWebHdfsServer, configure_environment
+
+MISSING = ['', 'None', 'NA', 'n/a', 'null', 'NaN']
+MODES = {'exact': {}, 'streaming': {'streaming': True}, 'approximate': {'approximate': True}}
+COMPARED = {
+    'exact': ('missing', 'unique', 'mode', 'median'),
+    'streaming': ('missing', 'unique', 'mode'),
+    'approximate': ('missing', 'unique')
+}
+
+def write_fixture(path, rows, seed=0):
+    """CSV with missing markers sprinkled over int, float, string and date columns"""
+    rng = np.random.default_rng(seed)
+    names = ['alice', 'bob', 'carol', 'dave']
+    with open(path, 'w') as f:
+        f.write('id,score,name,when,empty\n')
+        for i in range(rows):
+            score = MISSING[i % len(MISSING)] if rng.random() < 0.1 else f"{rng.normal(50, 10):.2f}"
+            name = MISSING[i % len(MISSING)] if rng.random() < 0.4 else names[int(rng.integers(len(names)))]
+            when = MISSING[i % len(MISSING)] if rng.random() < 0.08 else f"2024-01-{1 + i % 28:02d}"
+            f.write(f"{i},{score},{name},{when},\n")
+
+def write_type_change_fixture(path, rows):
+    """CSV whose 'value' column holds integers in the first rows and decimals after them"""
+    with open(path, 'w') as f:
+        f.write('id,value\n')
+        for i in range(rows):
+            f.write(f"{i},{i % 7 if i < rows // 2 else f'{i % 7}.5'}\n")
+
+APPEND_ROWS = 500
+# Float statistics of a refresh are merged from other partial sums than a recompute's
+FLOAT_KEYS = ('mean', 'std')
+
+def append_rows(path, start, rows):
+    """Append rows with a blank name and a "None" score"""
+    with open(path, 'a') as f:
+        for i in range(start, start + rows):
+            f.write(f"{i},None,,2024-02-{1 + i % 28:02d},\n")
+
+def column_stats(result):
+    return {column['name']: column for column in result['columns']}
+
+def compare(label, with_sidecar, without_sidecar, expected_missing, keys, labels=('sidecar', 'csv')):
+    failures = 0
+    if with_sidecar['row_count'] != without_sidecar['row_count']:
+        print(f"  {label}: row_count {labels[0]}={with_sidecar['row_count']} {labels[1]}={without_sidecar['row_count']}")
+        failures += 1
+    sidecar_columns, csv_columns = column_stats(with_sidecar), column_stats(without_sidecar)
+    for name, csv_stat in csv_columns.items():
+        sidecar_stat = sidecar_columns.get(name, {})
+        for key in keys:
+            a, b = sidecar_stat.get(key), csv_stat.get(key)
+            if key in FLOAT_KEYS and a is not None and b is not None and math.isclose(a, b, rel_tol=1e-9):
+                continue
+            if a != b:
+                print(f"  {label}: {name}.{key} {labels[0]}={a!r} {labels[1]}={b!r}")
+                failures += 1
+        if name in expected_missing and csv_stat['missing'] != expected_missing[name]:
+            print(f"  {label}: {name}.missing={csv_stat['missing']} pandas.read_csv={expected_missing[name]}")
+            failures += 1
+    print(f"{label:<36}{'ok' if not failures else f'{failures} MISMATCH(ES)'}")
+    return failures
+
+def check_append(server, root, rows, analyze, analysis_cache, Config, pd):
+    """Refresh of an appended file vs. a full recompute, per reader and mode
+
+    The refresh must read only the appended bytes (plus header and fingerprint ranges), not the file.
+    """
+    failures = 0
+    local_path = os.path.join(root, 'uploads', 'appended.csv')
+    for enabled in (True, False):
+        Config.SIDECAR_ENABLED = enabled
+        for mode in ('streaming', 'approximate'):
+            # Large enough that the fingerprint range before the old end is a small part of the file
+            write_fixture(local_path, rows * 10)
+            shutil.rmtree(Config.PROFILE_STATE_DIR, ignore_errors=True)
+            analysis_cache.clear()
+            analyze('/uploads/appended.csv', **MODES[mode])
+            append_rows(local_path, rows * 10, APPEND_ROWS)
+            analysis_cache.clear()
+            sent = server.counters()['bytes_sent']
+            refreshed = analyze('/uploads/appended.csv', **MODES[mode])
+            sent = server.counters()['bytes_sent'] - sent
+
+            shutil.rmtree(Config.PROFILE_STATE_DIR, ignore_errors=True)
+            analysis_cache.clear()
+            recomputed = analyze('/uploads/appended.csv', **MODES[mode])
+            expected_missing = {column: int(count) for column, count in pd.read_csv(local_path).isnull().sum().items()}
+            keys = ('type',) + COMPARED[mode] + (('mean', 'std', 'min', 'max') if mode == 'streaming' else ())
+            reader = 'sidecar' if enabled else 'csv'
+            if sent >= os.path.getsize(local_path) / 2:
+                print(f"  append {reader} {mode}: refresh read {sent} bytes, not just the appended rows")
+                failures += 1
+            failures += compare(f"append {reader} {mode}", refreshed, recomputed, expected_missing, keys,
+                                labels=('refresh', 'recompute'))
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=3000)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    os.makedirs(os.path.join(root, 'uploads'))
+    server = FakeWebHdfsServer(root).start()
+    configure_environment(server.server_port)
+    os.environ.update({
+        'SIDECAR_DIR': os.path.join(root, 'sidecars'),
+        'PROFILE_STATE_DIR': os.path.join(root, 'profile_state'),
+        'INCREMENTAL_ANALYSIS': 'false',
+        'INCREMENTAL_MIN_BYTES': '0',
+        'PARALLEL_READ': 'false',
+        # Small blocks so the type-change fixture spans several of them
+        'SIDECAR_BLOCK_BYTES': str(64 * 1024)
+    })
+    import pandas as pd
+    from app.config import Config
+    from app.services.analysis_cache import analysis_cache
+    from app.services.simple_analyzer import analyze_hdfs_file_simple
+
+    fixtures = {'missing_values.csv': write_fixture, 'type_change.csv': write_type_change_fixture}
+    failures = 0
+    try:
+        for name, write in fixtures.items():
+            local_path = os.path.join(root, 'uploads', name)
+            write(local_path, args.rows if name == 'missing_values.csv' else args.rows * 10)
+            expected_missing = {column: int(count) for column, count in pd.read_csv(local_path).isnull().sum().items()}
+
+            for mode, options in MODES.items():
+                results = {}
+                for enabled in (True, False):
+                    Config.SIDECAR_ENABLED = enabled
+                    analysis_cache.clear()
+                    results[enabled] = analyze_hdfs_file_simple(f'/uploads/{name}', **options)
+                failures += compare(f"{name} {mode}", results[True], results[False], expected_missing, COMPARED[mode])
+
+        Config.INCREMENTAL_ANALYSIS = True
+        failures += check_append(server, root, args.rows, analyze_hdfs_file_simple, analysis_cache, Config, pd)
+    finally:
+        server.stop()
+        shutil.rmtree(root, ignore_errors=True)
+
+    if failures:
+        print(f"{failures} mismatch(es)")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
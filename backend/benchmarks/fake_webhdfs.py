@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Local in-process WebHDFS stand-in for benchmarks (serves files from a local directory)
+
+Optional network shaping: `latency` seconds are added before every response (NameNode and
+DataNode steps alike, so a redirected OPEN pays it twice) and `bandwidth` caps each transfer
+in bytes per second, in both directions.
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+
+class FakeWebHdfsHandler(BaseHTTPRequestHandler):
+    """Handles NameNode (redirecting) and DataNode (serving) WebHDFS requests"""
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _local_path(self, hdfs_path):
+        return os.path.join(self.server.root, hdfs_path.lstrip('/'))
+    
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _file_status(self, local_path, name=''):
+        stat = os.stat(local_path)
+        return {
+            'pathSuffix': name,
+            'type': 'DIRECTORY' if os.path.isdir(local_path) else 'FILE',
+            'length': 0 if os.path.isdir(local_path) else stat.st_size,
+            'modificationTime': int(stat.st_mtime * 1000)
+        }
+    
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        hdfs_path = parsed.path[len('/webhdfs/v1'):] or '/'
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        op = params.get('op', '').upper()
+        local_path = self._local_path(hdfs_path)
+        self.server.begin_request(op, 'datanode' in params)
+        
+        if op == 'LISTSTATUS':
+            if not os.path.exists(local_path):
+                return self._send_json(404, {'RemoteException': {'message': f'File {hdfs_path} does not exist.'}})
+            names = sorted(os.listdir(local_path)) if os.path.isdir(local_path) else ['']
+            statuses = [self._file_status(os.path.join(local_path, n) if n else local_path, n) for n in names]
+            return self._send_json(200, {'FileStatuses': {'FileStatus': statuses}})
+        
+        if op == 'GETFILESTATUS':
+            if not os.path.exists(local_path):
+                return self._send_json(404, {'RemoteException': {'message': f'File {hdfs_path} does not exist.'}})
+            return self._send_json(200, {'FileStatus': self._file_status(local_path)})
+        
+        if op == 'OPEN':
+            if not os.path.isfile(local_path):
+                return self._send_json(404, {'RemoteException': {'message': f'File {hdfs_path} does not exist.'}})
+            if 'datanode' not in params:
+                # NameNode step: redirect to the "DataNode" (this same server)
+                params['datanode'] = 'true'
+                location = f"http://127.0.0.1:{self.server.server_port}{parsed.path}?{urlencode(params)}"
+                self.send_response(307)
+                self.send_header('Location', location)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            return self._send_file(local_path, int(params.get('offset', 0)), params.get('length'))
+        
+        self._send_json(400, {'RemoteException': {'message': f'Unsupported operation {op}'}})
+    
+    def do_PUT(self):
+        parsed = urlparse(self.path)
+        hdfs_path = parsed.path[len('/webhdfs/v1'):] or '/'
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        op = params.get('op', '').upper()
+        self.server.begin_request(op, 'datanode' in params)
+        
+        if op != 'CREATE':
+            self._read_body()
+            return self._send_json(400, {'RemoteException': {'message': f'Unsupported operation {op}'}})
+        
+        if 'datanode' not in params:
+            # NameNode step: redirect to the "DataNode" (this same server)
+            self._read_body()
+            params['datanode'] = 'true'
+            location = f"http://127.0.0.1:{self.server.server_port}{parsed.path}?{urlencode(params)}"
+            self.send_response(307)
+            self.send_header('Location', location)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
+        local_path = self._local_path(hdfs_path)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        with open(local_path, 'wb') as f:
+            started, received = time.monotonic(), 0
+            for chunk in self._iter_body():
+                f.write(chunk)
+                self.server.bytes_received += len(chunk)
+                received += len(chunk)
+                self.server.throttle(started, received)
+        self.send_response(201)
+        self.send_header('Location', f"hdfs://127.0.0.1{hdfs_path}")
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def _iter_body(self):
+        """Yield the request body, handling both Content-Length and chunked transfer encoding"""
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if size == 0:
+                    # Skip trailers up to the terminating blank line
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    return
+                yield self.rfile.read(size)
+                self.rfile.readline()
+        else:
+            remaining = int(self.headers.get('Content-Length', 0))
+            while remaining > 0:
+                chunk = self.rfile.read(min(remaining, 64 * 1024))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+    
+    def _read_body(self):
+        for _ in self._iter_body():
+            pass
+    
+    def _send_file(self, local_path, offset, length):
+        size = os.path.getsize(local_path)
+        offset = min(offset, size)
+        remaining = size - offset if length is None else min(int(length), size - offset)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(remaining))
+        self.end_headers()
+        with open(local_path, 'rb') as f:
+            f.seek(offset)
+            started, sent = time.monotonic(), 0
+            while remaining > 0:
+                chunk = f.read(min(remaining, 64 * 1024))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                self.server.bytes_sent += len(chunk)
+                sent += len(chunk)
+                remaining -= len(chunk)
+                self.server.throttle(started, sent)
+
+class FakeWebHdfsServer(ThreadingHTTPServer):
+    """Threaded WebHDFS stand-in rooted at a local directory"""
+    
+    daemon_threads = True
+    
+    def __init__(self, root, port=0, latency=0.0, bandwidth=None):
+        super().__init__(('127.0.0.1', port), FakeWebHdfsHandler)
+        self.root = root
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.requests = Counter()  # "OPEN", "OPEN@datanode", ... -> count
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def begin_request(self, op, datanode):
+        with self._lock:
+            self.requests[f"{op}@datanode" if datanode else op] += 1
+        if self.latency:
+            time.sleep(self.latency)
+    
+    def throttle(self, started, transferred):
+        """Sleep until `transferred` bytes since `started` fit within the bandwidth cap"""
+        if self.bandwidth:
+            delay = started + transferred / self.bandwidth - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    
+    def counters(self):
+        """Snapshot of the transfer counters (diff two snapshots to measure one run)"""
+        with self._lock:
+            return {
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received,
+                'requests': dict(self.requests)
+            }
+    
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def configure_environment(port):
+    """Point the backend Config at a fake server (must run before importing app)"""
+    os.environ['FORCE_IP'] = 'true'
+    os.environ['HDFS_IP'] = '127.0.0.1'
+    os.environ['WEBHDFS_PORT'] = str(port)
+
+if __name__ == "__main__":
+    import sys
+    root = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), '..')
+    server = FakeWebHdfsServer(root, int(os.environ.get('WEBHDFS_PORT', 50070)),
+                               latency=float(os.environ.get('FAKE_WEBHDFS_LATENCY_MS', 0)) / 1000,
+                               bandwidth=float(os.environ.get('FAKE_WEBHDFS_BANDWIDTH_MBPS', 0)) * 125000 or None)
+    print(f"Serving {os.path.abspath(root)} as WebHDFS on http://127.0.0.1:{server.server_port}")
+    server.serve_forever()
@@ -1,32 +1,11 @@
 #!/usr/bin/env python3
 """
-Network scanner to discover HDFS servers on the local network
+Network scanner to discover HDFS servers on the local network (or any CIDR ranges)
 """
+import argparse
 import socket
-import threading
-import time
-import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def scan_port(ip, port, timeout=1):
-    """Scan a specific IP and port"""
-    try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        result = sock.connect_ex((ip, port))
-        sock.close()
-        return result == 0
-    except:
-        return False
-
-def test_hdfs_webui(ip, port=50070):
-    """Test if HDFS WebUI is accessible"""
-    try:
-        url = f"http://{ip}:{port}/webhdfs/v1/?op=LISTSTATUS"
-        response = requests.get(url, timeout=2)
-        return response.status_code == 200
-    except:
-        return False
+from app.services.network_discovery import DEFAULT_PORTS, HDFS_RPC_PORTS, expand_targets, scan_network as run_scan
 
 def get_local_ip():
     """Get local machine IP address"""
@@ -39,76 +18,50 @@ def get_local_ip():
     except:
         return None
 
-def scan_network():
-    """Scan local network for HDFS servers"""
-    print("🔍 Scanning local network for HDFS servers...")
+def report(result):
+    """Print each open port as soon as the scanner finds it"""
+    ip, port = result['ip'], result['port']
+    if result['type'] == 'webhdfs':
+        print(f"✅ HDFS WebUI found at {ip}:{port} ({result['elapsed_s']:.2f}s)")
+    elif result['type'] == 'service':
+        print(f"✅ HDFS service found at {ip}:{port} ({result['elapsed_s']:.2f}s)")
+    else:
+        print(f"🔍 Found open port {port} on {ip} ({result['elapsed_s']:.2f}s)")
+
+def scan_network(cidrs=None, ports=DEFAULT_PORTS, concurrency=None, timeout=None, first=False):
+    """Scan local network (or the given CIDR ranges) for HDFS servers"""
+    print("🔍 Scanning network for HDFS servers...")
     print("=" * 60)
-    
-    local_ip = get_local_ip()
-    if not local_ip:
-        print("❌ Could not determine local IP address")
-        return
-    
-    print(f"📍 Local IP: {local_ip}")
-    
-    # Extract network prefix
-    network_prefix = '.'.join(local_ip.split('.')[:-1])
-    print(f"🌐 Scanning network: {network_prefix}.0/24")
-    
-    # Common HDFS ports
-    hdfs_ports = [50070, 9870, 8020, 9000]
-    
-    found_servers = []
-    
-    # Scan network
-    with ThreadPoolExecutor(max_workers=50) as executor:
-        futures = []
-        
-        for i in range(1, 255):
-            ip = f"{network_prefix}.{i}"
-            
-            # Test common HDFS ports
-            for port in hdfs_ports:
-                future = executor.submit(scan_port, ip, port)
-                futures.append((future, ip, port))
-        
-        # Process results
-        for future, ip, port in futures:
-            try:
-                if future.result():
-                    print(f"🔍 Found open port {port} on {ip}")
-                    
-                    # Test if it's HDFS WebUI
-                    if port in [50070, 9870] and test_hdfs_webui(ip, port):
-                        print(f"✅ HDFS WebUI found at {ip}:{port}")
-                        found_servers.append({
-                            'ip': ip,
-                            'port': port,
-                            'type': 'webui'
-                        })
-                    elif port in [8020, 9000]:
-                        print(f"✅ HDFS service found at {ip}:{port}")
-                        found_servers.append({
-                            'ip': ip,
-                            'port': port,
-                            'type': 'service'
-                        })
-                        
-            except Exception as e:
-                pass
-    
+
+    if not cidrs:
+        local_ip = get_local_ip()
+        if not local_ip:
+            print("❌ Could not determine local IP address")
+            return
+        print(f"📍 Local IP: {local_ip}")
+        cidrs = [f"{local_ip}/24"]
+
+    hosts = expand_targets(cidrs)
+    print(f"🌐 Scanning {', '.join(cidrs)}: {len(hosts)} hosts, ports {', '.join(map(str, ports))}")
+
+    # Every port but the RPC ones is checked for a WebHDFS answer
+    verify_ports = [port for port in ports if port not in HDFS_RPC_PORTS]
+    results = run_scan(hosts, ports, on_result=report, verify_ports=verify_ports, concurrency=concurrency,
+                       connect_timeout=timeout, stop_on_first=first)
+    found_servers = [result for result in results if result['type'] in ('webhdfs', 'service')]
+
     # Summary
     print(f"\n📊 Scan Results:")
     print("=" * 60)
-    
+
     if found_servers:
         print(f"✅ Found {len(found_servers)} potential HDFS servers:")
         for server in found_servers:
             print(f"   📍 {server['ip']}:{server['port']} ({server['type']})")
-        
+
         print(f"\n💡 To use a discovered server, set environment variables:")
         for server in found_servers:
-            if server['type'] == 'webui':
+            if server['type'] == 'webhdfs':
                 print(f"   export HDFS_IP={server['ip']}")
                 print(f"   export WEBHDFS_PORT={server['port']}")
                 break
@@ -118,7 +71,16 @@ def scan_network():
         print("   1. Make sure your HDFS server is running")
         print("   2. Check if the server is on the same network")
         print("   3. Verify firewall settings")
-        print("   4. Try scanning a different network range")
+        print("   4. Try scanning a different network range (--cidr)")
+
+    return found_servers
 
 if __name__ == "__main__":
-    scan_network() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cidr', action='append', help='CIDR range or address to scan (repeatable, default: local /24)')
+    parser.add_argument('--ports', type=int, nargs='+', default=list(DEFAULT_PORTS), help='ports to probe')
+    parser.add_argument('--concurrency', type=int, help='concurrent connects (default HDFS_SCAN_CONCURRENCY)')
+    parser.add_argument('--timeout', type=float, help='connect timeout per probe in seconds')
+    parser.add_argument('--first', action='store_true', help='stop at the first verified WebHDFS endpoint')
+    args = parser.parse_args()
+    scan_network(args.cidr, args.ports, args.concurrency, args.timeout, args.first)
@@ -0,0 +1,88 @@
+"""
+Job-count test for the single-pass Spark profiling plan
+
+Builds a synthetic wide DataFrame (mixed numeric and string columns) in a local Spark session,
+profiles it with the same aggregation, mode, histogram and correlation expressions
+analyze_hdfs_file uses, and counts the Spark jobs that ran. The count must not grow with the
+number of columns (the old per-column loop ran several jobs per column). Histograms, including
+the one of a constant column, must match NumericBatch.histograms over the same data.
+"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+pytest.importorskip('pyspark')
+
+from pyspark.sql import SparkSession
+from pyspark.sql import functions as F
+from app.services.batch_stats import NumericBatch
+from app.services.spark_processor import build_profile_aggregation, compute_modes, compute_histograms, compute_correlation
+
+# One aggregation job, one grouped job each for modes and histograms and one mapInPandas job for
+# the correlation matrix; allow a little slack for Spark splitting a stage into an extra job
+# (e.g. percentile_approx / adaptive execution)
+MAX_JOBS = 6
+BINS = 20
+ROWS = 20000
+
+@pytest.fixture(scope='module')
+def spark():
+    try:
+        session = SparkSession.builder.master('local[2]').appName('test_spark_jobs').getOrCreate()
+    except Exception as e:
+        pytest.skip(f"No local Spark session available: {e}")
+    session.sparkContext.setLogLevel('WARN')
+    yield session
+    session.stop()
+
+def make_frame(spark, rows, columns):
+    df = spark.range(rows)
+    for i in range(columns):
+        if i == 0:
+            # Constant column with nulls: a single bin holding every non-null value
+            df = df.withColumn(f"c{i}", F.when(F.col('id') % 10 != 0, F.lit(7.0)))
+        elif i % 3 == 2:
+            df = df.withColumn(f"c{i}", F.concat(F.lit('v'), (F.col('id') % (i + 5)).cast('string')))
+        else:
+            df = df.withColumn(f"c{i}", (F.col('id') * (i + 1) % 997).cast('double'))
+    return df.drop('id').cache()
+
+def count_jobs(spark, group, func):
+    sc = spark.sparkContext
+    sc.setJobGroup(group, group)
+    try:
+        result = func()
+    finally:
+        sc.setLocalProperty('spark.jobGroup.id', None)
+    return len(sc.statusTracker().getJobIdsForGroup(group)), result
+
+@pytest.mark.parametrize('columns', [10, 30])
+def test_profile_jobs_and_histograms(spark, columns):
+    df = make_frame(spark, ROWS, columns)
+    df.count()  # materialize the cache outside the measured groups
+    try:
+        stats_jobs, profile = count_jobs(
+            spark, f"stats-{columns}", lambda: df.agg(*build_profile_aggregation(df)).first().asDict())
+        mode_jobs, _ = count_jobs(spark, f"modes-{columns}", lambda: compute_modes(df))
+        ranges = {i: (profile[f"{i}_min"], profile[f"{i}_max"])
+                  for i in range(columns) if f"{i}_min" in profile}
+        value_counts = {i: profile['__rows'] - profile[f"{i}_missing"] for i in ranges}
+        histogram_jobs, histograms = count_jobs(
+            spark, f"histograms-{columns}", lambda: compute_histograms(df, ranges, BINS, value_counts))
+        correlation_jobs, _ = count_jobs(spark, f"correlation-{columns}", lambda: compute_correlation(df))
+
+        total = stats_jobs + mode_jobs + histogram_jobs + correlation_jobs
+        assert total <= MAX_JOBS, (f"{stats_jobs} stats, {mode_jobs} mode, {histogram_jobs} histogram and "
+                                   f"{correlation_jobs} correlation job(s) for {columns} columns")
+
+        numeric = [df.columns[i] for i in sorted(ranges)]
+        expected = NumericBatch(df.select(numeric).toPandas()).histograms(BINS)
+        for i, reference in zip(sorted(ranges), expected):
+            assert histograms[i]["counts"] == reference["counts"], df.columns[i]
+            assert histograms[i]["edges"] == pytest.approx(reference["edges"], rel=1e-9), df.columns[i]
+    finally:
+        df.unpersist()
@@ -36,6 +36,7 @@ import {
   Save as SaveIcon
 } from '@mui/icons-material';
 import Plot from 'react-plotly.js';
+import axios from 'axios';
 
 const chartTypes = [
   { value: 'bar', label: 'Bar Chart', icon: '📊' },
@@ -48,6 +49,15 @@ const chartTypes = [
   { value: 'area', label: 'Area Chart', icon: '📊' }
 ];
 
+const aggregateFunctions = ['sum', 'mean', 'count', 'min', 'max'];
+
+// Chart types drawn from a server-side group-by over the whole file instead of the sample rows
+const aggregatedChartTypes = ['bar', 'pie'];
+
+// Chart types drawn from a downsampled series of the whole file
+const seriesChartTypes = ['line', 'scatter'];
+const seriesPoints = 1000;
+
 const colorPalettes = [
   { name: 'Default', colors: ['#1976d2', '#d81b60', '#388e3c', '#fbc02d', '#ff5722'] },
   { name: 'Pastel', colors: ['#ffcdd2', '#f8bbd9', '#e1bee7', '#d1c4e9', '#c5cae9'] },
@@ -55,11 +65,14 @@ const colorPalettes = [
   { name: 'Monochrome', colors: ['#000000', '#333333', '#666666', '#999999', '#cccccc'] }
 ];
 
-export default function ChartBuilder({ analytics }) {
+export default function ChartBuilder({ analytics, hdfsPath }) {
   const [chartType, setChartType] = useState('bar');
   const [xColumn, setXColumn] = useState('');
   const [yColumn, setYColumn] = useState('');
   const [colorColumn, setColorColumn] = useState('');
+  const [aggFunc, setAggFunc] = useState('sum');
+  const [aggregated, setAggregated] = useState(null);
+  const [series, setSeries] = useState(null);
   const [chartData, setChartData] = useState(null);
   const [chartLayout, setChartLayout] = useState({});
   const [chartConfig, setChartConfig] = useState({
@@ -78,11 +91,59 @@ export default function ChartBuilder({ analytics }) {
     }
   }, [analytics]);
 
+  useEffect(() => {
+    setAggregated(null);
+    if (!hdfsPath || !xColumn || !aggregatedChartTypes.includes(chartType)) return;
+
+    let cancelled = false;
+    axios.get('/aggregate', {
+      params: {
+        hdfs_path: hdfsPath,
+        group_by: xColumn,
+        measure: aggFunc === 'count' ? undefined : yColumn,
+        agg: aggFunc
+      }
+    }).then(res => {
+      if (!cancelled) setAggregated(res.data);
+    }).catch(err => {
+      // Fall back to the sample rows
+      console.error('Aggregation failed:', err.response?.data?.error || err.message);
+    });
+    return () => { cancelled = true; };
+  }, [hdfsPath, chartType, xColumn, yColumn, aggFunc]);
+
+  useEffect(() => {
+    setSeries(null);
+    if (!hdfsPath || !xColumn || !yColumn || !seriesChartTypes.includes(chartType)) return;
+
+    let cancelled = false;
+    axios.get('/series', {
+      params: { hdfs_path: hdfsPath, x: xColumn, y: yColumn, points: seriesPoints }
+    }).then(res => {
+      if (!cancelled) setSeries(res.data);
+    }).catch(err => {
+      // Fall back to the sample rows
+      console.error('Series failed:', err.response?.data?.error || err.message);
+    });
+    return () => { cancelled = true; };
+  }, [hdfsPath, chartType, xColumn, yColumn]);
+
   useEffect(() => {
     if (analytics && xColumn && yColumn) {
       generateChart();
     }
-  }, [analytics, chartType, xColumn, yColumn, colorColumn, chartConfig]);
+  }, [analytics, chartType, xColumn, yColumn, colorColumn, chartConfig, aggregated, series]);
+
+  const aggregatedSeries = () => {
+    if (!aggregated) return null;
+    const labels = aggregated.groups.map(g => String(g.keys[xColumn]));
+    const values = aggregated.groups.map(g => g.value);
+    if (aggregated.other) {
+      labels.push(`Other (${aggregated.other.groups})`);
+      values.push(aggregated.other.value);
+    }
+    return { labels, values };
+  };
 
   const generateChart = () => {
     if (!analytics || !xColumn || !yColumn) return;
@@ -96,8 +157,25 @@ export default function ChartBuilder({ analytics }) {
     let plotData = [];
     const selectedPalette = colorPalettes.find(p => p.name === chartConfig.colorPalette);
 
+    const grouped = aggregatedChartTypes.includes(chartType) ? aggregatedSeries() : null;
+    const points = seriesChartTypes.includes(chartType) && series ? series : null;
+    const histogram = analytics.columns?.find(c => c.name === yColumn)?.histogram;
+
     switch (chartType) {
       case 'bar':
+        if (grouped) {
+          plotData = [{
+            x: grouped.labels,
+            y: grouped.values,
+            type: 'bar',
+            marker: {
+              color: selectedPalette.colors[0],
+              opacity: chartConfig.opacity
+            },
+            name: `${aggFunc}(${aggFunc === 'count' ? '*' : yColumn})`
+          }];
+          break;
+        }
         plotData = [{
           x: data.map(d => d.x),
           y: data.map(d => d.y),
@@ -112,8 +190,8 @@ export default function ChartBuilder({ analytics }) {
 
       case 'line':
         plotData = [{
-          x: data.map(d => d.x),
-          y: data.map(d => d.y),
+          x: points ? points.x : data.map(d => d.x),
+          y: points ? points.y : data.map(d => d.y),
           type: 'scatter',
           mode: 'lines+markers',
           line: { color: selectedPalette.colors[0] },
@@ -127,8 +205,8 @@ export default function ChartBuilder({ analytics }) {
 
       case 'scatter':
         plotData = [{
-          x: data.map(d => d.x),
-          y: data.map(d => d.y),
+          x: points ? points.x : data.map(d => d.x),
+          y: points ? points.y : data.map(d => d.y),
           type: 'scatter',
           mode: 'markers',
           marker: {
@@ -141,22 +219,38 @@ export default function ChartBuilder({ analytics }) {
         break;
 
       case 'pie':
-        const aggregated = data.reduce((acc, d) => {
+        const sampleTotals = data.reduce((acc, d) => {
           acc[d.x] = (acc[d.x] || 0) + d.y;
           return acc;
         }, {});
+        const pieSeries = grouped || { labels: Object.keys(sampleTotals), values: Object.values(sampleTotals) };
         
         plotData = [{
-          labels: Object.keys(aggregated),
-          values: Object.values(aggregated),
+          labels: pieSeries.labels,
+          values: pieSeries.values,
           type: 'pie',
           marker: {
-            colors: selectedPalette.colors.slice(0, Object.keys(aggregated).length)
+            colors: selectedPalette.colors.slice(0, pieSeries.labels.length)
           }
         }];
         break;
 
       case 'histogram':
+        if (histogram) {
+          // Precomputed during profiling over the whole column
+          plotData = [{
+            x: histogram.counts.map((_, i) => (histogram.edges[i] + histogram.edges[i + 1]) / 2),
+            y: histogram.counts,
+            width: histogram.counts.map((_, i) => histogram.edges[i + 1] - histogram.edges[i]),
+            type: 'bar',
+            marker: {
+              color: selectedPalette.colors[0],
+              opacity: chartConfig.opacity
+            },
+            name: yColumn
+          }];
+          break;
+        }
         plotData = [{
           x: data.map(d => d.y),
           type: 'histogram',
@@ -320,6 +414,21 @@ export default function ChartBuilder({ analytics }) {
                 </Select>
               </FormControl>
 
+              {aggregatedChartTypes.includes(chartType) && hdfsPath && (
+                <FormControl fullWidth sx={{ mb: 2 }}>
+                  <InputLabel>Aggregation</InputLabel>
+                  <Select
+                    value={aggFunc}
+                    label="Aggregation"
+                    onChange={(e) => setAggFunc(e.target.value)}
+                  >
+                    {aggregateFunctions.map(name => (
+                      <MenuItem key={name} value={name}>{name}</MenuItem>
+                    ))}
+                  </Select>
+                </FormControl>
+              )}
+
               <FormControl fullWidth sx={{ mb: 2 }}>
                 <InputLabel>Color By (Optional)</InputLabel>
                 <Select
@@ -64,6 +64,19 @@ import axios from 'axios';
 
   const drawerWidth = 280;
   const isLargeScreen = window.innerWidth >= 1200;
+  const JOB_POLL_INTERVAL_MS = 2000;
+
+// Analyses still running after the backend's sync timeout answer 202 with a job; poll it until it finishes
+const waitForAnalysis = async (response) => {
+  if (response.status !== 202) return response.data;
+  let job = response.data;
+  while (job.status !== 'done') {
+    if (job.status === 'failed') throw new Error(job.error || 'Analysis job failed');
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    job = (await axios.get(`/jobs/${job.job_id}`)).data;
+  }
+  return job.result;
+};
 
 export default function Dashboard() {
   const [mobileOpen, setMobileOpen] = useState(false);
@@ -114,7 +127,7 @@ export default function Dashboard() {
       const response = await axios.post('/analyze/preview', {
         hdfs_path: hdfsPath
       });
-      setAnalytics(response.data);
+      setAnalytics(await waitForAnalysis(response));
       setSuccess('Data analysis completed successfully!');
     } catch (err) {
       setError('Analysis failed: ' + (err.response?.data?.error || err.message));
@@ -387,11 +400,11 @@ export default function Dashboard() {
         );
       case 3:
         return (
-          <ChartBuilder analytics={analytics} />
+          <ChartBuilder analytics={analytics} hdfsPath={uploadData?.hdfs_uri || uploadData?.hdfs_path} />
         );
       case 4:
         return (
-          <DataTable analytics={analytics} />
+          <DataTable analytics={analytics} hdfsPath={uploadData?.hdfs_uri || uploadData?.hdfs_path} />
         );
       case 5:
         return (
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import {
   Box,
   Card,
@@ -31,8 +31,9 @@ import {
   Visibility as VisibilityIcon,
   Sort as SortIcon
 } from '@mui/icons-material';
+import axios from 'axios';
 
-export default function DataTable({ analytics }) {
+export default function DataTable({ analytics, hdfsPath }) {
   const [page, setPage] = useState(0);
   const [rowsPerPage, setRowsPerPage] = useState(10);
   const [searchTerm, setSearchTerm] = useState('');
@@ -40,6 +41,27 @@ export default function DataTable({ analytics }) {
   const [sortDirection, setSortDirection] = useState('asc');
   const [filterColumn, setFilterColumn] = useState('');
   const [filterValue, setFilterValue] = useState('');
+  const [serverPage, setServerPage] = useState(null);
+
+  // Page through the whole file on the server (one ranged read per page) when we know its path
+  useEffect(() => {
+    if (!analytics || !hdfsPath) {
+      setServerPage(null);
+      return;
+    }
+
+    let cancelled = false;
+    axios.get('/rows', {
+      params: { path: hdfsPath, offset: page * rowsPerPage, limit: rowsPerPage }
+    }).then(res => {
+      if (!cancelled) setServerPage(res.data);
+    }).catch(err => {
+      // Fall back to the sample rows
+      console.error('Loading rows failed:', err.response?.data?.error || err.message);
+      if (!cancelled) setServerPage(null);
+    });
+    return () => { cancelled = true; };
+  }, [analytics, hdfsPath, page, rowsPerPage]);
 
   if (!analytics) {
     return (
@@ -106,8 +128,9 @@ export default function DataTable({ analytics }) {
     return `${headers}\n${rows}`;
   };
 
-  // Filter and sort data
-  let filteredData = analytics.sample;
+  // Filter and sort data (within the current server page when paging on the server)
+  const sourceRows = serverPage ? serverPage.rows : analytics.sample;
+  let filteredData = [...sourceRows];
 
   // Apply search filter
   if (searchTerm) {
@@ -146,10 +169,11 @@ export default function DataTable({ analytics }) {
     });
   }
 
-  const paginatedData = filteredData.slice(
+  const paginatedData = serverPage ? filteredData : filteredData.slice(
     page * rowsPerPage,
     page * rowsPerPage + rowsPerPage
   );
+  const totalRows = serverPage ? serverPage.total_rows : filteredData.length;
 
   return (
     <Box sx={{ 
@@ -225,8 +249,8 @@ export default function DataTable({ analytics }) {
 
         {/* Results Summary */}
         <Alert severity="info" sx={{ mb: 2 }}>
-          Showing {paginatedData.length} of {filteredData.length} rows 
-          {filteredData.length !== analytics.sample.length && ` (filtered from ${analytics.sample.length} total)`}
+          Showing {paginatedData.length} of {totalRows} rows 
+          {filteredData.length !== sourceRows.length && ` (filtered from ${sourceRows.length} on this page)`}
         </Alert>
 
         {/* Data Table */}
@@ -281,7 +305,7 @@ export default function DataTable({ analytics }) {
         {/* Pagination */}
         <TablePagination
           component="div"
-          count={filteredData.length}
+          count={totalRows}
           page={page}
           onPageChange={handleChangePage}
           rowsPerPage={rowsPerPage}
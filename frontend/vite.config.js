@@ -8,6 +8,12 @@ export default defineConfig({
     proxy: {
       '/upload': 'http://localhost:5000',
       '/analyze': 'http://localhost:5000',
+      '/summary': 'http://localhost:5000',
+      '/aggregate': 'http://localhost:5000',
+      '/series': 'http://localhost:5000',
+      '/rows': 'http://localhost:5000',
+      '/jobs': 'http://localhost:5000',
+      '/api': 'http://localhost:5000',
       // Add other API routes here if needed
     }
   }